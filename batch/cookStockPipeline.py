@@ -100,16 +100,10 @@ sectorCollection = [SectorConstants.TECH, SectorConstants.HEALTH_CARE,SectorCons
 
 # sectorCollection = [SectorConstants.TECH]
 
-sectorName = []
-selected = [] 
-for sector in sectorCollection:
-    filtered_by_sector = get_tickers_filtered(sectors=sector)
-    #remove underscore in sector name
-    sector = sector.replace(" ", "")
-    sectorName.append(sector)
-    for i in filtered_by_sector: 
-        if i not in selected: 
-            selected.append(i) 
+#one universe download serves all sectors; tickers are deduplicated in sector order
+selected = get_tickers_for_sectors(sectorCollection)
+#remove underscore in sector name
+sectorName = [sector.replace(" ", "") for sector in sectorCollection]
 
 #convert sectorCollection to a file name
 sectorNameStr = '_'.join(sectorName)
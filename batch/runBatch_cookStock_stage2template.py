@@ -33,19 +33,9 @@ import get_tickers
 reload(get_tickers)
 from get_tickers import *
 
-tmp = get_tickers(NYSE=True, NASDAQ=True, AMEX=True)
+tickers = unique_tickers(get_tickers(NYSE=True, NASDAQ=True, AMEX=True))
 
-tickers = [] 
-for i in tmp:   
-    if i not in tickers: 
-        tickers.append(i) 
-        
-filtered_by_sector = get_tickers_filtered(sectors=SectorConstants.TECH)
-
-selected = [] 
-for i in filtered_by_sector: 
-    if i not in selected: 
-        selected.append(i) 
+selected = unique_tickers(get_tickers_filtered(sectors=SectorConstants.TECH))
         
 #filtered_by_sector = ['VNRX', 'INFU']
 #get name of the file from the sector and date automatically
@@ -55,14 +45,10 @@ current_date = dt.date.today().strftime("%m_%d_%Y")
 sectorCollection = [SectorConstants.TECH, SectorConstants.HEALTH_CARE, SectorConstants.BASICS, SectorConstants.SERVICES, SectorConstants.FINANCE, SectorConstants.ENERGY, SectorConstants.NON_DURABLE_GOODS, SectorConstants.DURABLE_GOODS]
 
 for sector in sectorCollection:
-    filtered_by_sector = get_tickers_filtered(sectors=sector)
-    selected = [] 
-    for i in filtered_by_sector: 
-        if i not in selected: 
-            selected.append(i) 
+    selected = unique_tickers(get_tickers_filtered(sectors=sector))
     file = sector + '_superStocks_' + current_date + '.json'
     print('start processing ' + sector)
-    y = batch_process(selected, file)
+    y = batch_process(selected, file, universe=sector)
     y.batch_strategy()
     print('end processing ' + sector)
     print('----------------------------------')
\ No newline at end of file
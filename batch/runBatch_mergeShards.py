@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Merge the outputs of a sharded batch run into the normal results/<date> layout.
+
+Each machine (or local process) runs the pipeline with BATCH_SHARD=k/N, e.g.
+
+    BATCH_SHARD=1/3 python batch/cookStockPipeline.py
+    BATCH_SHARD=2/3 python batch/cookStockPipeline.py
+    BATCH_SHARD=3/3 python batch/cookStockPipeline.py
+
+and writes into results/<date>/shards/shard-k-of-N. Once all shards are done:
+
+    python batch/runBatch_mergeShards.py Technology_HealthCare_Finance_Energy --shards 3
+
+Usage:
+    python runBatch_mergeShards.py <sectors> [--shards N] [--date YYYY-MM-DD] [--results-dir DIR]
+"""
+import os
+import sys
+import argparse
+import datetime as dt
+
+
+def find_path():
+    """Find the 'cookstock' project root (COOKSTOCK_PATH or upward search)."""
+    env_path = os.environ.get('COOKSTOCK_PATH')
+    if env_path and os.path.isdir(os.path.expanduser(env_path)):
+        return os.path.abspath(os.path.expanduser(env_path))
+    p = os.path.abspath(os.path.dirname(__file__))
+    while True:
+        if os.path.basename(p).lower() == 'cookstock':
+            return p
+        parent = os.path.dirname(p)
+        if parent == p:
+            break
+        p = parent
+    return os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+basePath = find_path()
+os.environ.setdefault('COOKSTOCK_PATH', basePath)
+sys.path.insert(0, os.path.join(basePath, 'src'))
+
+import cookstock_batch
+
+parser = argparse.ArgumentParser(description='Merge sharded batch_pipeline_full outputs')
+parser.add_argument('sectors', help='Sector name used for the run (result JSON file name)')
+parser.add_argument('--shards', type=int, help='Expected number of shards N (warns on missing shards)')
+parser.add_argument('--date', help='Results date folder YYYY-MM-DD (default: AS_OF_DATE, else today)')
+parser.add_argument('--results-dir', help='Results folder holding shards/ (overrides --date)')
+args = parser.parse_args()
+
+results_dir = args.results_dir or os.path.join(
+    basePath, 'results', args.date or os.getenv('AS_OF_DATE') or dt.date.today().strftime('%Y-%m-%d'))
+merged = cookstock_batch.merge_shards(results_dir, args.sectors, shards=args.shards)
+print(f"Merged {merged} tickers into {results_dir}")
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Warm the price cache for tickers that are new to a run's universe.
+
+Every batch run records a universe snapshot with the tickers added and
+removed since the previous run (results/universe/<sectors>/<date>.json).
+This script downloads history only for the added tickers, in one bulk
+request, and optionally deletes cached prices of removed tickers:
+
+    python batch/runBatch_warmUniverse.py Technology_HealthCare_Finance_Energy
+    python batch/runBatch_warmUniverse.py CustomUS --days 3650 --since 2025-01-02 --prune
+
+Usage:
+    python runBatch_warmUniverse.py <sectors> [--days N] [--since YYYY-MM-DD] [--prune] [--dry-run]
+"""
+import os
+import sys
+import argparse
+
+
+def find_path():
+    """Find the 'cookstock' project root (COOKSTOCK_PATH or upward search)."""
+    env_path = os.environ.get('COOKSTOCK_PATH')
+    if env_path and os.path.isdir(os.path.expanduser(env_path)):
+        return os.path.abspath(os.path.expanduser(env_path))
+    p = os.path.abspath(os.path.dirname(__file__))
+    while True:
+        if os.path.basename(p).lower() == 'cookstock':
+            return p
+        parent = os.path.dirname(p)
+        if parent == p:
+            break
+        p = parent
+    return os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+basePath = find_path()
+os.environ.setdefault('COOKSTOCK_PATH', basePath)
+sys.path.insert(0, os.path.join(basePath, 'src'))
+
+import cookStock
+from cookstock_universe import UniverseSnapshots
+
+parser = argparse.ArgumentParser(description='Warm the price cache for tickers new to a universe')
+parser.add_argument('sectors', help='Universe name (the sectors name used for the run)')
+parser.add_argument('--days', type=int, default=cookStock.HISTORICAL_DAYS_DEFAULT,
+                    help='Days of history to fetch. Default: HISTORICAL_DAYS')
+parser.add_argument('--since', help='Diff against the snapshot on/before this date instead of the previous one')
+parser.add_argument('--prune', action='store_true', help='Delete cached prices of removed tickers')
+parser.add_argument('--dry-run', action='store_true', help='Only print the diff')
+parser.add_argument('--universe-dir', default=os.path.join(basePath, 'results', 'universe'))
+args = parser.parse_args()
+
+store = UniverseSnapshots(args.universe_dir)
+added, removed = store.diff(args.sectors, since=args.since)
+print(f"{args.sectors}: {len(added)} added, {len(removed)} removed")
+if args.dry_run:
+    print("added:", ' '.join(added))
+    print("removed:", ' '.join(removed))
+    sys.exit(0)
+
+if added:
+    if not cookStock.get_provider().uses_price_cache:
+        print("Data provider does not use the price cache; nothing to warm")
+    else:
+        price_map = cookStock.prefetch_price_history(added, days=args.days) or {}
+        warmed = sum(1 for t in added if price_map.get(t, {}).get('prices'))
+        print(f"Cached {args.days} days of prices for {warmed}/{len(added)} new tickers")
+
+if args.prune:
+    pruned = 0
+    for ticker in removed:
+        path = cookStock._cache_file(ticker, args.days)
+        if os.path.exists(path):
+            os.remove(path)
+            pruned += 1
+    print(f"Removed cached prices of {pruned} dropped tickers")
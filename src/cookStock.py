@@ -14,11 +14,14 @@ from time import sleep
 import sys
 
 import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
 import logging
 import time
 import threading
 import functools
 import subprocess
+import atexit
+import queue
 
 # Basic logger setup for pipeline progress
 logger = logging.getLogger(__name__)
@@ -37,64 +40,41 @@ if not logger.handlers:
             logger.warning("Invalid LOG_LEVEL '%s'; using INFO", log_level)
 
 
-# Helper to emit periodic heartbeat logs while a single ticker is being processed
-# Use a background thread that logs every `interval` seconds until stopped.
-def _start_heartbeat(ticker, interval=30):
-    stop = threading.Event()
-    start = time.time()
-
-    def _hb():
-        while not stop.is_set():
-            elapsed = time.time() - start
-            logger.info("Ticker %s still processing (elapsed %.0fs)", ticker, elapsed)
-            stop.wait(interval)
-
-    t = threading.Thread(target=_hb, daemon=True)
-    t.start()
-    return stop
-
-
-# Reusable decorator to log function entry/exit and duration. Use as @_log_step() above methods.
+# Reusable decorator to time a function into the run metrics. Use as @_log_step() above methods.
 def _log_step(level="info", show_args=False):
-    """Decorator to log entry/exit and execution time for functions.
-    - level: 'info' or 'debug'
-    - show_args: if True, will attempt to log args and kwargs (may trim `self` for methods)
+    """Decorator recording execution time of functions in METRICS.
+    - the stage name is the function's qualified name; methods of objects with a
+      `ticker` attribute are also attributed to that ticker
+    - entry/exit is logged at DEBUG only, so it can stay on in production
+    - level: kept for compatibility; 'debug' and 'info' behave the same
+    - show_args: if True, the DEBUG entry line includes args and kwargs
     """
 
     def _decorator(func):
+        name = f"{func.__qualname__}"
+
         @functools.wraps(func)
         def wrapper(*args, **kwargs):
-            name = f"{func.__qualname__}"
-            if show_args:
-                try:
-                    arg_preview = args[1:] if len(args) > 0 else args
-                    if level == "debug":
-                        logger.info(
-                            "Entering %s args=%s kwargs=%s", name, arg_preview, kwargs
-                        )
-                    else:
-                        logger.info("Entering %s", name)
-                except Exception:
-                    logger.info(
-                        "Entering %s (args omitted due to formatting error)", name
+            if logger.isEnabledFor(logging.DEBUG):
+                if show_args:
+                    logger.debug(
+                        "Entering %s args=%s kwargs=%s", name, args[1:], kwargs
                     )
-            else:
-                if level == "debug":
-                    logger.info("Starting %s", name)
                 else:
-                    logger.info("Starting %s", name)
-            t0 = time.time()
+                    logger.debug("Starting %s", name)
+            ticker = getattr(args[0], "ticker", None) if args else None
+            t0 = time.perf_counter()
             try:
-                result = func(*args, **kwargs)
-                elapsed = time.time() - t0
-                if level == "debug":
-                    logger.info("Finished %s in %.2fs", name, elapsed)
-                else:
-                    logger.info("Finished %s in %.2fs", name, elapsed)
-                return result
+                return func(*args, **kwargs)
             except Exception:
                 logger.exception("Error in %s", name)
                 raise
+            finally:
+                elapsed = time.perf_counter() - t0
+                METRICS.observe(
+                    name, elapsed, ticker if isinstance(ticker, str) else None
+                )
+                logger.debug("Finished %s in %.2fs", name, elapsed)
 
         return wrapper
 
@@ -174,12 +154,73 @@ if not basePath:
 
 # Import yfinance
 import yfinance as yf
+from cookstock_provider import get_provider, set_provider, make_provider
+from cookstock_metrics import METRICS
+from cookstock_profile import PROFILER
+from cookstock_pipeline import (
+    PIPELINE_FETCH_THREADS,
+    PIPELINE_MODE,
+    PIPELINE_QUEUE_SIZE,
+    PIPELINE_RENDER_WORKERS,
+    TickerTimeoutError,
+    TickerWatchdog,
+    _PipelineItem,
+    _PipelineStage,
+)
+from cookstock_batch import (
+    BATCH_RESUME,
+    BATCH_SHARD,
+    RUN_MANIFEST_NAME,
+    RunManifest,
+    merge_shards,
+    parse_shard,
+    shard_dirname,
+    shard_tickers,
+    sort_csv_by_buy_signal,
+)
+from cookstock_universe import UniverseSnapshots, UNIVERSE_SNAPSHOTS, universe_name
 
 # Configurable defaults (can be overridden with environment variables)
 HISTORICAL_DAYS_DEFAULT = int(os.getenv("HISTORICAL_DAYS", "120"))
 CACHE_TTL_HOURS = int(os.getenv("CACHE_TTL_HOURS", "24"))
 PREFETCH_ENABLED = os.getenv("PREFETCH", "false").lower() in ("1", "true", "yes")
 PREFETCH_WORKERS = int(os.getenv("PREFETCH_WORKERS", "8"))
+# Market data provider: 'live' (yfinance), 'record' (yfinance + capture to
+# DATA_ARCHIVE_DIR), 'replay' (serve DATA_ARCHIVE_DIR offline) or 'synthetic'
+# (seeded generated data, see cookstock_synthetic)
+DATA_PROVIDER = os.getenv("DATA_PROVIDER", "live").lower()
+DATA_ARCHIVE_DIR = os.getenv(
+    "DATA_ARCHIVE_DIR", os.path.join(basePath, "results", "cache", "archive")
+)
+REPLAY_LATENCY_MS = float(os.getenv("REPLAY_LATENCY_MS", "0"))
+SYNTHETIC_SEED = int(os.getenv("SYNTHETIC_SEED", "0"))
+# Pin the analysis date (YYYY-MM-DD); replay mode defaults to the recording date
+AS_OF_DATE = os.getenv("AS_OF_DATE")
+
+if DATA_PROVIDER != "live":
+    set_provider(
+        make_provider(
+            DATA_PROVIDER,
+            DATA_ARCHIVE_DIR,
+            latency_ms=REPLAY_LATENCY_MS,
+            seed=SYNTHETIC_SEED,
+            as_of=dt.datetime.strptime(AS_OF_DATE, "%Y-%m-%d").date()
+            if AS_OF_DATE
+            else None,
+        )
+    )
+
+
+def _today():
+    """Return the analysis date.
+
+    AS_OF_DATE wins if set, then the provider's own date (the recording date
+    in replay mode), otherwise the real current date.
+    """
+    if AS_OF_DATE:
+        return dt.datetime.strptime(AS_OF_DATE, "%Y-%m-%d").date()
+    return get_provider().as_of_date() or dt.date.today()
+
 
 # Cache directory for historical price data
 CACHE_DIR = os.path.join(basePath, "results", "cache", "prices")
@@ -188,6 +229,20 @@ try:
 except Exception:
     logger.debug("Unable to create cache directory %s", CACHE_DIR)
 
+# Negative cache for dead/delisted tickers: skip them for a backoff period that
+# doubles on every consecutive failure (hours)
+FAILURE_REGISTRY_FILE = os.path.join(basePath, "results", "cache", "failed_tickers.json")
+FAILURE_BACKOFF_HOURS = float(os.getenv("FAILURE_BACKOFF_HOURS", "24"))
+FAILURE_BACKOFF_MAX_HOURS = float(os.getenv("FAILURE_BACKOFF_MAX_HOURS", "336"))
+# registry changes are written in batches; flush() writes the rest
+_FAILURE_FLUSH_EVERY = 50
+
+# Wall-clock budget for batch_pipeline_full in seconds (0 = unlimited). With a
+# budget, tickers run in priority order (see batch_process.prioritized_tickers)
+# and whatever is left when it runs out is marked NOT PROCESSED
+BATCH_TIME_BUDGET_S = float(os.getenv("BATCH_TIME_BUDGET", "0"))
+BATCH_PRIORITY = os.getenv("BATCH_PRIORITY", "false").lower() in ("1", "true", "yes")
+
 
 def _to_epoch_seconds(val):
     """Convert a date/datetime/ISO date string or numeric value to epoch seconds (int).
@@ -251,6 +306,205 @@ def _cache_save(ticker, days, data):
         logger.debug("Cache save failed for %s", filepath, exc_info=True)
 
 
+class TickerFailureRegistry:
+    """Persistent negative cache for tickers whose history fetch keeps failing.
+
+    Each entry records the last failure reason, how many times in a row the
+    ticker failed and until when it should be skipped. The skip period starts at
+    `backoff_hours` and doubles on every consecutive failure, capped at
+    `max_backoff_hours`. A successful fetch removes the entry.
+    Set FAILURE_BACKOFF_HOURS=0 to disable skipping altogether.
+
+    Only "no price data" outcomes are recorded (transient fetch errors are
+    not), and at most once per ticker per run; `start_run` begins a new run.
+    Changes are written every _FAILURE_FLUSH_EVERY changes and on flush(),
+    which batch runs call when they finish (and atexit for the module one).
+    """
+
+    def __init__(
+        self,
+        path=FAILURE_REGISTRY_FILE,
+        backoff_hours=FAILURE_BACKOFF_HOURS,
+        max_backoff_hours=FAILURE_BACKOFF_MAX_HOURS,
+    ):
+        self.path = path
+        self.backoff_hours = backoff_hours
+        self.max_backoff_hours = max_backoff_hours
+        self._lock = threading.Lock()
+        self._entries = self._load()
+        self._failed_this_run = set()
+        self._unsaved = 0
+
+    def start_run(self):
+        """Forget which tickers already failed, so each can be recorded once more."""
+        with self._lock:
+            self._failed_this_run.clear()
+
+    def _load(self):
+        try:
+            if os.path.exists(self.path):
+                with open(self.path, "r") as f:
+                    return js.load(f)
+        except Exception:
+            logger.debug("Failure registry load failed for %s", self.path, exc_info=True)
+        return {}
+
+    def _changed(self):
+        """Count one change (caller holds the lock); write every few changes."""
+        self._unsaved += 1
+        if self._unsaved >= _FAILURE_FLUSH_EVERY:
+            self._save()
+
+    def flush(self):
+        """Write pending changes to disk."""
+        with self._lock:
+            if self._unsaved:
+                self._save()
+
+    def _save(self):
+        self._unsaved = 0
+        try:
+            tmp = self.path + ".tmp"
+            with open(tmp, "w") as f:
+                js.dump(self._entries, f, indent=2, sort_keys=True)
+            os.replace(tmp, self.path)
+        except Exception:
+            logger.debug("Failure registry save failed for %s", self.path, exc_info=True)
+
+    def backoff_for(self, count):
+        """Return the skip period in hours after `count` consecutive failures."""
+        if self.backoff_hours <= 0:
+            return 0
+        return min(self.backoff_hours * 2 ** max(count - 1, 0), self.max_backoff_hours)
+
+    def record_failure(self, ticker, reason):
+        ticker = str(ticker).upper()
+        now = time.time()
+        with self._lock:
+            if ticker in self._failed_this_run:
+                return
+            self._failed_this_run.add(ticker)
+            entry = self._entries.get(ticker, {"count": 0, "first_failed": now})
+            entry["count"] += 1
+            entry["reason"] = str(reason)
+            entry["last_failed"] = now
+            entry["retry_after"] = now + self.backoff_for(entry["count"]) * 3600.0
+            self._entries[ticker] = entry
+            self._changed()
+        logger.info(
+            "Recorded failure #%d for %s (%s); skipping for %.0fh",
+            entry["count"],
+            ticker,
+            reason,
+            self.backoff_for(entry["count"]),
+        )
+
+    def record_success(self, ticker):
+        ticker = str(ticker).upper()
+        with self._lock:
+            if self._entries.pop(ticker, None) is not None:
+                self._changed()
+                logger.info("Cleared failure record for %s", ticker)
+
+    def is_blocked(self, ticker, now=None):
+        if self.backoff_hours <= 0:
+            return False
+        entry = self._entries.get(str(ticker).upper())
+        if not entry:
+            return False
+        return (now or time.time()) < entry.get("retry_after", 0)
+
+    def get(self, ticker):
+        return self._entries.get(str(ticker).upper())
+
+    def partition(self, tickers):
+        """Split `tickers` into (to_process, skipped) keeping the input order."""
+        now = time.time()
+        kept, skipped = [], []
+        for ticker in tickers:
+            (skipped if self.is_blocked(ticker, now) else kept).append(ticker)
+        return kept, skipped
+
+
+FAILURE_REGISTRY = TickerFailureRegistry()
+atexit.register(FAILURE_REGISTRY.flush)
+
+
+def prefetch_price_history(tickers, days=HISTORICAL_DAYS_DEFAULT):
+    """Bulk-download `days` of prices for `tickers` in one provider call.
+
+    Returns {ticker: {"prices": [...]}} in the cookFinancials priceData
+    format, or None if the download failed. Non-empty histories are also
+    written to the price cache (when the provider uses it) and update the
+    failure registry, so this doubles as a cache warmer.
+    """
+    logger.info(
+        "Prefetching last %d days of historical price data concurrently for %d tickers",
+        days,
+        len(tickers),
+    )
+    try:
+        start_date = _today() - dt.timedelta(days=days)
+        end_date = _today()
+
+        # Bulk download for multiple tickers through the data provider
+        provider = get_provider()
+        hist_data = provider.download(tickers, start=start_date, end=end_date)
+
+        # Convert to expected format
+        price_map = {}
+        empty = []
+        for ticker in tickers:
+            try:
+                if len(tickers) > 1:
+                    ticker_data = hist_data[ticker]
+                else:
+                    ticker_data = hist_data
+
+                prices = []
+                for idx, row in ticker_data.iterrows():
+                    if pd.notna(row["Close"]):
+                        prices.append(
+                            {
+                                "formatted_date": idx.strftime("%Y-%m-%d"),
+                                "date": int(idx.timestamp()),
+                                "open": row["Open"],
+                                "high": row["High"],
+                                "low": row["Low"],
+                                "close": row["Close"],
+                                "volume": row["Volume"],
+                                "adjclose": row["Close"],
+                            }
+                        )
+                price_map[ticker] = {"prices": prices}
+                if prices:
+                    if provider.uses_price_cache:
+                        _cache_save(ticker, days, {ticker: {"prices": prices}})
+                    if not provider.is_offline:
+                        FAILURE_REGISTRY.record_success(ticker)
+                else:
+                    empty.append(ticker)
+            except Exception:
+                logger.debug(
+                    "Failed to process prefetch for %s", ticker, exc_info=True
+                )
+
+        # a download that returned nothing at all failed as a whole (outage,
+        # rate limit); only tickers missing from a working download are dead
+        if empty and len(empty) < len(tickers) and not provider.is_offline:
+            for ticker in empty:
+                FAILURE_REGISTRY.record_failure(
+                    ticker, "no price data returned by prefetch"
+                )
+
+        FAILURE_REGISTRY.flush()
+        logger.info("Prefetch complete")
+        return price_map
+    except Exception:
+        logger.exception("Prefetch failed; continuing without prefetch")
+        return None
+
+
 # yfinance is now imported at module level
 logger.info("yfinance successfully loaded.")
 
@@ -282,9 +536,12 @@ class cookFinancials:
     # define some parameters
 
     def __init__(self, ticker, priceData=None, fetch_days=None):
+        provider = get_provider()
+        # offline runs must not feed the live failure registry
+        failures = None if provider.is_offline else FAILURE_REGISTRY
         if isinstance(ticker, str):
             self.ticker = ticker.upper()
-            self.yf_ticker = yf.Ticker(self.ticker)
+            self.yf_ticker = provider.ticker(self.ticker)
         else:
             self.ticker = [t.upper() for t in ticker]
             self.yf_ticker = None  # Multiple tickers handled differently
@@ -293,7 +550,7 @@ class cookFinancials:
         # Determine how many days of history to fetch
         days = fetch_days if fetch_days is not None else HISTORICAL_DAYS_DEFAULT
 
-        date = dt.date.today()
+        date = _today()
 
         # If priceData is provided (e.g., from prefetch), use it
         if priceData:
@@ -304,9 +561,14 @@ class cookFinancials:
             else:
                 self.priceData = priceData
         else:
-            # try load cache
-            cached = _cache_load(self.ticker, days)
+            # try load cache (record/replay always go through the provider)
+            use_cache = provider.uses_price_cache
+            cached = None
+            if use_cache:
+                with METRICS.timer("cache_load", self.ticker):
+                    cached = _cache_load(self.ticker, days)
             if cached is not None:
+                METRICS.incr("cache_hit")
                 logger.info(
                     "Loaded cached historical price data for %s (last %d days)",
                     self.ticker,
@@ -327,7 +589,10 @@ class cookFinancials:
                     )
 
                     # Use yfinance to fetch historical data
-                    hist = self.yf_ticker.history(start=start_date, end=date)
+                    if use_cache:
+                        METRICS.incr("cache_miss")
+                    with METRICS.timer("fetch_history", self.ticker):
+                        hist = self.yf_ticker.history(start=start_date, end=date)
 
                     # Convert yfinance format to expected format
                     prices = []
@@ -347,8 +612,17 @@ class cookFinancials:
 
                     self.priceData = {self.ticker: {"prices": prices}}
                     logger.info("Fetched %d price points", len(prices))
-                    _cache_save(self.ticker, days, self.priceData)
+                    if prices:
+                        if use_cache:
+                            _cache_save(self.ticker, days, self.priceData)
+                        if failures:
+                            failures.record_success(self.ticker)
+                    elif failures:
+                        # yfinance returns an empty frame for delisted symbols
+                        failures.record_failure(self.ticker, "no price data returned")
                 except Exception:
+                    # network, DNS or rate-limit errors say nothing about the
+                    # symbol, so they are not recorded as ticker failures
                     logger.exception(
                         "Failed to fetch historical price data for %s", self.ticker
                     )
@@ -775,7 +1049,7 @@ class cookFinancials:
 
     def get_ma(self, date_from, date_to):
         if not (self.priceData):
-            date = dt.date.today()
+            date = _today()
             start_date = date - dt.timedelta(days=365)
             start_ts = _to_epoch_seconds(start_date)
             end_ts = _to_epoch_seconds(date)
@@ -830,7 +1104,7 @@ class cookFinancials:
             bool: True if today's close is the lowest in the lookback period
         """
         if date is None:
-            date = dt.date.today()
+            date = _today()
         
         try:
             if not self.priceData:
@@ -875,7 +1149,7 @@ class cookFinancials:
             bool: True if today's close is the highest in the lookback period
         """
         if date is None:
-            date = dt.date.today()
+            date = _today()
         
         try:
             if not self.priceData:
@@ -920,7 +1194,7 @@ class cookFinancials:
             EMA value or -1 if insufficient data
         """
         if not (self.priceData):
-            date_now = dt.date.today()
+            date_now = _today()
             start_date = date_now - dt.timedelta(days=365)
             start_ts = _to_epoch_seconds(start_date)
             end_ts = _to_epoch_seconds(date_now)
@@ -975,7 +1249,7 @@ class cookFinancials:
             RSI > 70 = Overbought (potential sell)
         """
         if not self.priceData:
-            date_now = dt.date.today()
+            date_now = _today()
             start_date = date_now - dt.timedelta(days=365)
             start_ts = _to_epoch_seconds(start_date)
             end_ts = _to_epoch_seconds(date_now)
@@ -1039,7 +1313,7 @@ class cookFinancials:
             tuple: (macd_line, signal_line, histogram) or (None, None, None) if insufficient data
         """
         if not self.priceData:
-            date_now = dt.date.today()
+            date_now = _today()
             start_date = date_now - dt.timedelta(days=365)
             start_ts = _to_epoch_seconds(start_date)
             end_ts = _to_epoch_seconds(date_now)
@@ -1087,7 +1361,7 @@ class cookFinancials:
             ATR value or -1 if insufficient data
         """
         if not self.priceData:
-            date_now = dt.date.today()
+            date_now = _today()
             start_date = date_now - dt.timedelta(days=365)
             start_ts = _to_epoch_seconds(start_date)
             end_ts = _to_epoch_seconds(date_now)
@@ -1165,7 +1439,7 @@ class cookFinancials:
             Tuple (bool, dict): (True/False, details dict with prices, EMAs, and reasons)
         """
         try:
-            date = dt.date.today()
+            date = _today()
 
             # Get current price
             if not self.current_stickerPrice:
@@ -1290,13 +1564,13 @@ class cookFinancials:
         """Check if 200 SMA is trending up over the last 30 days (Minervini criteria).
         Returns 1 if trending up, -1 otherwise.
         """
-        current = self.get_ma_200((dt.date.today()))
+        current = self.get_ma_200((_today()))
         if current == -1:
             return -1
-        mid = self.get_ma_200((dt.date.today() - dt.timedelta(days=15)))
+        mid = self.get_ma_200((_today() - dt.timedelta(days=15)))
         if mid == -1:
             return -1
-        last = self.get_ma_200((dt.date.today() - dt.timedelta(days=30)))
+        last = self.get_ma_200((_today() - dt.timedelta(days=30)))
         if last == -1:
             return -1
         # All three points must show uptrend
@@ -1311,7 +1585,7 @@ class cookFinancials:
         Returns: (meets_required, meets_preferred)
         """
         try:
-            date = dt.date.today()
+            date = _today()
 
             # Get all moving averages
             ma_50 = self.get_ma_50(date)
@@ -1347,7 +1621,7 @@ class cookFinancials:
 
     def get_30day_trend(self):
         if not (self.priceData):
-            date = dt.date.today()
+            date = _today()
             start_date = date - dt.timedelta(days=365)
             start_ts = _to_epoch_seconds(start_date)
             end_ts = _to_epoch_seconds(date)
@@ -1356,7 +1630,7 @@ class cookFinancials:
         # get 30 days data
         price30Structure = self.get_price_from_buffer(
             self.priceData[self.ticker]["prices"],
-            dt.date.today() - dt.timedelta(days=30),
+            _today() - dt.timedelta(days=30),
             30,
         )
         price30 = [item["close"] for item in price30Structure]
@@ -1374,7 +1648,7 @@ class cookFinancials:
         - 200 SMA trending up for at least 1 month
         """
         if not (self.priceData):
-            date = dt.date.today()
+            date = _today()
             start_date = date - dt.timedelta(days=365)
             start_ts = _to_epoch_seconds(start_date)
             end_ts = _to_epoch_seconds(date)
@@ -1387,7 +1661,7 @@ class cookFinancials:
             logger.warning("mv_strategy: No current price for %s", self.ticker)
             return -1
 
-        date = dt.date.today()
+        date = _today()
         price50 = self.get_ma_50(date)
         price150 = self.get_ma_150(date)
         price200 = self.get_ma_200(date)
@@ -1428,7 +1702,7 @@ class cookFinancials:
         return 1
 
     def get_vol(self, checkDays, avrgDays):
-        date = dt.date.today()
+        date = _today()
         vol3day = []
         vol50day = []
         if not self.priceData:
@@ -1535,7 +1809,7 @@ class cookFinancials:
     def price_strategy(self):
         closePrice = []
         if not (self.priceData):
-            date = dt.date.today()
+            date = _today()
             start_date = date - dt.timedelta(days=365)
             start_ts = _to_epoch_seconds(start_date)
             end_ts = _to_epoch_seconds(date)
@@ -1610,7 +1884,7 @@ class cookFinancials:
     def get_price_from_buffer(self, priceDataStruct, startDate, frame):
         selectedPriceDataStruct = []
         ##for each date
-        currentDate = dt.date.today()
+        currentDate = _today()
         dateList = []
         i = 0
         while True:
@@ -1630,7 +1904,7 @@ class cookFinancials:
     def get_price_from_buffer_start_end(self, priceDataStruct, startDate, endDate):
         selectedPriceDataStruct = []
         ##for each date
-        currentDate = dt.date.today()
+        currentDate = _today()
         dateList = []
         i = 0
         while True:
@@ -1648,7 +1922,7 @@ class cookFinancials:
     def get_price(self, startDate, frame):
         to_date = startDate + dt.timedelta(frame)
         if not (self.priceData):
-            date = dt.date.today()
+            date = _today()
             start_date = date - dt.timedelta(days=365)
             start_ts = _to_epoch_seconds(start_date)
             end_ts = _to_epoch_seconds(date)
@@ -1664,7 +1938,7 @@ class cookFinancials:
     def get_price_ref(self, startDate, frame):
         to_date = startDate + dt.timedelta(frame)
         if not (self.priceData):
-            date = dt.date.today()
+            date = _today()
             start_date = date - dt.timedelta(days=365)
             start_ts = _to_epoch_seconds(start_date)
             end_ts = _to_epoch_seconds(date)
@@ -1705,7 +1979,7 @@ class cookFinancials:
     def find_one_contraction(self, startDate):
         print("start searching date")
         print(startDate)
-        date = dt.date.today()
+        date = _today()
         tmp = date - startDate
         numOfDate = tmp.days
         localHighestPrice = -float("inf")
@@ -1807,7 +2081,7 @@ class cookFinancials:
     def get_footPrint(self):
         flag = False
         if not (self.m_recordVCP):
-            date_from = dt.date.today() - dt.timedelta(days=60)
+            date_from = _today() - dt.timedelta(days=60)
             self.find_volatility_contraction_pattern(date_from)
         length = len(self.m_recordVCP)
         self.m_footPrint = []
@@ -1893,7 +2167,7 @@ class cookFinancials:
 
         # Load price data if not already loaded
         if not self.priceData:
-            date = dt.date.today()
+            date = _today()
             start_date = date - dt.timedelta(days=365)
             start_ts = _to_epoch_seconds(start_date)
             end_ts = _to_epoch_seconds(date)
@@ -1969,7 +2243,7 @@ class cookFinancials:
 
     def _calculate_historical_average_volume(self, priceDataStruct, days):
         """Calculates the average volume over the last 'days' period."""
-        end_date = dt.date.today()
+        end_date = _today()
         start_date = end_date - dt.timedelta(days=days)
         historical_data = self.get_price_from_buffer_start_end(
             priceDataStruct, start_date, end_date
@@ -2053,7 +2327,7 @@ class cookFinancials:
                 return False
             
             # 4. REQUIRED: Price above 200 SMA (basic trend filter)
-            date = dt.date.today()
+            date = _today()
             price200 = self.get_ma_200(date)
             
             if price200 == -1:
@@ -2109,7 +2383,17 @@ class batch_process:
     resultsPath = ""
     result_file = ""
 
-    def __init__(self, tickers, sectors, market=None):
+    def __init__(
+        self,
+        tickers,
+        sectors,
+        market=None,
+        skip_failed=True,
+        results_dir=None,
+        resume=None,
+        shard=None,
+        universe=None,
+    ):
         """
         Initialize batch processing.
 
@@ -2118,6 +2402,18 @@ class batch_process:
             sectors (str): Sector name for results file naming
             market (str): Optional market to use custom tickers ('US', 'UK', 'BOTH').
                          If provided, tickers parameter will be overridden
+            skip_failed (bool): Drop tickers that are still in their failure backoff
+                         period (see TickerFailureRegistry) before any fetching starts
+            results_dir (str): Optional output folder; defaults to results/<date>
+            resume (bool): Continue an interrupted run from its run manifest,
+                         keeping finished tickers; defaults to BATCH_RESUME
+            shard (str|tuple): "k/N" or (k, N): only process the k-th of N hash
+                         partitions of the tickers, writing into
+                         <results>/shards/shard-k-of-N (see merge_shards);
+                         defaults to BATCH_SHARD
+            universe (str): Name of the universe snapshot this run records; defaults
+                         to `sectors` without file extension and dates (see
+                         cookstock_universe.universe_name)
         """
         # Import here to avoid circular imports
         from get_tickers import get_custom_tickers
@@ -2129,11 +2425,82 @@ class batch_process:
         else:
             self.tickers = tickers
 
-        basePath = find_path()
-        current_date = dt.date.today().strftime("%Y-%m-%d")
-        self.resultsPath = os.path.join(basePath, "results", current_date)
+        # Position of every ticker in the full list; outputs are ordered by it
+        # so resumed and sharded runs merge back into the same order
+        self.ticker_index = {}
+        for i, t in enumerate(self.tickers):
+            self.ticker_index.setdefault(t, i)
+        self.shard = parse_shard(BATCH_SHARD if shard is None else shard)
+        if self.shard:
+            k, n = self.shard
+            self.tickers = shard_tickers(self.tickers, k, n)
+            logger.info(
+                "Shard %d of %d: %d of %d tickers",
+                k,
+                n,
+                len(self.tickers),
+                len(self.ticker_index),
+            )
+
+        # Prune known dead/delisted tickers so we don't pay their timeouts again
+        self.skipped_tickers = []
+        FAILURE_REGISTRY.start_run()
+        if skip_failed and not get_provider().is_offline:
+            self.tickers, self.skipped_tickers = FAILURE_REGISTRY.partition(
+                self.tickers
+            )
+            if self.skipped_tickers:
+                logger.info(
+                    "Skipping %d ticker(s) in failure backoff: %s",
+                    len(self.skipped_tickers),
+                    self.skipped_tickers,
+                )
+
+        if results_dir:
+            self.resultsPath = results_dir
+        else:
+            current_date = _today().strftime("%Y-%m-%d")
+            self.resultsPath = os.path.join(basePath, "results", current_date)
+        self.universe = None
+        # only real runs into results/<date> feed the universe history that
+        # runBatch_warmUniverse reads; offline data and custom output folders
+        # (benchmarks, golden and synthetic runs) would record fake diffs
+        if UNIVERSE_SNAPSHOTS and not results_dir and not get_provider().is_offline:
+            # the full requested list (before sharding and failure pruning),
+            # diffed against the previous run's snapshot
+            try:
+                self.universe = UniverseSnapshots(
+                    os.path.join(basePath, "results", "universe")
+                ).record(universe or universe_name(sectors), self.ticker_index, _today())
+            except Exception:
+                logger.warning("Could not record the universe snapshot", exc_info=True)
+        if self.shard:
+            self.resultsPath = os.path.join(
+                self.resultsPath, "shards", shard_dirname(*self.shard)
+            )
         file = sectors + ".json"
         self.result_file = setup_result_file(self.resultsPath, file)
+        self.manifest = RunManifest(os.path.join(self.resultsPath, RUN_MANIFEST_NAME))
+        self.resume = BATCH_RESUME if resume is None else resume
+        self.completed = {}
+        if self.resume:
+            header, records = self.manifest.load()
+            if header.get("tickers") and header["tickers"] != list(self.tickers):
+                logger.warning(
+                    "Resuming with a different ticker list than the checkpointed run"
+                )
+            # timeouts are retried; only fully written tickers count as done
+            self.completed = {
+                t: r for t, r in records.items() if r.get("status") == "ok"
+            }
+            if not header:
+                header = {"sectors": sectors, "tickers": list(self.tickers)}
+            self.manifest.rewrite(header, self.completed.values())
+            logger.info(
+                "Resuming run: %d of %d tickers already complete",
+                len(self.completed),
+                len(self.tickers),
+            )
         # Setup market-specific CSV files with __ prefix to sort at top
         self.csv_files = {
             "US": os.path.join(self.resultsPath, "__result_US.csv"),
@@ -2160,6 +2527,13 @@ class batch_process:
                 logger.info("Reset CSV file for active market: %s", market)
             else:
                 setup_csv_file_if_not_exists(csv_file)  # Only create if doesn't exist
+
+        if self.resume:
+            # rebuild outputs from the checkpoint; rows written after the last
+            # checkpointed ticker (interrupted mid-write) are dropped
+            self._restore_outputs()
+        else:
+            self.manifest.start(self.tickers, sectors, self.shard)
         
         for market, img_folder in self.image_folders.items():
             os.makedirs(img_folder, exist_ok=True)
@@ -2171,6 +2545,21 @@ class batch_process:
             list(self.csv_files.values()),
         )
 
+    def _restore_outputs(self):
+        """Rewrite the JSON result file and CSVs from the checkpointed tickers."""
+        import csv
+
+        done = sorted(self.completed.values(), key=lambda r: r.get("index", 0))
+        save_json(self.result_file, {"data": [r["json"] for r in done if r.get("json")]})
+        rows = {}
+        for r in done:
+            rows.setdefault(r.get("market", "US"), []).append(r["csv_row"])
+        for market, market_rows in rows.items():
+            csv_file = self.csv_files.get(market, self.csv_files["US"])
+            with open(csv_file, "a", newline="") as f:
+                csv.writer(f).writerows(market_rows)
+        logger.info("Restored %d checkpointed tickers into outputs", len(done))
+
     def batch_strategy(self):
         superStock = []
         total = np.size(self.tickers)
@@ -2207,353 +2596,642 @@ class batch_process:
             time.time() - start_time,
         )
 
-    def batch_pipeline_full(self):
+    def batch_pipeline_full(self, time_budget=None, prioritize=None):
+        """Run the full per-ticker pipeline and write JSON/CSV/chart outputs.
+
+        time_budget: seconds the run may take (default BATCH_TIME_BUDGET, 0 =
+            unlimited). Tickers not started in time get a NOT PROCESSED row.
+        prioritize: process tickers in prioritized_tickers() order; defaults
+            to BATCH_PRIORITY, and to True whenever a time budget is set.
+        """
         superStock = []
         total = np.size(self.tickers)
-        date_from = dt.date.today() - dt.timedelta(days=100)
-        date_to = dt.date.today()
+        time_budget = BATCH_TIME_BUDGET_S if time_budget is None else time_budget
+        if prioritize is None:
+            prioritize = BATCH_PRIORITY or time_budget > 0
+        date_from = _today() - dt.timedelta(days=100)
+        date_to = _today()
         start_time = time.time()
+        METRICS.reset()
+        PROFILER.begin_run(os.path.join(self.resultsPath, "profile"))
         logger.info("Starting batch_pipeline_full for %d tickers", total)
 
         # Optionally prefetch historical price data for the entire batch (concurrent)
         price_map = None
         if PREFETCH_ENABLED and total > 1:
-            try:
-                days = HISTORICAL_DAYS_DEFAULT
-                logger.info(
-                    "Prefetching last %d days of historical price data concurrently for %d tickers",
-                    days,
-                    total,
-                )
-                try:
-                    start_date = dt.date.today() - dt.timedelta(days=days)
-                    end_date = dt.date.today()
-
-                    # Use yfinance download for multiple tickers
-                    hist_data = yf.download(
-                        self.tickers,
-                        start=start_date,
-                        end=end_date,
-                        group_by="ticker",
-                        progress=False,
-                    )
-
-                    # Convert to expected format
-                    price_map = {}
-                    for ticker in self.tickers:
-                        try:
-                            if len(self.tickers) > 1:
-                                ticker_data = hist_data[ticker]
-                            else:
-                                ticker_data = hist_data
-
-                            prices = []
-                            for idx, row in ticker_data.iterrows():
-                                if pd.notna(row["Close"]):
-                                    prices.append(
-                                        {
-                                            "formatted_date": idx.strftime("%Y-%m-%d"),
-                                            "date": int(idx.timestamp()),
-                                            "open": row["Open"],
-                                            "high": row["High"],
-                                            "low": row["Low"],
-                                            "close": row["Close"],
-                                            "volume": row["Volume"],
-                                            "adjclose": row["Close"],
-                                        }
-                                    )
-                            price_map[ticker] = {"prices": prices}
-                            _cache_save(ticker, days, {ticker: {"prices": prices}})
-                        except Exception:
-                            logger.debug(
-                                "Failed to process prefetch for %s",
-                                ticker,
-                                exc_info=True,
-                            )
-
-                    logger.info("Prefetch complete")
-                except Exception:
-                    logger.exception("Prefetch failed; continuing without prefetch")
-                    price_map = None
-            except Exception:
-                logger.debug("Prefetch decision failed", exc_info=True)
-
-        for idx in range(total):
-            try:
-                ticker = self.tickers[idx]
-                logger.info("Processing %d/%d: %s", idx + 1, total, ticker)
-                # start a heartbeat thread so we get periodic "still processing" logs
-                start_t = time.time()
-                heartbeat = _start_heartbeat(ticker, interval=30)
-                try:
-                    logger.info("Starting pipeline for %s", ticker)
-                    t0 = time.time()
-                    # If we have a prefetch price_map, pass it in to avoid per-ticker downloads
-                    if price_map:
-                        x = cookFinancials(
-                            ticker,
-                            priceData=price_map,
-                            fetch_days=HISTORICAL_DAYS_DEFAULT,
-                        )
-                    else:
-                        x = cookFinancials(ticker)
-
-                    # Get current price first for CSV output (needed for all tickers)
-                    if not x.current_stickerPrice:
-                        x.current_stickerPrice = x.get_current_price()
-                    currentPrice = x.current_stickerPrice
-
-                    # Check for swing trade entry signal (for all tickers)
-                    isSwingEntry, swingDetails = x.is_swing_trade_entry()
-                    logger.info("swing_trade_entry=%s for %s", isSwingEntry, ticker)
-
-                    # Try to get basic pivot data (for all tickers)
-                    try:
-                        # Run VCP analysis to get pivot data
-                        counter, record = x.find_volatility_contraction_pattern(
-                            date_from
-                        )
-                        footprint = x.get_footPrint()
-                        isGoodPivot, currentPrice, supportPrice, pressurePrice = (
-                            x.is_pivot_good()
-                        )
+            t_prefetch = time.perf_counter()
+            price_map = prefetch_price_history(self.tickers)
+            METRICS.observe("prefetch", time.perf_counter() - t_prefetch)
+
+        # checkpointed tickers of a resumed run are already in the outputs
+        superStock.extend(t for t, r in self.completed.items() if r.get("flag"))
+        order = self.prioritized_tickers() if prioritize else list(self.tickers)
+        deadline_at = start_time + time_budget if time_budget > 0 else None
+        staged = PIPELINE_MODE == "staged"
+        if staged and PROFILER.enabled:
+            # cProfile follows a single thread; profile tickers one at a time
+            logger.info("Profiling enabled; running the pipeline sequentially")
+            staged = False
+        watchdog = TickerWatchdog(total - len(self.completed)).start()
+        try:
+            run = self._run_staged if staged else self._run_sequential
+            not_processed = run(order, price_map, date_from, deadline_at, watchdog, superStock)
+        finally:
+            watchdog.stop()
+            FAILURE_REGISTRY.flush()
+        if not_processed:
+            logger.warning(
+                "Time budget of %.0fs used up; %d ticker(s) not processed",
+                time_budget,
+                len(not_processed),
+            )
+        for ticker in not_processed:
+            self._write_status(
+                ticker, "not_processed", "NOT PROCESSED", "time budget exhausted"
+            )
+        METRICS.incr("tickers_not_processed", len(not_processed))
+        self.not_processed_tickers = not_processed
+        self.timed_out_tickers = watchdog.timed_out
+        if self.timed_out_tickers:
+            logger.warning(
+                "%d ticker(s) timed out: %s",
+                len(self.timed_out_tickers),
+                self.timed_out_tickers,
+            )
+        logger.info(
+            "batch_pipeline_full finished; candidates=%d, elapsed=%.2fs",
+            len(superStock),
+            time.time() - start_time,
+        )
 
-                        if (
-                            currentPrice is None
-                            or supportPrice is None
-                            or pressurePrice is None
-                        ):
-                            # Use fallback values if pivot analysis fails
-                            supportPrice = currentPrice if currentPrice else 0
-                            pressurePrice = currentPrice if currentPrice else 0
-                            isGoodPivot = False
-
-                        isDeepCor = x.is_correction_deep()
-                        (
-                            isDemandDry,
-                            startDate,
-                            endDate,
-                            volume_ls,
-                            slope,
-                            interY,
-                            recentStart,
-                            recentEnd,
-                            volume_re,
-                            slopeRecet,
-                            interYRecent,
-                        ) = x.is_demand_dry()
-                    except Exception:
-                        logger.exception(
-                            "Error in analysis for %s, using defaults", ticker
-                        )
-                        supportPrice = currentPrice if currentPrice else 0
-                        pressurePrice = currentPrice if currentPrice else 0
-                        isGoodPivot = False
-                        isDeepCor = False
-                        isDemandDry = False
-                        counter = 0
-                        volume_ls = []
-                        volume_re = []
-
-                    # Initialize figName
-                    figName = ""
-
-                    # Create charts for all tickers (moved outside combined_best_strategy check)
-                    t1 = time.time()
-                    sp = x.get_price(date_from, 100)
-                    logger.info(
-                        "get_price for %s finished in %.2fs", ticker, time.time() - t1
-                    )
-                    tmpLen = len(sp)
-                    date = []
-                    price = []
-                    volume = []
-                    for i in range(tmpLen):
-                        date.append(sp[i]["formatted_date"])
-                        price.append(sp[i]["close"])
-                        volume.append(sp[i]["volume"])
-
-                    # create figure and axis objects with subplots()
-                    fig, ax = plt.subplots(2)
-                    fig.suptitle(x.ticker)
-                    # make a plot
-                    ax[0].plot(date, price, color="blue", marker="o")
-                    # set x-axis label
-                    ax[0].set_xlabel("date", fontsize=14)
-                    # set y-axis label
-                    ax[0].set_ylabel("stock price", color="blue", fontsize=14)
-
-                    # twin object for two different y-axis on the sample plot
-                    # make a plot with different y-axis using second axis object
-                    ax[1].bar(date, np.asarray(volume) / 10**6, color="green")
-                    ax[1].set_ylabel("volume (m)", color="green", fontsize=14)
-
-                    # Set x-ticks to display every 10th date and include the last date
-                    xticks = np.arange(0, len(date), 10).tolist()
-                    if (
-                        len(date) - 1 not in xticks
-                    ):  # Check if the last date is already included
-                        xticks.append(
-                            len(date) - 1
-                        )  # Add the last date index to x-ticks
-
-                    ax[0].set_xticks(xticks)
-                    ax[1].set_xticks(xticks)
-
-                    # Format date labels for readability
-                    fig.autofmt_xdate(rotation=45)
+        # Sort all CSV files by Buy Signal
+        for market, csv_file in self.csv_files.items():
+            sort_csv_by_buy_signal(csv_file)
+        logger.info("CSV files sorted by Buy Signal")
+        METRICS.write_summary(os.path.join(self.resultsPath, "metrics.json"))
+        PROFILER.write_report()
 
-                    logger.info(
-                        "Highest in 5 days for %s: %s",
-                        ticker,
-                        x.get_highest_in5days(date_from),
-                    )
+    def prioritized_tickers(self):
+        """Tickers ordered by priority tier, list order kept within a tier.
 
-                    # Create ticker data for JSON
-                    ticker_data = {
-                        ticker: {
-                            "current price": str(currentPrice),
-                            "support price": str(supportPrice),
-                            "pressure price": str(pressurePrice),
-                            "is_good_pivot": str(isGoodPivot),
-                            "is_deep_correction": str(isDeepCor),
-                            "is_demand_dry": str(isDemandDry),
-                            "swing_trade_entry": str(isSwingEntry),
-                            "ema_8": str(swingDetails.get("ema_8", "N/A")),
-                            "sma_200": str(swingDetails.get("sma_200", "N/A")),
-                        }
-                    }
+        Tier 0: VCP Buy or Final Signal YES in the previous day's CSVs.
+        Tier 1: passed the combined (stage-2) strategy in the previous day's
+                JSON result file.
+        Tier 2: everything else.
+        """
+        import csv
 
-                    # Plot VCP patterns if found
-                    if counter > 0:
-                        logger.info("Found %d VCP pattern(s) for %s", counter, ticker)
-                        for i in range(counter):
-                            ax[0].plot(
-                                [record[i][0], record[i][2]],
-                                [record[i][1], record[i][3]],
-                                "r",
-                            )
-
-                        # Plot volume trend lines if we have the data
-                        if volume_ls:
-                            for ind, item in enumerate(date):
-                                if item == startDate:
-                                    logger.info(
-                                        "start index for demand dry for %s: %d",
-                                        ticker,
-                                        ind,
-                                    )
-                                    break
-
-                            x_axis = []
-                            for i in range(len(volume_ls)):
-                                x_axis.append(ind + i)
-                            x_axis = np.array(x_axis)
-
-                            y = slope * x_axis - slope * ind + volume_ls[0]
-                            ax[1].plot(
-                                np.asarray(date)[x_axis],
-                                y / 10**6,
-                                color="red",
-                                linewidth=4,
-                            )
-
-                            if volume_re:
-                                for ind, item in enumerate(date):
-                                    if item == recentStart:
-                                        logger.info(
-                                            "recent start index for %s: %d", ticker, ind
-                                        )
-                                        break
-
-                                x_axis = []
-                                for i in range(len(volume_re)):
-                                    x_axis.append(ind + i)
-                                x_axis = np.array(x_axis)
-                                yRecent = (
-                                    slopeRecet * x_axis
-                                    - slopeRecet * ind
-                                    + volume_re[0]
-                                )
-                                ax[1].plot(
-                                    np.asarray(date)[x_axis],
-                                    yRecent / 10**6,
-                                    color="red",
-                                    linewidth=4,
-                                )
+        results_dir = os.path.dirname(self.result_file)
+        hot, stage2 = set(), set()
+        for csv_file in self.csv_files.values():
+            previous = find_previous_results_file(
+                results_dir, os.path.basename(csv_file)
+            )
+            if not previous:
+                continue
+            try:
+                with open(previous, "r", newline="") as f:
+                    for row in csv.DictReader(f):
+                        if "YES" in (row.get("VCP Buy"), row.get("Final Signal")):
+                            hot.add(row["Ticker"])
+            except Exception:
+                logger.debug("Could not read %s for priorities", previous, exc_info=True)
+        previous = find_previous_results_file(
+            results_dir, os.path.basename(self.result_file)
+        )
+        if previous:
+            try:
+                for entry in load_json(previous).get("data", []):
+                    for t, details in entry.items():
+                        if str(details.get("combined_strategy")) == "True":
+                            stage2.add(t)
+            except Exception:
+                logger.debug("Could not read %s for priorities", previous, exc_info=True)
 
-                    fig.show()
+        def tier(t):
+            return 0 if t in hot else 1 if t in stage2 else 2
 
-                    # Determine market and use market-specific image folder
-                    market = get_ticker_market(ticker)
-                    img_folder = self.image_folders.get(
-                        market, self.image_folders["US"]
-                    )
-                    figName = os.path.join(img_folder, ticker + ".jpg")
-                    # Save chart for all stocks with VCP patterns OR meeting buy criteria
-                    if counter > 0 or (isGoodPivot and not (isDeepCor) and isDemandDry):
-                        fig.savefig(
-                            figName, format="jpeg", dpi=100, bbox_inches="tight"
-                        )
-                        logger.info("Saved figure %s", figName)
-                        ticker_data[ticker]["fig"] = figName
-                    else:
-                        figName = (
-                            ""  # No chart saved if no VCP and doesn't meet criteria
-                        )
+        order = sorted(self.tickers, key=tier)
+        logger.info(
+            "Priority order: %d signal, %d stage-2, %d other ticker(s)",
+            sum(t in hot for t in self.tickers),
+            sum(t in stage2 and t not in hot for t in self.tickers),
+            sum(tier(t) == 2 for t in self.tickers),
+        )
+        return order
 
-                    # Add to JSON for all tickers
-                    append_to_json(self.result_file, ticker_data)
+    def _write_status(self, ticker, status, label, detail):
+        """Write a placeholder CSV row for a ticker without result and checkpoint it."""
+        market = get_ticker_market(ticker)
+        csv_file = self.csv_files.get(market, self.csv_files["US"])
+        row = append_status_to_csv(csv_file, ticker, label, detail)
+        self.manifest.record(
+            {
+                "ticker": ticker,
+                "index": self.ticker_index.get(ticker, 0),
+                "status": status,
+                "market": market,
+                "csv_row": row,
+            }
+        )
 
-                    # Check combined strategy for superStock tracking
-                    flag = x.combined_best_strategy()
-                    logger.info(
-                        "combined_best_strategy for %s: %s (finished in %.2fs)",
+    def _run_sequential(self, order, price_map, date_from, deadline_at, watchdog, superStock):
+        """Process tickers one at a time; return those left when the budget ran out."""
+        total = np.size(self.tickers)
+        for idx, ticker in enumerate(order):
+            if ticker in self.completed:
+                continue
+            ticker_deadline = None
+            if deadline_at is not None:
+                remaining = deadline_at - time.time()
+                if remaining <= 0:
+                    return [t for t in order[idx:] if t not in self.completed]
+                # a ticker must not run past the end of the budget
+                ticker_deadline = remaining
+                if watchdog.deadline > 0:
+                    ticker_deadline = min(watchdog.deadline, remaining)
+            try:
+                logger.info("Processing %d/%d: %s", idx + 1, total, ticker)
+                start_t = time.time()
+                watchdog.begin(ticker)
+                profile = None
+                try:
+                    # fetch + analysis run under the watchdog deadline
+                    x, analysis, profile = watchdog.run(
                         ticker,
-                        flag,
-                        time.time() - t0,
+                        self._fetch_and_analyze,
+                        ticker,
+                        price_map,
+                        date_from,
+                        deadline=ticker_deadline,
+                    )
+                    PROFILER.resume(profile)
+                    ticker_data = self._render_chart(x, analysis, date_from)
+                    self._write_ticker(
+                        self.ticker_index.get(ticker, idx), x, analysis, ticker_data
                     )
-                    if flag == True:
+                    if analysis["flag"] == True:
                         logger.info("%s passes combined strategy", ticker)
                         superStock.append(ticker)
-
-                    # Write to CSV for ALL tickers (after chart generation for passing stocks)
-                    market = get_ticker_market(ticker)
-                    csv_file = self.csv_files.get(market, self.csv_files["US"])
-                    append_to_csv(
-                        csv_file,
-                        ticker,
-                        currentPrice if currentPrice else 0,
-                        supportPrice,
-                        pressurePrice,
-                        isGoodPivot,
-                        isDeepCor,
-                        isDemandDry,
-                        isSwingEntry,
-                        ticker_obj=x,
-                        swing_details=swingDetails,
-                    )
+                    METRICS.incr("tickers_ok")
                 finally:
-                    # stop heartbeat and log per-ticker total elapsed
-                    heartbeat.set()
+                    PROFILER.stop(ticker, profile)
+                    watchdog.finish(ticker)
+                    METRICS.observe("ticker", time.time() - start_t, ticker)
                     logger.info(
                         "Processing complete for %s; elapsed=%.2fs",
                         ticker,
                         time.time() - start_t,
                     )
+            except TickerTimeoutError as e:
+                METRICS.incr("tickers_timeout")
+                # the abandoned worker still holds this ticker's profile
+                PROFILER.discard(ticker)
+                self._write_status(ticker, "timeout", "TIMEOUT", f"no result: {e}")
             except Exception:
+                METRICS.incr("tickers_failed")
+                # a fetch/analysis error never reached PROFILER.stop
+                PROFILER.discard(ticker, "failed")
                 logger.exception("Error processing ticker %s", ticker)
                 pass
+        return []
+
+    def _run_staged(self, order, price_map, date_from, deadline_at, watchdog, superStock):
+        """Process tickers through fetch -> compute -> render thread pools.
+
+        Network fetches, indicator/VCP/signal computation and chart rendering
+        overlap across tickers. Stages are joined by bounded queues and at
+        most `window` tickers are in flight, so a slow stage throttles the
+        feeder instead of buffering the whole batch. The calling thread is the
+        only writer: it takes results in `order`, which keeps JSON/CSV output
+        and the manifest identical to a sequential run, and enforces the
+        per-ticker deadline and time budget. Returns the tickers left when the
+        budget ran out.
+        """
+        total = np.size(self.tickers)
+
+        def budget_left():
+            return deadline_at is None or time.time() < deadline_at
+
+        def fetch(item):
+            if not budget_left():
+                item.status = "not_processed"
+                return False
+            logger.info("Processing %d/%d: %s", item.idx + 1, total, item.ticker)
+            item.started = time.time()
+            watchdog.begin(item.ticker)
+            item.x = self._fetch_ticker(item.ticker, price_map)
+            return True
+
+        def compute(item):
+            item.analysis = self._analyze_ticker(item.x, date_from)
+            with METRICS.timer("csv_row", item.ticker):
+                item.row = self._build_row(item.x, item.analysis)
+            return True
+
+        def render(item):
+            item.ticker_data = self._render_chart(item.x, item.analysis, date_from)
+            return True
+
+        qsize = max(1, PIPELINE_QUEUE_SIZE)
+        fetch_q, compute_q, render_q = (queue.Queue(qsize) for _ in range(3))
+        stages = [
+            _PipelineStage("fetch", fetch, fetch_q, compute_q, PIPELINE_FETCH_THREADS),
+            _PipelineStage("compute", compute, compute_q, render_q, 1),
+            _PipelineStage("render", render, render_q, None, PIPELINE_RENDER_WORKERS),
+        ]
+        window = threading.Semaphore(sum(s.size for s in stages) + 3 * qsize)
+        in_order = queue.Queue()
+        left_over = []
+
+        def feed():
+            for idx, ticker in enumerate(order):
+                if ticker in self.completed:
+                    continue
+                window.acquire()
+                if not budget_left():
+                    left_over.extend(t for t in order[idx:] if t not in self.completed)
+                    break
+                item = _PipelineItem(ticker, idx)
+                in_order.put(item)
+                fetch_q.put(item)
+            in_order.put(None)
+
         logger.info(
-            "batch_pipeline_full finished; candidates=%d, elapsed=%.2fs",
-            len(superStock),
-            time.time() - start_time,
+            "Staged pipeline: %d fetch, %d compute, %d render thread(s), queue size %d",
+            *(s.size for s in stages),
+            qsize,
         )
+        for stage in stages:
+            stage.start()
+        feeder = threading.Thread(target=feed, name="pipeline-feeder", daemon=True)
+        feeder.start()
+        not_processed = []
+        try:
+            while True:
+                item = in_order.get()
+                if item is None:
+                    break
+                try:
+                    self._write_staged_item(item, watchdog, deadline_at, superStock, not_processed)
+                finally:
+                    window.release()
+        finally:
+            for stage in stages:
+                stage.stop()
+        feeder.join()
+        return not_processed + left_over
+
+    def _write_staged_item(self, item, watchdog, deadline_at, superStock, not_processed):
+        """Wait for `item` within its deadline and write it (writer side of _run_staged)."""
+        ticker = item.ticker
+        finished = self._await_item(item, watchdog.deadline, deadline_at)
+        if item.status == "not_processed":
+            not_processed.append(ticker)
+            return
+        try:
+            try:
+                if not finished:
+                    limit = item.elapsed()
+                    item.abandoned = True
+                    worker = item.worker
+                    if worker is not None:
+                        worker.stage.replace(worker)
+                    watchdog.timed_out.append(ticker)
+                    logger.error(
+                        "Ticker %s exceeded the %.0fs deadline; abandoned", ticker, limit
+                    )
+                    raise TickerTimeoutError(f"{ticker} exceeded {limit:.0f}s")
+                if item.error is not None:
+                    raise item.error
+                self._write_ticker(
+                    self.ticker_index.get(ticker, item.idx),
+                    item.x,
+                    item.analysis,
+                    item.ticker_data,
+                    row=item.row,
+                )
+                if item.analysis["flag"] == True:
+                    logger.info("%s passes combined strategy", ticker)
+                    superStock.append(ticker)
+                METRICS.incr("tickers_ok")
+            finally:
+                watchdog.finish(ticker)
+                if item.started is not None:
+                    elapsed = item.elapsed()
+                    METRICS.observe("ticker", elapsed, ticker)
+                    logger.info(
+                        "Processing complete for %s; elapsed=%.2fs", ticker, elapsed
+                    )
+        except TickerTimeoutError as e:
+            METRICS.incr("tickers_timeout")
+            self._write_status(ticker, "timeout", "TIMEOUT", f"no result: {e}")
+        except Exception:
+            METRICS.incr("tickers_failed")
+            logger.exception("Error processing ticker %s", ticker)
 
-        # Sort all CSV files by Buy Signal
-        for market, csv_file in self.csv_files.items():
-            sort_csv_by_buy_signal(csv_file)
-        logger.info("CSV files sorted by Buy Signal")
+    @staticmethod
+    def _await_item(item, deadline, deadline_at):
+        """Wait until `item` leaves the pipeline; False if it ran out of time.
+
+        `deadline` (seconds, 0 = none) counts only the time the item spent
+        being worked on in the stages, not waiting in their queues; once its
+        fetch has started, the end of the time budget `deadline_at` also
+        stops it.
+        """
+        while not item.done.wait(0.1):
+            if item.started is None:
+                continue
+            if deadline > 0 and item.elapsed() >= deadline:
+                return False
+            if deadline_at is not None and time.time() >= deadline_at:
+                return False
+        return True
+
+    def _fetch_and_analyze(self, ticker, price_map, date_from):
+        """Worker side of a ticker: fetch data and run the analysis.
+
+        Returns (cookFinancials, analysis dict, profiler handle).
+        """
+        profile = PROFILER.start(ticker)
+        try:
+            x = self._fetch_ticker(ticker, price_map)
+            analysis = self._analyze_ticker(x, date_from)
+        finally:
+            PROFILER.pause(profile)
+        return x, analysis, profile
+
+    def _fetch_ticker(self, ticker, price_map):
+        """Build the cookFinancials object, from prefetched prices if available."""
+        logger.info("Starting pipeline for %s", ticker)
+        with METRICS.timer("fetch", ticker):
+            # If we have a prefetch price_map, pass it in to avoid per-ticker downloads
+            if price_map:
+                x = cookFinancials(
+                    ticker,
+                    priceData=price_map,
+                    fetch_days=HISTORICAL_DAYS_DEFAULT,
+                )
+            else:
+                x = cookFinancials(ticker)
+        # Get current price first for CSV output (needed for all tickers)
+        if not x.current_stickerPrice:
+            x.current_stickerPrice = x.get_current_price()
+        return x
+
+    def _analyze_ticker(self, x, date_from):
+        """Swing-trade, VCP/pivot, demand-dry and combined strategy checks."""
+        ticker = x.ticker
+        currentPrice = x.current_stickerPrice
+
+        # Check for swing trade entry signal (for all tickers)
+        with METRICS.timer("indicators", ticker):
+            isSwingEntry, swingDetails = x.is_swing_trade_entry()
+        logger.info("swing_trade_entry=%s for %s", isSwingEntry, ticker)
+
+        demand = {}
+        t_stage = time.perf_counter()
+        # Try to get basic pivot data (for all tickers)
+        try:
+            # Run VCP analysis to get pivot data
+            counter, record = x.find_volatility_contraction_pattern(date_from)
+            x.get_footPrint()
+            isGoodPivot, currentPrice, supportPrice, pressurePrice = x.is_pivot_good()
+
+            if currentPrice is None or supportPrice is None or pressurePrice is None:
+                # Use fallback values if pivot analysis fails
+                supportPrice = currentPrice if currentPrice else 0
+                pressurePrice = currentPrice if currentPrice else 0
+                isGoodPivot = False
+
+            isDeepCor = x.is_correction_deep()
+            (
+                isDemandDry,
+                demand["startDate"],
+                demand["endDate"],
+                demand["volume_ls"],
+                demand["slope"],
+                demand["interY"],
+                demand["recentStart"],
+                demand["recentEnd"],
+                demand["volume_re"],
+                demand["slopeRecent"],
+                demand["interYRecent"],
+            ) = x.is_demand_dry()
+        except Exception:
+            logger.exception("Error in analysis for %s, using defaults", ticker)
+            supportPrice = currentPrice if currentPrice else 0
+            pressurePrice = currentPrice if currentPrice else 0
+            isGoodPivot = False
+            isDeepCor = False
+            isDemandDry = False
+            counter = 0
+            record = []
+            demand = {"volume_ls": [], "volume_re": []}
+        METRICS.observe("vcp", time.perf_counter() - t_stage, ticker)
+
+        # Check combined strategy for superStock tracking
+        with METRICS.timer("strategy", ticker):
+            flag = x.combined_best_strategy()
+        logger.info("combined_best_strategy for %s: %s", ticker, flag)
+
+        return {
+            "currentPrice": currentPrice,
+            "supportPrice": supportPrice,
+            "pressurePrice": pressurePrice,
+            "isGoodPivot": isGoodPivot,
+            "isDeepCor": isDeepCor,
+            "isDemandDry": isDemandDry,
+            "isSwingEntry": isSwingEntry,
+            "swingDetails": swingDetails,
+            "counter": counter,
+            "record": record,
+            "demand": demand,
+            "flag": flag,
+        }
+
+    def _render_chart(self, x, a, date_from):
+        """Plot price/volume with VCP and demand lines; return the JSON record."""
+        ticker = x.ticker
+        t_stage = time.perf_counter()
+        # Create charts for all tickers
+        sp = x.get_price(date_from, 100)
+        tmpLen = len(sp)
+        date = []
+        price = []
+        volume = []
+        for i in range(tmpLen):
+            date.append(sp[i]["formatted_date"])
+            price.append(sp[i]["close"])
+            volume.append(sp[i]["volume"])
+
+        # create figure and axis objects; a standalone Figure (not pyplot) so
+        # charts can be rendered from several threads and are freed afterwards
+        fig = Figure()
+        ax = fig.subplots(2)
+        fig.suptitle(x.ticker)
+        # make a plot
+        ax[0].plot(date, price, color="blue", marker="o")
+        # set x-axis label
+        ax[0].set_xlabel("date", fontsize=14)
+        # set y-axis label
+        ax[0].set_ylabel("stock price", color="blue", fontsize=14)
+
+        # twin object for two different y-axis on the sample plot
+        # make a plot with different y-axis using second axis object
+        ax[1].bar(date, np.asarray(volume) / 10**6, color="green")
+        ax[1].set_ylabel("volume (m)", color="green", fontsize=14)
+
+        # Set x-ticks to display every 10th date and include the last date
+        xticks = np.arange(0, len(date), 10).tolist()
+        if len(date) - 1 not in xticks:  # Check if the last date is already included
+            xticks.append(len(date) - 1)  # Add the last date index to x-ticks
+
+        ax[0].set_xticks(xticks)
+        ax[1].set_xticks(xticks)
+
+        # Format date labels for readability
+        fig.autofmt_xdate(rotation=45)
+
+        logger.info(
+            "Highest in 5 days for %s: %s", ticker, x.get_highest_in5days(date_from)
+        )
+
+        # Create ticker data for JSON
+        swingDetails = a["swingDetails"]
+        ticker_data = {
+            ticker: {
+                "current price": str(a["currentPrice"]),
+                "support price": str(a["supportPrice"]),
+                "pressure price": str(a["pressurePrice"]),
+                "is_good_pivot": str(a["isGoodPivot"]),
+                "is_deep_correction": str(a["isDeepCor"]),
+                "is_demand_dry": str(a["isDemandDry"]),
+                "swing_trade_entry": str(a["isSwingEntry"]),
+                "ema_8": str(swingDetails.get("ema_8", "N/A")),
+                "sma_200": str(swingDetails.get("sma_200", "N/A")),
+                "combined_strategy": str(a["flag"] == True),
+            }
+        }
+
+        # Plot VCP patterns if found
+        counter = a["counter"]
+        record = a["record"]
+        demand = a["demand"]
+        if counter > 0:
+            logger.info("Found %d VCP pattern(s) for %s", counter, ticker)
+            for i in range(counter):
+                ax[0].plot(
+                    [record[i][0], record[i][2]],
+                    [record[i][1], record[i][3]],
+                    "r",
+                )
+
+            # Plot volume trend lines if we have the data
+            volume_ls = demand["volume_ls"]
+            if volume_ls:
+                for ind, item in enumerate(date):
+                    if item == demand["startDate"]:
+                        logger.info(
+                            "start index for demand dry for %s: %d", ticker, ind
+                        )
+                        break
+
+                x_axis = []
+                for i in range(len(volume_ls)):
+                    x_axis.append(ind + i)
+                x_axis = np.array(x_axis)
+
+                slope = demand["slope"]
+                y = slope * x_axis - slope * ind + volume_ls[0]
+                ax[1].plot(
+                    np.asarray(date)[x_axis],
+                    y / 10**6,
+                    color="red",
+                    linewidth=4,
+                )
+
+                volume_re = demand["volume_re"]
+                if volume_re:
+                    for ind, item in enumerate(date):
+                        if item == demand["recentStart"]:
+                            logger.info("recent start index for %s: %d", ticker, ind)
+                            break
+
+                    x_axis = []
+                    for i in range(len(volume_re)):
+                        x_axis.append(ind + i)
+                    x_axis = np.array(x_axis)
+                    slopeRecent = demand["slopeRecent"]
+                    yRecent = slopeRecent * x_axis - slopeRecent * ind + volume_re[0]
+                    ax[1].plot(
+                        np.asarray(date)[x_axis],
+                        yRecent / 10**6,
+                        color="red",
+                        linewidth=4,
+                    )
+
+
+        # Determine market and use market-specific image folder
+        market = get_ticker_market(ticker)
+        img_folder = self.image_folders.get(market, self.image_folders["US"])
+        figName = os.path.join(img_folder, ticker + ".jpg")
+        # Save chart for all stocks with VCP patterns OR meeting buy criteria
+        if counter > 0 or (a["isGoodPivot"] and not (a["isDeepCor"]) and a["isDemandDry"]):
+            fig.savefig(figName, format="jpeg", dpi=100, bbox_inches="tight")
+            logger.info("Saved figure %s", figName)
+            ticker_data[ticker]["fig"] = figName
+
+        METRICS.observe("chart", time.perf_counter() - t_stage, ticker)
+        return ticker_data
+
+    def _build_row(self, x, a):
+        """Compute the ticker's CSV row (buy/sell/Double 7 signals)."""
+        ticker = x.ticker
+        csv_file = self.csv_files.get(get_ticker_market(ticker), self.csv_files["US"])
+        currentPrice = a["currentPrice"]
+        return build_csv_row(
+            csv_file,
+            ticker,
+            currentPrice if currentPrice else 0,
+            a["supportPrice"],
+            a["pressurePrice"],
+            a["isGoodPivot"],
+            a["isDeepCor"],
+            a["isDemandDry"],
+            a["isSwingEntry"],
+            ticker_obj=x,
+            swing_details=a["swingDetails"],
+        )
+
+    def _write_ticker(self, idx, x, a, ticker_data, row=None):
+        """Append the ticker's JSON record and CSV row, then checkpoint it.
+
+        `row` is the prebuilt CSV row (see _build_row); computed here if None.
+        """
+        ticker = x.ticker
+        # Add to JSON for all tickers
+        with METRICS.timer("json", ticker):
+            append_to_json(self.result_file, ticker_data)
+
+        # Write to CSV for ALL tickers (after chart generation for passing stocks)
+        market = get_ticker_market(ticker)
+        csv_file = self.csv_files.get(market, self.csv_files["US"])
+        with METRICS.timer("csv", ticker):
+            if row is None:
+                row = self._build_row(x, a)
+            write_csv_row(csv_file, row)
+        self.manifest.record(
+            {
+                "ticker": ticker,
+                "index": idx,
+                "status": "ok",
+                "market": market,
+                "csv_row": row,
+                "json": ticker_data,
+                "flag": a["flag"] == True,
+            }
+        )
 
     def batch_financial(self):
         for i in range(np.size(self.tickers)):
@@ -2656,7 +3334,7 @@ def calculate_double_seven_signals(ticker_obj, market):
         tuple: (d7_entry 'YES'/'NO', d7_exit 'YES'/'NO')
     """
     try:
-        date = dt.date.today()
+        date = _today()
         
         # Market-specific parameters
         params = {
@@ -2819,7 +3497,7 @@ def calculate_common_buy_signal(ticker_obj, current_price, support_price, pressu
     buy_reasons = []
     
     try:
-        date = dt.date.today()
+        date = _today()
         
         # 1. Golden Cross: 50 MA crosses above 200 MA
         try:
@@ -3064,7 +3742,7 @@ def calculate_sell_signal(ticker_obj, current_price, support_price, pressure_pri
     sell_reasons = []
     
     try:
-        date = dt.date.today()
+        date = _today()
         
         # 1. Deep Correction (>50% drop)
         if is_deep_correction:
@@ -3198,7 +3876,48 @@ def calculate_sell_signal(ticker_obj, current_price, support_price, pressure_pri
     return sell_signal, sell_reasons
 
 
-def append_to_csv(
+def append_to_csv(filepath, ticker, *args, **kwargs):
+    """Append a row to the CSV file; returns the row (see build_csv_row)."""
+    row = build_csv_row(filepath, ticker, *args, **kwargs)
+    write_csv_row(filepath, row)
+    return row
+
+
+def write_csv_row(filepath, row):
+    """Append one already built row to the CSV file."""
+    import csv
+
+    with open(filepath, "a", newline="") as f:
+        csv.writer(f).writerow(row)
+
+
+def find_previous_results_file(results_dir, filename, max_days=7):
+    """Return `filename` from the closest earlier results/<YYYY-MM-DD> folder.
+
+    `results_dir` may be the dated folder itself or a folder below it (shard
+    outputs live in shards/<shard>/). Looks back up to `max_days` days;
+    returns None if nothing is found or no dated folder is involved.
+    """
+    date_dir = results_dir
+    for _ in range(3):
+        try:
+            current_date = dt.datetime.strptime(os.path.basename(date_dir), "%Y-%m-%d")
+            break
+        except ValueError:
+            date_dir = os.path.dirname(date_dir)
+    else:
+        logger.debug("No dated results folder above %s", results_dir)
+        return None
+    results_base = os.path.dirname(date_dir)
+    for days_back in range(1, max_days + 1):
+        previous_folder = (current_date - dt.timedelta(days=days_back)).strftime("%Y-%m-%d")
+        previous_filepath = os.path.join(results_base, previous_folder, filename)
+        if os.path.exists(previous_filepath):
+            return previous_filepath
+    return None
+
+
+def build_csv_row(
     filepath,
     ticker,
     current_price,
@@ -3212,9 +3931,8 @@ def append_to_csv(
     ex_dividend_date='N/A',
     swing_details=None,
 ):
-    """Append a row to the CSV file."""
+    """Compute the CSV row for a ticker; `filepath` locates the previous day's file."""
     import csv
-    from datetime import datetime, timedelta
 
     # Calculate VCP-based buy signal (standalone - strict Minervini)
     vcp_buy_signal = (
@@ -3235,39 +3953,20 @@ def append_to_csv(
     prev_vcp_buy = "N/A"
     vcp_changed = "NO"
     try:
-        # Get the directory containing the current results folder
-        current_dir = os.path.dirname(filepath)
-        results_base = os.path.dirname(current_dir)
-        
-        # Get the filename to find the same market file in previous day
-        filename = os.path.basename(filepath)
-        
-        # Try to find previous day's folder
-        # Parse current folder name as date (format: YYYY-MM-DD)
-        current_folder_name = os.path.basename(current_dir)
-        try:
-            current_date = datetime.strptime(current_folder_name, "%Y-%m-%d")
-            # Look backwards up to 7 days to find previous trading day
-            for days_back in range(1, 8):
-                previous_date = current_date - timedelta(days=days_back)
-                previous_folder = previous_date.strftime("%Y-%m-%d")
-                previous_filepath = os.path.join(results_base, previous_folder, filename)
-                
-                if os.path.exists(previous_filepath):
-                    # Read previous day's CSV and find this ticker
-                    with open(previous_filepath, 'r', newline='') as prev_f:
-                        prev_reader = csv.DictReader(prev_f)
-                        for prev_row in prev_reader:
-                            if prev_row['Ticker'] == ticker:
-                                prev_vcp_buy = prev_row.get('VCP Buy', 'N/A')
-                                # Check if VCP Buy signal changed
-                                if prev_vcp_buy in ['YES', 'NO'] and prev_vcp_buy != vcp_buy_signal:
-                                    vcp_changed = "YES"
-                                break
-                    break  # Found previous day's data, stop searching
-        except (ValueError, KeyError) as e:
-            # If date parsing fails or folder structure is unexpected, leave as N/A
-            logger.debug("Could not parse date from folder %s or read previous data: %s", current_folder_name, e)
+        previous_filepath = find_previous_results_file(
+            os.path.dirname(filepath), os.path.basename(filepath)
+        )
+        if previous_filepath:
+            # Read previous day's CSV and find this ticker
+            with open(previous_filepath, 'r', newline='') as prev_f:
+                prev_reader = csv.DictReader(prev_f)
+                for prev_row in prev_reader:
+                    if prev_row['Ticker'] == ticker:
+                        prev_vcp_buy = prev_row.get('VCP Buy', 'N/A')
+                        # Check if VCP Buy signal changed
+                        if prev_vcp_buy in ['YES', 'NO'] and prev_vcp_buy != vcp_buy_signal:
+                            vcp_changed = "YES"
+                        break
     except Exception as e:
         # If any error occurs, just log and continue with N/A
         logger.debug("Error loading previous day VCP data for %s: %s", ticker, e)
@@ -3337,34 +4036,47 @@ def append_to_csv(
     except (ValueError, TypeError):
         price_to_support = 0
 
-    with open(filepath, "a", newline="") as f:
-        writer = csv.writer(f)
-        writer.writerow(
-            [
-                ticker,
-                final_signal,
-                vcp_buy_signal,
-                prev_vcp_buy,
-                vcp_changed,
-                early_vcp_signal,
-                buy_signal,
-                buy_details,
-                sell_signal,
-                sell_details,
-                swing_entry,
-                swing_reasons_str,
-                d7_entry,
-                d7_exit,
-                current_price,
-                support_price,
-                pressure_price,
-                price_to_support,
-                is_good_pivot,
-                is_deep_correction,
-                is_demand_dry,
-                ex_dividend_date,
-            ]
-        )
+    return [
+        ticker,
+        final_signal,
+        vcp_buy_signal,
+        prev_vcp_buy,
+        vcp_changed,
+        early_vcp_signal,
+        buy_signal,
+        buy_details,
+        sell_signal,
+        sell_details,
+        swing_entry,
+        swing_reasons_str,
+        d7_entry,
+        d7_exit,
+        current_price,
+        support_price,
+        pressure_price,
+        price_to_support,
+        is_good_pivot,
+        is_deep_correction,
+        is_demand_dry,
+        ex_dividend_date,
+    ]
+
+
+def append_status_to_csv(filepath, ticker, status, detail=""):
+    """Append a placeholder row for a ticker that produced no result.
+
+    `status` goes into the Final Signal column (e.g. "TIMEOUT") and `detail`
+    into Buy Reasons; every other column is N/A. Returns the row.
+    """
+    import csv
+
+    with open(filepath, "r", newline="") as f:
+        header = next(csv.reader(f))
+    row = {col: "N/A" for col in header}
+    row.update({"Ticker": ticker, "Final Signal": status, "Buy Reasons": detail})
+    row = [row[col] for col in header]
+    write_csv_row(filepath, row)
+    return row
 
 
 def get_ticker_market(ticker):
@@ -3380,46 +4092,3 @@ def get_ticker_market(ticker):
         return "HK"
     else:  # Default to US (no suffix or other suffixes)
         return "US"
-
-
-def sort_csv_by_buy_signal(filepath):
-    """Sort CSV file by Final Signal (YES first), then VCP Buy, then Buy Signal, then Price to Support %."""
-    import csv
-
-    try:
-        # Read all rows
-        with open(filepath, "r", newline="") as f:
-            reader = csv.reader(f)
-            header = next(reader)
-            rows = list(reader)
-
-        # Skip if no data rows
-        if not rows:
-            return
-
-        # Sort by: Final Signal (YES first), VCP Buy (YES first), VCP Changed (YES first), Buy Signal (YES first), Price to Support % (smallest first)
-        # Column indices: Ticker=0, Final Signal=1, VCP Buy=2, Prev VCP Buy=3, VCP Changed=4, Buy Signal=5, ..., Price to Support %=16
-        def sort_key(row):
-            final_signal_yes = row[1] == "YES"
-            vcp_buy_yes = row[2] == "YES"
-            vcp_changed_yes = row[4] == "YES"
-            buy_yes = row[5] == "YES"
-            sell_yes = row[7] == "YES"
-            try:
-                # Price to Support % is now at index 16 (shifted by 2 columns)
-                price_to_support_pct = float(row[16]) if (final_signal_yes or vcp_buy_yes or buy_yes) else float("inf")
-            except (ValueError, IndexError):
-                price_to_support_pct = float("inf")
-            return (not final_signal_yes, not vcp_buy_yes, not vcp_changed_yes, not buy_yes, price_to_support_pct, sell_yes)
-
-        rows.sort(key=sort_key)
-
-        # Write back sorted data
-        with open(filepath, "w", newline="") as f:
-            writer = csv.writer(f)
-            writer.writerow(header)
-            writer.writerows(rows)
-
-        logger.info("Sorted CSV file: %s", filepath)
-    except Exception:
-        logger.exception("Failed to sort CSV file: %s", filepath)
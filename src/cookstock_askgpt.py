@@ -3,10 +3,20 @@ import re
 import json as js
 import datetime as dt
 import time
+import asyncio
+import threading
+import functools
 import requests
 from bs4 import BeautifulSoup
-from openai import OpenAI
-import finnhub
+from collections import defaultdict
+from cookstock_llm import (
+    LLM_DEGRADED_MAX_ARTICLES, LLM_TELEMETRY, estimate_tokens, get_review_cache,
+)
+from cookstock_backends import make_llm_client, make_news_client
+from cookstock_news import NEWS_DEDUP, article_text, news_clusterer, news_id, get_news_watermarks
+from cookstock_scraper import (
+    ARTICLE_PARTS, QUOTE_SECTIONS, extract_article, extract_quote, get_transport, make_soup,
+)
 
 
 
@@ -16,6 +26,337 @@ import random
 class algoParas:   
     RETREIVE_DAYS = 1
 
+# Batch mode of CookStockAskGPTBatch.analyze_batch: 'async' reviews tickers
+# concurrently, 'sequential' one ticker at a time
+ASKGPT_BATCH_MODE = os.getenv("ASKGPT_BATCH_MODE", "async").lower()
+# Upper bounds on concurrent Finnhub / OpenAI requests in async mode; the
+# limiters back off below them when the APIs push back
+FINNHUB_CONCURRENCY = int(os.getenv("FINNHUB_CONCURRENCY", "4"))
+# minimum spacing of Finnhub calls (the free tier allows 60 calls/minute)
+FINNHUB_MIN_INTERVAL_S = float(os.getenv("FINNHUB_MIN_INTERVAL_S", "1.0"))
+LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", "8"))
+RATE_LIMIT_RETRIES = int(os.getenv("RATE_LIMIT_RETRIES", "5"))
+RATE_LIMIT_MAX_BACKOFF_S = 60.0
+# Prompt token budget of one batched news review request (several articles,
+# in async mode possibly of several tickers); 0 reviews one article per call
+LLM_BATCH_TOKENS = int(os.getenv("LLM_BATCH_TOKENS", "2000"))
+# how long the async batcher waits for more articles before sending a batch
+LLM_BATCH_LINGER_S = float(os.getenv("LLM_BATCH_LINGER_S", "0.05"))
+# Hard ceiling on the estimated tokens of the final recommendation prompt and
+# the number of news reviews kept per candidate in its digest
+DIGEST_MAX_TOKENS = int(os.getenv("DIGEST_MAX_TOKENS", "6000"))
+DIGEST_TOP_REVIEWS = int(os.getenv("DIGEST_TOP_REVIEWS", "3"))
+DIGEST_REVIEW_CHARS = 200
+
+# Prompt templates. Cached answers are keyed by the template text, so editing
+# a template invalidates its cached answers.
+NEWS_REVIEW_PROMPT = (
+    "Analyze the structured data, including technical factors and news, to write a concise note (max 20 words): "
+    "1. Indicate if the news is timely and related to stock {ticker}. "
+    "2. Specify the impact level on the stock price (-1: negative, 0: neutral, 1: positive, 2: strong positive). "
+    "3. Provide a brief reason for the impact. "
+    "Content: {content}"
+)
+NEWS_REVIEW_BATCH_PROMPT = (
+    "Analyze each numbered item of structured data, including technical factors and news, "
+    "and write a concise note (max 20 words) for every item: "
+    "1. Indicate if the news is timely and related to the item's stock ticker. "
+    "2. Specify the impact level on the stock price (-1: negative, 0: neutral, 1: positive, 2: strong positive). "
+    "3. Provide a brief reason for the impact. "
+    'Reply with only a JSON object mapping each item number to its note, e.g. {{"1": "note", "2": "note"}}. '
+    "Items:\n{items}"
+)
+RECOMMENDATION_PROMPT = (
+    "look at the list of stocks, which is a structured data,"
+    "it contains stock ticker, technical analysis and review of company news"
+    "recommend me 5 stocks from the list and tell me why. "
+    "Each line is one stock, strongest technical signals first; "
+    "signals lists the technical checks it passes and news the most impactful reviews.\n{content}"
+)
+
+
+def _rate_limit_info(exc):
+    """Return (is_rate_limited, retry_after_seconds) for an API exception."""
+    response = getattr(exc, 'response', None)
+    status = getattr(exc, 'status_code', None) or getattr(response, 'status_code', None)
+    limited = status == 429 or 'rate limit' in str(exc).lower()
+    retry_after = None
+    headers = getattr(response, 'headers', None) or {}
+    try:
+        retry_after = float(headers.get('retry-after'))
+    except (TypeError, ValueError):
+        pass
+    return limited, retry_after
+
+
+def _parse_reset(value):
+    """Seconds in an OpenAI x-ratelimit-reset-* header such as '1s', '6m0s' or '20ms'."""
+    if not value:
+        return None
+    units = {'ms': 0.001, 's': 1.0, 'm': 60.0, 'h': 3600.0}
+    total = sum(float(n) * units[u] for n, u in re.findall(r'([\d.]+)(ms|s|m|h)', str(value)))
+    return total or None
+
+
+class AdaptiveLimiter:
+    """Concurrency limit for one API that adapts to its pushback (AIMD).
+
+    At most `limit` calls run at once and call starts are at least
+    `min_interval` seconds apart. Every `limit` successful calls raise the
+    limit by one, up to `max_concurrency`; a rate-limit error halves it and
+    pauses new calls for the server's retry-after (or an exponential backoff)
+    before the call is retried. Blocking client calls run in worker threads.
+    """
+
+    def __init__(self, name, max_concurrency, min_interval=0.0, retries=RATE_LIMIT_RETRIES):
+        self.name = name
+        self.max_concurrency = max(1, max_concurrency)
+        self.limit = self.max_concurrency
+        self.min_interval = min_interval
+        self.retries = retries
+        self.throttled = 0
+        self._in_flight = 0
+        self._successes = 0
+        self._backoff = 1.0
+        self._resume_at = 0.0
+        self._next_start = 0.0
+        self._cond = None
+
+    async def _acquire(self):
+        if self._cond is None:
+            self._cond = asyncio.Condition()
+        async with self._cond:
+            while True:
+                wait = max(self._resume_at, self._next_start) - time.monotonic()
+                if self._in_flight < self.limit and wait <= 0:
+                    break
+                try:
+                    await asyncio.wait_for(self._cond.wait(), wait if wait > 0 else None)
+                except asyncio.TimeoutError:
+                    pass
+            self._in_flight += 1
+            self._next_start = time.monotonic() + self.min_interval
+
+    async def _release(self):
+        async with self._cond:
+            self._in_flight -= 1
+            self._cond.notify_all()
+
+    def on_success(self):
+        self._backoff = 1.0
+        self._successes += 1
+        if self._successes >= self.limit and self.limit < self.max_concurrency:
+            self.limit += 1
+            self._successes = 0
+
+    def pause(self, seconds):
+        """Hold back new calls for `seconds`."""
+        self._resume_at = max(self._resume_at, time.monotonic() + seconds)
+
+    def on_throttle(self, retry_after=None):
+        self.throttled += 1
+        self.limit = max(1, self.limit // 2)
+        self._successes = 0
+        delay = retry_after if retry_after is not None else self._backoff
+        self._backoff = min(self._backoff * 2, RATE_LIMIT_MAX_BACKOFF_S)
+        self.pause(delay)
+        print(f"{self.name}: rate limited; concurrency {self.limit}, retrying in {delay:.1f}s")
+
+    def observe_headers(self, headers):
+        """Pause until the window resets when rate-limit headers say it is used up."""
+        if not headers:
+            return
+        for kind in ('requests', 'tokens'):
+            remaining = headers.get(f'x-ratelimit-remaining-{kind}')
+            try:
+                if remaining is None or int(remaining) > 0:
+                    continue
+            except ValueError:
+                continue
+            reset = _parse_reset(headers.get(f'x-ratelimit-reset-{kind}'))
+            if reset:
+                self.pause(reset)
+
+    async def call(self, func, *args, **kwargs):
+        """Await blocking func(*args, **kwargs) within the limit, retrying rate-limit errors."""
+        for attempt in range(self.retries + 1):
+            await self._acquire()
+            try:
+                result = await asyncio.to_thread(func, *args, **kwargs)
+            except Exception as e:
+                limited, retry_after = _rate_limit_info(e)
+                if not limited or attempt == self.retries:
+                    raise
+                self.on_throttle(retry_after)
+                continue
+            finally:
+                await self._release()
+            self.on_success()
+            return result
+
+class _ReviewItem:
+    """One article review to be sent in a batched prompt."""
+
+    __slots__ = ("owner", "content", "prompt", "key", "tokens", "future")
+
+    def __init__(self, owner, content, prompt, key=None):
+        self.owner = owner      # CookStockAskGPT that is charged for the review
+        self.content = content  # structured article data shown in the batch prompt
+        self.prompt = prompt    # single-article prompt for the fallback call
+        self.key = key          # review cache key, or None
+        self.tokens = estimate_tokens(content)
+        self.future = None
+
+
+def pack_items(items, token_budget):
+    """Split items, in order, into groups whose batch prompt fits token_budget.
+
+    An item larger than the budget on its own still gets a group.
+    """
+    overhead = estimate_tokens(NEWS_REVIEW_BATCH_PROMPT)
+    groups, group, used = [], [], overhead
+    for item in items:
+        if group and used + item.tokens > token_budget:
+            groups.append(group)
+            group, used = [], overhead
+        group.append(item)
+        used += item.tokens + 2
+    if group:
+        groups.append(group)
+    return groups
+
+
+def parse_batch_answer(answer, count):
+    """Return {item index (0-based): note} from a batched answer.
+
+    The answer should hold a JSON object keyed by 1-based item numbers; items
+    without a non-empty string note, or every item if the JSON cannot be
+    parsed, are left out.
+    """
+    if not answer:
+        return {}
+    start, end = answer.find("{"), answer.rfind("}")
+    if start < 0 or end < start:
+        return {}
+    try:
+        data = js.loads(answer[start:end + 1])
+    except ValueError:
+        return {}
+    if not isinstance(data, dict):
+        return {}
+    notes = {}
+    for i in range(count):
+        note = data.get(str(i + 1))
+        if isinstance(note, str) and note.strip():
+            notes[i] = note.strip()
+    return notes
+
+
+async def _limited_chat(limiter, owner, prompt, cache_key=None):
+    """One owner._chat call through the limiter; None (and the error printed) on failure."""
+    try:
+        answer, headers = await limiter.call(owner._chat, prompt, cache_key)
+    except Exception as e:
+        print(f"Error: {e}")
+        return None
+    limiter.observe_headers(headers)
+    return answer
+
+
+class ReviewBatcher:
+    """Packs concurrent article reviews, across tickers, into batched prompts.
+
+    Submitted items wait up to `linger` seconds for company, or until
+    `token_budget` prompt tokens are pending, and are then sent in groups that
+    fit the budget through the LLM limiter. Items the batched answer does not
+    cover are retried as single-article calls.
+    """
+
+    def __init__(self, limiter, token_budget=LLM_BATCH_TOKENS, linger=LLM_BATCH_LINGER_S):
+        self.limiter = limiter
+        self.token_budget = token_budget
+        self.linger = linger
+        self.batches = 0
+        self.fallbacks = 0
+        self._pending = []
+        self._tokens = 0
+        self._timer = None
+
+    async def submit(self, item):
+        """Queue one review and return its note (None if it failed)."""
+        loop = asyncio.get_running_loop()
+        item.future = loop.create_future()
+        self._pending.append(item)
+        self._tokens += item.tokens
+        if self._tokens >= self.token_budget:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.linger, self._flush)
+        return await item.future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        pending, self._pending, self._tokens = self._pending, [], 0
+        for group in pack_items(pending, self.token_budget):
+            asyncio.ensure_future(self._send(group))
+
+    async def _send(self, group):
+        notes = {}
+        try:
+            if len(group) > 1:
+                try:
+                    notes, headers = await self.limiter.call(group[0].owner._review_batch, group)
+                    self.limiter.observe_headers(headers)
+                    self.batches += 1
+                except Exception as e:
+                    print(f"Error: {e}")
+            missing = [] if LLM_TELEMETRY.stopped else [i for i in range(len(group)) if i not in notes]
+            if len(group) > 1:
+                self.fallbacks += len(missing)
+            answers = await asyncio.gather(*(
+                _limited_chat(self.limiter, group[i].owner, group[i].prompt, group[i].key)
+                for i in missing))
+            notes.update(zip(missing, answers))
+        finally:
+            for i, item in enumerate(group):
+                if not item.future.done():
+                    item.future.set_result(notes.get(i))
+
+
+def _time_ago(timestamp):
+    """Relative age of a Unix timestamp: 'N days ago', 'N hours ago', ..."""
+    #calculat time ago
+    current_time = dt.datetime.now(dt.timezone.utc)
+    news_time = dt.datetime.fromtimestamp(timestamp, dt.timezone.utc)
+    diff = current_time - news_time
+    # Convert to seconds, minutes, hours, and days
+    total_seconds = diff.total_seconds()
+    seconds = int(total_seconds % 60)
+    minutes = int((total_seconds // 60) % 60)
+    hours = int((total_seconds // 3600) % 24)
+    days = int(total_seconds // 86400)
+    return f"{days} days ago" if days > 0 else f"{hours} hours ago" if hours > 0 else f"{minutes} minutes ago" if minutes > 0 else f"{seconds} seconds ago"
+
+
+_finnhub_next_start = 0.0
+_finnhub_pace_lock = threading.Lock()
+
+
+def _pace_finnhub():
+    """Block until the next Finnhub call may start (FINNHUB_MIN_INTERVAL_S apart).
+
+    Sequential-mode counterpart of the async Finnhub limiter's spacing.
+    """
+    global _finnhub_next_start
+    with _finnhub_pace_lock:
+        wait = _finnhub_next_start - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+        _finnhub_next_start = time.monotonic() + FINNHUB_MIN_INTERVAL_S
+
+
 def find_path():
     home_dir = os.path.expanduser("~")
     for root, dirs, files in os.walk(home_dir):
@@ -23,28 +364,27 @@ def find_path():
             return os.path.join(root, 'cookstock')
     return None
 
+@functools.lru_cache(maxsize=None)
+def _proxy_file():
+    """proxy.txt of the project (located once; find_path walks the home directory)."""
+    return os.path.join(find_path(), "proxy.txt")
+
+
 def get_random_proxy():
-    proxiesPath = os.path.join(find_path(), "proxy.txt")
-    with open(proxiesPath, 'r') as f:
-        proxies = [line.strip() for line in f.readlines()]  # Remove trailing whitespace or newlines
-    
-    proxy = random.choice(proxies)
-    proxy_parts = proxy.split(':')
-    return {
-        "http": f"http://{proxy_parts[2]}:{proxy_parts[3]}@{proxy_parts[0]}:{proxy_parts[1]}",
-        "https": f"http://{proxy_parts[2]}:{proxy_parts[3]}@{proxy_parts[0]}:{proxy_parts[1]}"
-    }
+    """requests `proxies` dict of a healthy proxy from the shared pool, or None."""
+    pool = get_transport(_proxy_file()).pool
+    state = pool.choose() if pool else None
+    return state.proxies if state else None
 
 
-def fetch_with_proxy(url, headers):
+def fetch_with_proxy(url, headers, select=None):
+    """Soup of `url` fetched through the proxy pool (only the `select` XPath parts if given), or None."""
     try:
-        proxy = get_random_proxy()
-        # print(f"Using proxy: {proxy}")
-        response = requests.get(url, headers=headers, proxies=proxy, timeout=10, verify=False)
+        response = get_transport(_proxy_file()).get(url, headers=headers, use_proxy=True, verify=False)
         # Check if the response was successful
         if response.status_code == 200:
             print("Request successful!")
-            return BeautifulSoup(response.text, "lxml")
+            return make_soup(response.text, select)
         else:
             print(f"Request failed with status code: {response.status_code}")
             return None
@@ -54,25 +394,37 @@ def fetch_with_proxy(url, headers):
         return None
 
 class CookStockAskGPT:
-    def __init__(self, base_path=None, client=None, finnhub_client=None):
-        if client:
-            self.client = client
-        else:
-            self.client = OpenAI()
-        if finnhub_client:
-            self.finnhub_client = finnhub_client
-        else:
-            api_key = os.getenv('FINHUB_API_KEY')
-            if not api_key:
-                raise ValueError("FINHUB_API_KEY not set in environment variables.")
-            self.finnhub_client = finnhub.Client(api_key=api_key)
+    def __init__(self, base_path=None, client=None, finnhub_client=None, review_cache=None,
+                 news_clusters=None, news_watermarks=None):
+        # LLM_BACKEND / NEWS_BACKEND pick live or offline stand-ins (see cookstock_backends)
+        self.client = client or make_llm_client()
+        self.finnhub_client = finnhub_client or make_news_client()
 
         
         self.cost_per_token_prompt = 0.15 / 1000000
         self.cost_per_token_answer = 0.60 / 1000000
         self.text_cost = 0
+        self.model = "gpt-4o-mini"
+        # answers already paid for are served from the review cache;
+        # saved_cost is what those hits cost when they were first asked
+        self.review_cache = review_cache if review_cache is not None else get_review_cache()
+        self.cache_hits = 0
+        self.saved_cost = 0
+        # near-duplicate articles share the review of their cluster's first
+        # article; a batch passes one clusterer to share clusters across tickers
+        self.news_clusters = news_clusters if news_clusters is not None else news_clusterer()
+        self.duplicate_news = 0
+        # articles reviewed by earlier runs are neither fetched again (the
+        # Finnhub window starts at the newest one) nor reviewed again
+        self.news_watermarks = news_watermarks if news_watermarks is not None else get_news_watermarks()
+        self.known_news = 0
+        # ticker being analyzed, for LLM telemetry
+        self.ticker = None
+        self._degraded_reviews = 0
+        self._cost_lock = threading.Lock()
         self.base_path = base_path or find_path()
         self.soup = None
+        self._quotes = {}
         self.headers_list = [
                 {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/114.0.0.0 Safari/537.36'},
                 {'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/116.0.0.0 Safari/537.36'},
@@ -82,32 +434,153 @@ class CookStockAskGPT:
         ]
 
 
-    def _ask_gpt(self, prompt):
+    def _cached(self, template, content, stage="news_review"):
+        """Look up the answer to `template` filled with `content`.
+
+        Returns (cache key, cached answer or None); (None, None) without a
+        cache or template. `content` holds only the fields that decide the
+        answer, so volatile parts of the prompt do not defeat the cache.
+        """
+        if self.review_cache is None or template is None:
+            return None, None
+        key = self.review_cache.key(self.model, template, content)
+        hit = self.review_cache.get(key)
+        if hit is None:
+            return key, None
+        answer, cost = hit
+        with self._cost_lock:
+            self.cache_hits += 1
+            self.saved_cost += cost
+        LLM_TELEMETRY.record(stage, self.model, tickers={self.ticker: 1.0}, cache_hit=True,
+                             saved_cost=cost)
+        return key, answer
+
+    def _charge(self, cost):
+        with self._cost_lock:
+            self.text_cost += cost
+
+    def _complete(self, prompt, stage="news_review", tickers=None):
+        """Send one chat completion; return (answer, response headers, cost).
+
+        API errors, and LLMBudgetExceeded once a 'stop' budget is used up,
+        propagate. Headers are {} when the client cannot expose them. The
+        attempt is recorded in LLM_TELEMETRY for `stage`, spread over
+        `tickers` ({ticker: share}, default this analyzer's ticker).
+        """
+        LLM_TELEMETRY.check_budget()
+        tickers = tickers or {self.ticker: 1.0}
+        messages = [
+            {"role": "system", "content": "You are an insightful and knowledgeable stock analytics."},
+            {
+                "role": "user",
+                "content": prompt
+            },
+        ]
+        completions = self.client.chat.completions
+        raw = getattr(completions, 'with_raw_response', None)
+        t0 = time.perf_counter()
         try:
-            response = self.client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": "You are an insightful and knowledgeable stock analytics."},
-                    {
-                        "role": "user",
-                        "content": prompt
-                    },
-                ]
-            )
-            if response.choices[0].message:
-                answer = response.choices[0].message.content
-                usage = response.usage
-                self.text_cost += (
-                    self.cost_per_token_prompt * usage.prompt_tokens +
-                    self.cost_per_token_answer * usage.completion_tokens
-                )
-                return answer
+            if raw is not None:
+                raw_response = raw.create(model=self.model, messages=messages)
+                headers = raw_response.headers
+                response = raw_response.parse()
+            else:
+                response = completions.create(model=self.model, messages=messages)
+                headers = {}
+        except Exception as e:
+            LLM_TELEMETRY.record(stage, self.model, latency=time.perf_counter() - t0, tickers=tickers,
+                                 error=e, rate_limited=_rate_limit_info(e)[0])
+            raise
+        usage = response.usage
+        cost = (
+            self.cost_per_token_prompt * usage.prompt_tokens +
+            self.cost_per_token_answer * usage.completion_tokens
+        )
+        LLM_TELEMETRY.record(stage, self.model, usage.prompt_tokens, usage.completion_tokens,
+                             time.perf_counter() - t0, cost, tickers)
+        if not response.choices[0].message:
+            return None, headers, cost
+        return response.choices[0].message.content, headers, cost
+
+    def _chat(self, prompt, cache_key=None, stage="news_review"):
+        """Send one chat completion, charged to text_cost; return (answer, response headers).
+
+        API errors propagate (see _ask_gpt for the forgiving variant). With
+        `cache_key` the answer and its cost are stored in the review cache.
+        """
+        answer, headers, cost = self._complete(prompt, stage)
+        self._charge(cost)
+        if cache_key is not None:
+            self.review_cache.put(cache_key, answer, cost)
+        return answer, headers
+
+    def _review_batch(self, items):
+        """Review several _ReviewItems in one completion; return ({item index: note}, headers).
+
+        The cost is split over the items' owners by estimated tokens and each
+        parsed note is cached under its item's key. Items missing from the
+        answer are left for the caller to retry one by one.
+        """
+        lines = "\n".join(f"{i}. {item.content}" for i, item in enumerate(items, 1))
+        total = sum(item.tokens for item in items) or 1
+        tickers = defaultdict(float)
+        for item in items:
+            tickers[item.owner.ticker] += item.tokens / total
+        answer, headers, cost = self._complete(NEWS_REVIEW_BATCH_PROMPT.format(items=lines),
+                                               "news_review_batch", tickers)
+        notes = parse_batch_answer(answer, len(items))
+        for i, item in enumerate(items):
+            share = cost * item.tokens / total
+            item.owner._charge(share)
+            if i in notes and item.key is not None:
+                item.owner.review_cache.put(item.key, notes[i], share)
+        return notes, headers
+
+    def _review_items(self, items):
+        """Notes for _ReviewItems, batched up to LLM_BATCH_TOKENS per call.
+
+        Items a batched answer does not cover, and every item when batching is
+        off, are reviewed with single-article calls.
+        """
+        notes = {}
+        if LLM_BATCH_TOKENS > 0 and len(items) > 1:
+            offset = 0
+            for group in pack_items(items, LLM_BATCH_TOKENS):
+                if len(group) > 1:
+                    try:
+                        batch_notes, _ = self._review_batch(group)
+                    except Exception as e:
+                        print(f"Error: {e}")
+                        batch_notes = {}
+                    notes.update((offset + i, note) for i, note in batch_notes.items())
+                offset += len(group)
+        for i, item in enumerate(items):
+            if i not in notes and LLM_TELEMETRY.stopped:
+                notes[i] = None
+            elif i not in notes:
+                try:
+                    notes[i] = item.owner._chat(item.prompt, item.key)[0]
+                except Exception as e:
+                    print(f"Error: {e}")
+                    notes[i] = None
+        return [notes[i] for i in range(len(items))]
+
+    def _ask_gpt(self, prompt, template=None, content=None, stage="news_review"):
+        key, answer = self._cached(template, content, stage)
+        if answer is not None:
+            return answer
+        try:
+            return self._chat(prompt, key, stage)[0]
         except Exception as e:
             print(f"Error: {e}")
             return None
         
     def _get_website(self, url, use_proxy=1):
-        """Fetch website content with optional proxy."""
+        """Fetch website content with optional proxy into self.soup."""
+        self.soup = self._fetch_page(url, use_proxy)
+
+    def _fetch_page(self, url, use_proxy=1, select=None):
+        """Soup of `url` (only the `select` XPath parts if given), or None on errors."""
         header = {
             **random.choice(self.headers_list),  # Select a random User-Agent
             "Cache-Control": "no-cache"         # Add "Cache-Control" to the headers
@@ -119,16 +592,15 @@ class CookStockAskGPT:
                 if not api_key:
                     raise ValueError("SCRAPER_API_KEY not set in environment variables.")
                 payload = {'api_key': api_key, 'url': url}
-                response = requests.get('https://api.scraperapi.com/', params=payload)
+                response = get_transport().get('https://api.scraperapi.com/', params=payload, timeout=60)
             elif use_proxy == 2:
-                self.soup = fetch_with_proxy(url, header)
-                return
+                return fetch_with_proxy(url, header, select)
             else:
-                response = requests.get(url, headers=header)
-            self.soup = BeautifulSoup(response.text, 'lxml')
+                response = get_transport().get(url, headers=header)
+            return make_soup(response.text, select)
         except requests.RequestException as e:
             print(f"Error fetching website: {e}")
-            self.soup = None
+            return None
             
     def _get_website_new(self, url, use_proxy=1):
         """Fetch website content with optional proxy using Selenium."""
@@ -178,47 +650,33 @@ class CookStockAskGPT:
             driver.quit()
 
 
-    def _get_business_summary(self, ticker):
-        if self.soup is None:
+    def _quote_page(self, ticker):
+        """Fields of the ticker's Yahoo quote page (see extract_quote), fetched and parsed once per ticker.
+
+        None if the page could not be fetched.
+        """
+        if ticker not in self._quotes:
             url = f'https://finance.yahoo.com/quote/{ticker}'
-            self._get_website(url, use_proxy=2)
-        soup = self.soup
-        if not soup:
-            return None
-        summary = soup.find('section', attrs={'data-testid': 'company-overview-card'})
-        if not summary:
-            return None
-        description = summary.find('div', attrs={'class': 'description'})
-        if not description:
-            return None
-        return description.find('p').get_text()
+            soup = self._fetch_page(url, use_proxy=2, select=QUOTE_SECTIONS)
+            if soup is None:
+                return None
+            self._quotes[ticker] = extract_quote(soup)
+        return self._quotes[ticker]
+
+    def _get_business_summary(self, ticker):
+        quote = self._quote_page(ticker)
+        return quote["business_summary"] if quote else None
 
     def _extract_news(self, ticker):
-        if self.soup is None:
-            url = f'https://finance.yahoo.com/quote/{ticker}'
-            self._get_website(url, use_proxy=2)
-        soup = self.soup
-        if not soup:
+        quote = self._quote_page(ticker)
+        if not quote:
             return None
-        news_section = soup.find('section', attrs={'data-testid': 'recent-news'})
-        if not news_section:
-            return []
-
-        news_items = news_section.find_all('div', attrs={'class': 'stream-item'})
         news_list = []
 
-        for item in news_items:
-            content = item.find('a', href=True, title=True)
-            if not content:
-                continue
-
-            url_news = content['href']
-            title_news = content['title']
-            publishing_div = item.find("div", attrs={'class': 'publishing'})
-            if not publishing_div:
-                continue
-
-            time_ago_text = publishing_div.text.strip()
+        for item in quote["news"]:
+            url_news = item["url"]
+            title_news = item["title"]
+            time_ago_text = item["publishing"]
             days_match = re.search(r"(\d+) days ago", time_ago_text)
             today_match = re.search(r"(\d+) hours ago", time_ago_text) or \
                           re.search(r"(\d+) minutes ago", time_ago_text) or \
@@ -236,11 +694,9 @@ class CookStockAskGPT:
                 break
 
             # Fetch news article content
-            self._get_website(url_news, use_proxy=2)
+            article = extract_article(self._fetch_page(url_news, use_proxy=2, select=ARTICLE_PARTS))
             #check the time again, sometimes the news above fool you
-            if not self.soup:
-                continue
-            date_text = self.soup.find('div', attrs={'class': 'byline-attr-time-style'}).text.strip()
+            date_text = article["date_text"]
             if not date_text:
                 continue
             #'Tue, Nov 12, 2024, 9:40 AM 2 min read'
@@ -249,12 +705,9 @@ class CookStockAskGPT:
             formatted_date = dt.datetime(*struct_time[:6])
             if formatted_date.date() < dt.date.today() - dt.timedelta(days=algoParas.RETREIVE_DAYS):
                 break
-            article_div = self.soup.find('div', attrs={'class': 'article-wrap'})
-            if not article_div:
+            combined_content = article["text"]
+            if combined_content is None:
                 continue
-
-            paragraphs = article_div.find_all('p')
-            combined_content = " ".join(p.get_text(strip=True) for p in paragraphs)
             prompt =(
                     f"Write a summary for the news within 30 words and clearly write a note within 20 words "
                     f"which tells me if this news is related to the stock ticker {ticker} and if it is so positive "
@@ -271,61 +724,131 @@ class CookStockAskGPT:
 
         return news_list
     
-    def _read_news_from_finHub(self, ticker):
-        # Setup client
+    def _fetch_company_news(self, ticker, since=None):
+        """Finnhub news of the last RETREIVE_DAYS days, or from the day of timestamp `since` if later."""
         # Calculate start time and end time
         startTime = dt.datetime.now() - dt.timedelta(days=algoParas.RETREIVE_DAYS)
+        if since is not None:
+            startTime = max(startTime, dt.datetime.fromtimestamp(since))
         startTimeStr = startTime.strftime("%Y-%m-%d")  # Format as "Y-M-D"
 
         endTime = dt.datetime.now()
         endTimeStr = endTime.strftime("%Y-%m-%d")  # Format as "Y-M-D"
-        news = self.finnhub_client.company_news(ticker, _from=startTimeStr, to=endTimeStr)
+        return self.finnhub_client.company_news(ticker, _from=startTimeStr, to=endTimeStr)
+
+    def _load_news_state(self, ticker):
+        """Watermark state of `ticker` (see NewsWatermarks), or None without a store."""
+        if self.news_watermarks is None:
+            return None
+        return self.news_watermarks.load(ticker)
+
+    def _unseen_news(self, state, news):
+        """Drop the news items already reviewed in an earlier run."""
+        if state is None:
+            return news
+        unseen = [n for n in news if news_id(n) not in state["items"]]
+        self.known_news += len(news) - len(unseen)
+        return unseen
+
+    def _remember_news(self, ticker, state, news, news_list):
+        """Store the reviewed entries and return the ticker's news list.
+
+        The list holds every stored article still inside the retrieval window
+        (with its relative date refreshed) plus this run's entries, newest
+        first. Entries without a review are not stored, so they are retried.
+        """
+        if state is None:
+            return news_list
+        dated = []
+        for news_item, entry in zip(news, news_list):
+            if entry.get("review") is None:
+                dated.append((news_item['datetime'], entry))
+                continue
+            stored = {k: v for k, v in entry.items() if k != "date"}
+            state["items"][news_id(news_item)] = {"datetime": news_item['datetime'], "entry": stored}
+        if news:
+            state["watermark"] = max([state["watermark"] or 0] + [n['datetime'] for n in news])
+        window_start = dt.datetime.combine(
+            dt.date.today() - dt.timedelta(days=algoParas.RETREIVE_DAYS), dt.time()).timestamp()
+        self.news_watermarks.save(ticker, state, since=window_start)
+        dated += [(item["datetime"], dict(item["entry"], date=_time_ago(item["datetime"])))
+                  for item in state["items"].values()]
+        dated.sort(key=lambda d: d[0], reverse=True)
+        return [entry for _, entry in dated]
+
+    def _news_review_request(self, ticker, news_item):
+        """Return (news entry without review, review prompt, cache content) for one Finnhub item."""
+        timeStr = _time_ago(news_item['datetime'])
+
+        combined_content = {"ticker": ticker, 
+                            "headline": news_item['headline'], 
+                            "summary": news_item['summary'],
+                            "time": timeStr,
+                            "url": news_item['url']}
+        prompt = NEWS_REVIEW_PROMPT.format(ticker=ticker, content=combined_content)
+        # the relative time changes on every run; the article itself does not
+        cache_content = {k: v for k, v in combined_content.items() if k != "time"}
+        entry = {
+            "title": news_item['headline'],
+            "summary": news_item['summary'],
+            "url": news_item['url'],
+            "date": timeStr,
+            "source": news_item['source'],
+        }
+        return entry, prompt, cache_content
+
+    def _review_allowed(self):
+        """Whether another new article of this ticker may be reviewed.
+
+        Once the run is over its LLM budget only LLM_DEGRADED_MAX_ARTICLES
+        more articles per ticker are reviewed (none with a 'stop' budget); the
+        others keep no review and are retried by the next run.
+        """
+        if LLM_TELEMETRY.stopped:
+            return False
+        if not LLM_TELEMETRY.degraded:
+            return True
+        self._degraded_reviews += 1
+        return self._degraded_reviews <= LLM_DEGRADED_MAX_ARTICLES
+
+    def _cluster(self, news_item):
+        """Return (cluster id, is_new) of a news item; (None, True) without dedup."""
+        if self.news_clusters is None:
+            return None, True
+        cid, is_new = self.news_clusters.assign(article_text(news_item))
+        if not is_new:
+            self.duplicate_news += 1
+        return cid, is_new
+
+    def _read_news_from_finHub(self, ticker):
+        state = self._load_news_state(ticker)
+        _pace_finnhub()
+        news = self._fetch_company_news(ticker, since=state and state["watermark"])
+        news = self._unseen_news(state, news)
         news_list = []
+        todo = []
+        duplicates = []
         for news_item in news:
-            #convert time to datetime
-            #calculat time ago
-            current_time = dt.datetime.now(dt.timezone.utc)
-            news_time = dt.datetime.utcfromtimestamp(news_item['datetime']).replace(tzinfo=dt.timezone.utc)
-            diff = current_time - news_time
-            #convert the diff to seconds, minutes, hours or days
-            # Convert to seconds, minutes, hours, and days
-            total_seconds = diff.total_seconds()
-            seconds = int(total_seconds % 60)
-            minutes = int((total_seconds // 60) % 60)
-            hours = int((total_seconds // 3600) % 24)
-            days = int(total_seconds // 86400)
-            timeStr = f"{days} days ago" if days > 0 else f"{hours} hours ago" if hours > 0 else f"{minutes} minutes ago" if minutes > 0 else f"{seconds} seconds ago"
-            # print(diff)
-            # print(news_item['headline'])
-            # print(news_item['summary'])
-            
-            combined_content = {"ticker": ticker, 
-                                "headline": news_item['headline'], 
-                                "summary": news_item['summary'],
-                                "time": timeStr,
-                                "url": news_item['url']}
-            prompt = (
-                f"Analyze the structured data, including technical factors and news, to write a concise note (max 20 words): "
-                f"1. Indicate if the news is timely and related to stock {ticker}. "
-                f"2. Specify the impact level on the stock price (-1: negative, 0: neutral, 1: positive, 2: strong positive). "
-                f"3. Provide a brief reason for the impact. "
-                f"Content: {combined_content}"
-            )
-            review = self._ask_gpt(prompt=prompt)
-            news_list.append({
-                "title": news_item['headline'],
-                "summary": news_item['summary'],
-                "url": news_item['url'],
-                "date": timeStr,
-                "source": news_item['source'],
-                "review": review
-            })
-        #wait 2 seconds
-        time.sleep(2)
-        return news_list
+            entry, prompt, content = self._news_review_request(ticker, news_item)
+            cid, is_new = self._cluster(news_item)
+            if is_new:
+                key, entry["review"] = self._cached(NEWS_REVIEW_PROMPT, content)
+                if entry["review"] is None and self._review_allowed():
+                    todo.append((entry, _ReviewItem(self, dict(content, time=entry["date"]), prompt, key)))
+                if cid is not None:
+                    self.news_clusters.values[cid] = entry
+            else:
+                duplicates.append((entry, self.news_clusters.values[cid]))
+            news_list.append(entry)
+        for (entry, _), note in zip(todo, self._review_items([item for _, item in todo])):
+            entry["review"] = note
+        for entry, first in duplicates:
+            entry["duplicate_of"], entry["review"] = first["url"], first["review"]
+        return self._remember_news(ticker, state, news, news_list)
 
     def analyze_single_ticker(self, ticker):
         print(f"Analyzing {ticker}...")
+        self.ticker = ticker
         # business_summary = self._get_business_summary(ticker)
         business_summary = None
         # news = self._extract_news(ticker)
@@ -336,35 +859,101 @@ class CookStockAskGPT:
             "news": news
         }
 
+    async def analyze_single_ticker_async(self, ticker, finnhub_limiter, llm_limiter, batcher=None):
+        """Async analyze_single_ticker: the Finnhub call and the article reviews
+        run through the shared limiters, all reviews of the ticker concurrently
+        (packed into batched prompts by `batcher` if given). Near-duplicates
+        await the review task of their cluster's first article."""
+        print(f"Analyzing {ticker}...")
+        self.ticker = ticker
+        state = self._load_news_state(ticker)
+        news = await finnhub_limiter.call(self._fetch_company_news, ticker,
+                                          since=state and state["watermark"])
+        news = self._unseen_news(state, news)
+
+        async def review(entry, prompt, content):
+            key, answer = self._cached(NEWS_REVIEW_PROMPT, content)
+            if answer is not None or not self._review_allowed():
+                return answer
+            if batcher is not None:
+                return await batcher.submit(
+                    _ReviewItem(self, dict(content, time=entry["date"]), prompt, key))
+            return await _limited_chat(llm_limiter, self, prompt, key)
+
+        news_list = []
+        pending = []
+        for news_item in news:
+            entry, prompt, content = self._news_review_request(ticker, news_item)
+            cid, is_new = self._cluster(news_item)
+            if is_new:
+                task = asyncio.ensure_future(review(entry, prompt, content))
+                if cid is not None:
+                    self.news_clusters.values[cid] = (entry["url"], task)
+            else:
+                entry["duplicate_of"], task = self.news_clusters.values[cid]
+            news_list.append(entry)
+            pending.append(task)
+        reviews = await asyncio.gather(*pending)
+        for entry, answer in zip(news_list, reviews):
+            entry["review"] = answer
+        return {
+            "ticker": ticker,
+            "business_summary": None,
+            "news": self._remember_news(ticker, state, news, news_list)
+        }
+
 
 class CookStockAskGPTBatch:
-    def __init__(self, input_json, output_json, base_path=None):
+    def __init__(self, input_json, output_json, base_path=None, client=None, finnhub_client=None):
         self.input_json = input_json
         self.output_json = output_json
-        self.client = OpenAI()
-        api_key = os.getenv('FINHUB_API_KEY')
-        if not api_key:
-            raise ValueError("FINHUB_API_KEY not set in environment variables.")
-        self.finnhub_client = finnhub.Client(api_key=api_key)
+        # shared by every ticker's analyzer; defaults follow LLM_BACKEND / NEWS_BACKEND
+        self.client = client or make_llm_client()
+        self.finnhub_client = finnhub_client or make_news_client()
         self.cost_per_token_prompt = 0.15 / 1000000
         self.cost_per_token_answer = 0.60 / 1000000
         self.text_cost = 0
-        if base_path:
-            self.base_path = base_path
-        self.base_path = find_path()
+        self.saved_cost = 0
+        self.cache_hits = 0
+        self.duplicate_news = 0
+        self.known_news = 0
+        # NEWS_DEDUP=global shares one clusterer, and so the reviews, across tickers
+        self.news_clusters = news_clusterer() if NEWS_DEDUP == "global" else None
+        self.base_path = base_path or find_path()
         self.output_json = setup_result_file(output_json)
     
     def analyze_batch(self):
+        """Review every ticker of the input JSON, then write the LLM report
+        (`<output>_llm_report.json`) with per-stage and per-ticker telemetry.
+
+        Telemetry and budgets start from zero for every batch, so an earlier
+        batch of the same process neither counts in the report nor uses up
+        this batch's budget.
+        """
+        LLM_TELEMETRY.reset()
+        try:
+            if ASKGPT_BATCH_MODE == "async":
+                asyncio.run(self.analyze_batch_async())
+            else:
+                self._analyze_batch_sequential()
+        finally:
+            report = LLM_TELEMETRY.write_report(os.path.splitext(self.output_json)[0] + "_llm_report.json")
+            print(f"LLM calls cost {report['total_cost']:.4f} USD for {report['total_tokens']} tokens"
+                  f"{' (budget exceeded)' if report['budget']['exceeded'] else ''}")
+
+    def _analyze_batch_sequential(self):
         with open(self.input_json, 'r') as f:
             tickers_data = js.load(f)
         results = tickers_data.copy()
         for entry in results['data']:
             for ticker, details in entry.items():
                 try:
-                    x = CookStockAskGPT(client=self.client, finnhub_client=self.finnhub_client)
+                    x = CookStockAskGPT(base_path=self.base_path, client=self.client,
+                                        finnhub_client=self.finnhub_client,
+                                        news_clusters=self.news_clusters)
                     analysis = x.analyze_single_ticker(ticker)
-                    self.text_cost += x.text_cost
-                    print(f"Total text cost so far: {self.text_cost}")
+                    self._add_stats(x)
+                    print(f"Total text cost so far: {self.text_cost} (saved {self.saved_cost} from cache)")
                     if analysis:
                         details['business_summary'] = analysis['business_summary']
                         details['news'] = analysis['news']
@@ -372,9 +961,139 @@ class CookStockAskGPTBatch:
                 except Exception as e:
                     print(f"Error: {e}")
                     continue
+
+    async def analyze_batch_async(self, finnhub_concurrency=FINNHUB_CONCURRENCY,
+                                  llm_concurrency=LLM_CONCURRENCY):
+        """Review all tickers concurrently and stream each to the output file when done.
+
+        Finnhub and OpenAI requests go through separate AdaptiveLimiters, so
+        their concurrency and pacing adapt independently. Tickers are written
+        in completion order.
+        """
+        with open(self.input_json, 'r') as f:
+            tickers_data = js.load(f)
+        results = tickers_data.copy()
+        finnhub_limiter = AdaptiveLimiter("finnhub", finnhub_concurrency, FINNHUB_MIN_INTERVAL_S)
+        llm_limiter = AdaptiveLimiter("llm", llm_concurrency)
+        batcher = ReviewBatcher(llm_limiter) if LLM_BATCH_TOKENS > 0 else None
+
+        async def run(ticker, details):
+            x = CookStockAskGPT(base_path=self.base_path, client=self.client,
+                                finnhub_client=self.finnhub_client,
+                                news_clusters=self.news_clusters)
+            try:
+                analysis = await x.analyze_single_ticker_async(ticker, finnhub_limiter, llm_limiter,
+                                                               batcher)
+                return ticker, details, x, analysis, None
+            except Exception as e:
+                return ticker, details, x, None, e
+
+        tasks = [asyncio.ensure_future(run(ticker, details))
+                 for entry in results['data'] for ticker, details in entry.items()]
+        start = time.time()
+        for done, task in enumerate(asyncio.as_completed(tasks), 1):
+            ticker, details, x, analysis, error = await task
+            self._add_stats(x)
+            if error is not None:
+                print(f"Error: {error}")
+                continue
+            print(f"[{done}/{len(tasks)}] {ticker} done; total text cost so far: {self.text_cost} "
+                  f"(saved {self.saved_cost} from cache)")
+            if analysis:
+                details['business_summary'] = analysis['business_summary']
+                details['news'] = analysis['news']
+                append_to_json(self.output_json, {ticker: details})
+        print(f"Reviewed {len(tasks)} tickers in {time.time() - start:.1f}s "
+              f"(rate limited: finnhub {finnhub_limiter.throttled}x, llm {llm_limiter.throttled}x; "
+              f"{self.cache_hits} cached reviews saved {self.saved_cost}; "
+              f"{self.duplicate_news} near-duplicate articles reused a review; "
+              f"{self.known_news} articles known from earlier runs)")
+        if batcher is not None:
+            print(f"Sent {batcher.batches} batched review prompts "
+                  f"({batcher.fallbacks} articles retried singly)")
+
+    def _add_stats(self, x):
+        """Fold one ticker analyzer's spend, cache savings and skipped articles into the batch totals."""
+        self.text_cost += x.text_cost
+        self.saved_cost += x.saved_cost
+        self.cache_hits += x.cache_hits
+        self.duplicate_news += x.duplicate_news
+        self.known_news += x.known_news
                 
 
         
+# weights of the technical flags in a candidate's signal strength
+_SIGNAL_WEIGHTS = {
+    "combined_strategy": 3,
+    "swing_trade_entry": 2,
+    "is_good_pivot": 2,
+    "is_demand_dry": 1,
+}
+_IMPACT = re.compile(r"impact[^-\d]{0,40}(-?[0-2])\b", re.IGNORECASE)
+
+
+def review_impact(review):
+    """Impact level (-1..2) stated in a news review, 0 if none is found."""
+    match = _IMPACT.search(review or "")
+    return int(match.group(1)) if match else 0
+
+
+def signal_strength(details):
+    """Rank score of one candidate: weighted technical flags, a VCP chart and its best news impact."""
+    score = sum(w for flag, w in _SIGNAL_WEIGHTS.items() if details.get(flag) == "True")
+    if details.get("is_deep_correction") == "True":
+        score -= 2
+    if details.get("fig"):
+        score += 1
+    impacts = [review_impact(n.get("review")) for n in details.get("news", [])]
+    return score + max(impacts, default=0)
+
+
+def candidate_digest(ticker, details, top_reviews=DIGEST_TOP_REVIEWS):
+    """Compact view of one candidate: key technical fields, passed flags and its top reviews."""
+    reviews = [n for n in details.get("news", []) if n.get("review") and not n.get("duplicate_of")]
+    reviews.sort(key=lambda n: review_impact(n["review"]), reverse=True)
+    return {
+        "ticker": ticker,
+        "price": details.get("current price"),
+        "support": details.get("support price"),
+        "pressure": details.get("pressure price"),
+        "ema_8": details.get("ema_8"),
+        "sma_200": details.get("sma_200"),
+        "signals": [flag for flag in (*_SIGNAL_WEIGHTS, "is_deep_correction")
+                    if details.get(flag) == "True"],
+        "news": [n["review"][:DIGEST_REVIEW_CHARS] for n in reviews[:top_reviews]],
+    }
+
+
+def build_candidate_digest(entries, max_tokens=DIGEST_MAX_TOKENS, top_reviews=DIGEST_TOP_REVIEWS):
+    """Return (digest text, tickers included) for the recommendation prompt.
+
+    Candidates are ranked by signal_strength (ties keep input order) and added
+    as one compact JSON line each until the prompt would exceed `max_tokens`
+    estimated tokens; the weakest candidates are dropped first. A strongest
+    candidate too large on its own is shown with fewer news reviews (none if
+    need be); if even that does not fit the digest is empty.
+    """
+    candidates = [(ticker, details) for entry in entries for ticker, details in entry.items()]
+    candidates.sort(key=lambda c: signal_strength(c[1]), reverse=True)
+    used = estimate_tokens(RECOMMENDATION_PROMPT)
+    lines, included = [], []
+    for ticker, details in candidates:
+        # only the first line may shed reviews; later ones end the digest
+        for shown in range(top_reviews, -1 if not lines else top_reviews - 1, -1):
+            line = js.dumps(candidate_digest(ticker, details, shown), separators=(",", ":"))
+            tokens = estimate_tokens(line) + 1
+            if used + tokens <= max_tokens:
+                break
+        if used + tokens > max_tokens:
+            break
+        lines.append(line)
+        included.append(ticker)
+        used += tokens
+    return "\n".join(lines), included
+
+
 def only_select_entries_with_news_review_askGPT(input_json, output_json, out_review_md):
     # Load data from JSON file
     with open(input_json, 'r') as f:
@@ -390,14 +1109,25 @@ def only_select_entries_with_news_review_askGPT(input_json, output_json, out_rev
                 break  # Avoid processing the same entry multiple times
     
     
-    userMessageContent = (
-        f"look at the list of stocks, which is a structured data,"
-        f"it contains stock ticker, technical analysis and review of company news"
-        f"recommend me 5 stocks from the list and tell me why.{filtered_data}"
-    )
-    # Ask GPT for stock recommendations
-    x = CookStockAskGPT()
-    recommendations = x._ask_gpt(prompt=userMessageContent)
+    digest, included = build_candidate_digest(filtered_data)
+    print(f"Recommendation digest: {len(included)} of {len(filtered_data)} candidates "
+          f"(~{estimate_tokens(digest)} tokens)")
+    if not included:
+        # nothing to recommend from; do not pay for an empty prompt
+        print(f"Warning: no candidate fits DIGEST_MAX_TOKENS={DIGEST_MAX_TOKENS}; "
+              f"skipping the recommendation call")
+        recommendations = "No recommendation: no candidate fit the recommendation prompt."
+    else:
+        userMessageContent = RECOMMENDATION_PROMPT.format(content=digest)
+        # Ask GPT for stock recommendations
+        x = CookStockAskGPT()
+        recommendations = x._ask_gpt(prompt=userMessageContent, template=RECOMMENDATION_PROMPT,
+                                     content=digest, stage="recommendation")
+        LLM_TELEMETRY.write_report(os.path.splitext(out_review_md)[0] + "_llm_report.json")
+        if recommendations is None:
+            # a 'stop' budget used up by the reviews refuses this call too
+            recommendations = ("No recommendation: LLM budget exhausted." if LLM_TELEMETRY.stopped
+                               else "No recommendation: the LLM call failed.")
     print(f"Recommendations: {recommendations}")
     # Save filtered data to a new JSON file
     
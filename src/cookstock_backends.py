@@ -0,0 +1,363 @@
+"""
+LLM and news backends of the news-review stage.
+
+CookStockAskGPT talks to an OpenAI-style chat client
+(`client.chat.completions.create`) and a Finnhub-style news client
+(`company_news(symbol, _from, to)`). The modes below share those interfaces,
+so the stage, and the concurrency, caching and batching of
+CookStockAskGPTBatch.analyze_batch, can run and be load-tested without live
+services:
+
+- LLM_BACKEND
+    openai:  OpenAI() (OPENAI_API_KEY; OPENAI_BASE_URL points it at any
+             OpenAI-compatible server)
+    fake:    FakeChatClient, an in-process stand-in with deterministic notes,
+             configurable latency and token counts and optional 429 answers
+- NEWS_BACKEND
+    finnhub:   finnhub.Client (FINHUB_API_KEY)
+    record:    finnhub.Client, every response also merged into NEWS_FIXTURE_DIR
+    fixture:   FixtureNewsClient, recorded responses served offline
+    synthetic: SyntheticNewsClient, seeded articles for any symbol, including
+               syndicated near-copies
+
+Fixture layout:
+    <NEWS_FIXTURE_DIR>/<SYMBOL>.json   {"recorded_at": ts, "news": [Finnhub items]}
+
+Replayed article times are shifted by the time elapsed since `recorded_at`,
+so articles keep their age and fall into the same retrieval windows as when
+they were recorded.
+
+    client = make_llm_client("fake")
+    news = make_news_client("synthetic")
+    CookStockAskGPTBatch(input_json, output_json, client=client, finnhub_client=news)
+"""
+import os
+import re
+import json as js
+import time
+import zlib
+import random
+import logging
+import threading
+import datetime as dt
+from types import SimpleNamespace
+
+from cookstock_llm import estimate_tokens
+
+logger = logging.getLogger(__name__)
+if not logger.handlers:
+    handler = logging.StreamHandler()
+    formatter = logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s")
+    handler.setFormatter(formatter)
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    log_level = os.getenv("LOG_LEVEL")
+    if log_level:
+        try:
+            logger.setLevel(getattr(logging, log_level.upper()))
+        except Exception:
+            logger.warning("Invalid LOG_LEVEL '%s'; using INFO", log_level)
+
+LLM_BACKENDS = ("openai", "fake")
+NEWS_BACKENDS = ("finnhub", "record", "fixture", "synthetic")
+
+LLM_BACKEND = os.getenv("LLM_BACKEND", "openai").lower()
+NEWS_BACKEND = os.getenv("NEWS_BACKEND", "finnhub").lower()
+_ROOT = os.environ.get("COOKSTOCK_PATH") or os.path.dirname(
+    os.path.dirname(os.path.abspath(__file__))
+)
+NEWS_FIXTURE_DIR = os.getenv(
+    "NEWS_FIXTURE_DIR", os.path.join(_ROOT, "results", "cache", "news_fixtures")
+)
+# fake LLM: a call takes latency + per-token * completion tokens; each note
+# is FAKE_LLM_COMPLETION_TOKENS long and a FAKE_LLM_RATE_LIMIT share of the
+# calls is answered with HTTP 429
+FAKE_LLM_LATENCY_MS = float(os.getenv("FAKE_LLM_LATENCY_MS", "300"))
+FAKE_LLM_MS_PER_TOKEN = float(os.getenv("FAKE_LLM_MS_PER_TOKEN", "5"))
+FAKE_LLM_COMPLETION_TOKENS = int(os.getenv("FAKE_LLM_COMPLETION_TOKENS", "30"))
+FAKE_LLM_RATE_LIMIT = float(os.getenv("FAKE_LLM_RATE_LIMIT", "0"))
+# offline news: latency per company_news call and synthetic articles per day
+FAKE_NEWS_LATENCY_MS = float(os.getenv("FAKE_NEWS_LATENCY_MS", "100"))
+FAKE_NEWS_PER_DAY = int(os.getenv("FAKE_NEWS_PER_DAY", "3"))
+FAKE_NEWS_SEED = int(os.getenv("FAKE_NEWS_SEED", "0"))
+
+_ITEM = re.compile(r"^(\d+)\. (.*)$", re.MULTILINE)
+_TICKER = re.compile(r"""["']ticker["']\s*:\s*["']([^"']+)["']""")
+_STOCK = re.compile(r"stock (?:ticker )?([A-Z][A-Z0-9.\-]{0,9})\b")
+
+
+class FakeRateLimitError(Exception):
+    """429 answer of FakeChatClient, shaped like an OpenAI RateLimitError."""
+
+    status_code = 429
+
+    def __init__(self, retry_after):
+        super().__init__("Rate limit reached (fake LLM backend)")
+        self.response = SimpleNamespace(status_code=429, headers={"retry-after": str(retry_after)})
+
+
+class _FakeCompletions:
+    def __init__(self, owner):
+        self._owner = owner
+
+    def create(self, model=None, messages=(), **kwargs):
+        return self._owner._complete(model, messages)
+
+
+class FakeChatClient:
+    """In-process stand-in for the OpenAI chat client.
+
+    Answers are deterministic notes of the form the review prompts ask for
+    ("... Impact: 1. ..."): a JSON object of notes keyed by item number for
+    batched prompts, and a pick of listed tickers for candidate lists. Usage
+    reports the estimated prompt tokens and `completion_tokens` per note; a
+    call sleeps `latency_ms + ms_per_token * completion tokens`. `calls`,
+    `rate_limited` and `max_in_flight` count what the client saw. Thread-safe.
+    """
+
+    def __init__(self, latency_ms=FAKE_LLM_LATENCY_MS, ms_per_token=FAKE_LLM_MS_PER_TOKEN,
+                 completion_tokens=FAKE_LLM_COMPLETION_TOKENS, rate_limit=FAKE_LLM_RATE_LIMIT,
+                 retry_after=0.1, seed=0):
+        self.latency_ms = latency_ms
+        self.ms_per_token = ms_per_token
+        self.completion_tokens = completion_tokens
+        self.rate_limit = rate_limit
+        self.retry_after = retry_after
+        self.calls = 0
+        self.rate_limited = 0
+        self.max_in_flight = 0
+        self._in_flight = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.chat = SimpleNamespace(completions=_FakeCompletions(self))
+
+    def _note(self, text):
+        match = _TICKER.search(text) or _STOCK.search(text)
+        ticker = match.group(1) if match else "the stock"
+        impact = zlib.crc32(text.encode("utf-8")) % 4 - 1
+        return f"Timely and related to {ticker}. Impact: {impact}. Fake review for offline runs."
+
+    def answer(self, prompt):
+        """Return (answer text, number of notes in it) for `prompt`."""
+        items = _ITEM.findall(prompt)
+        if items:
+            notes = {number: self._note(text) for number, text in items}
+            return js.dumps(notes), len(notes)
+        tickers = list(dict.fromkeys(_TICKER.findall(prompt)))
+        if len(tickers) > 1:
+            picks = tickers[:5]
+            return "\n".join(f"{i}. {t}: strongest technical signals in the list (fake)."
+                             for i, t in enumerate(picks, 1)), len(picks)
+        return self._note(prompt), 1
+
+    def _complete(self, model, messages):
+        prompt = "\n".join(str(m.get("content", "")) for m in messages)
+        with self._lock:
+            self.calls += 1
+            limited = self.rate_limit > 0 and self._rng.random() < self.rate_limit
+            if limited:
+                self.rate_limited += 1
+            else:
+                self._in_flight += 1
+                self.max_in_flight = max(self.max_in_flight, self._in_flight)
+        if limited:
+            raise FakeRateLimitError(self.retry_after)
+        try:
+            content, notes = self.answer(prompt)
+            completion_tokens = self.completion_tokens * notes
+            time.sleep((self.latency_ms + self.ms_per_token * completion_tokens) / 1000.0)
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+        return SimpleNamespace(
+            model=model,
+            choices=[SimpleNamespace(message=SimpleNamespace(role="assistant", content=content))],
+            usage=SimpleNamespace(prompt_tokens=estimate_tokens(prompt),
+                                  completion_tokens=completion_tokens),
+        )
+
+
+def _day_bounds(_from, to):
+    """Unix time range [start of `_from`, end of `to`) for YYYY-MM-DD strings."""
+    start = dt.datetime.strptime(_from, "%Y-%m-%d")
+    end = dt.datetime.strptime(to, "%Y-%m-%d") + dt.timedelta(days=1)
+    return start.timestamp(), end.timestamp()
+
+
+def _fixture_path(root, symbol):
+    return os.path.join(root, f"{symbol.replace('/', '_')}.json")
+
+
+class RecordingNewsClient:
+    """Wraps a Finnhub client and merges every company_news answer into fixtures."""
+
+    def __init__(self, client, root=NEWS_FIXTURE_DIR):
+        self.client = client
+        self.root = root
+        self._lock = threading.Lock()
+
+    def company_news(self, symbol, _from, to):
+        news = self.client.company_news(symbol, _from=_from, to=to)
+        path = _fixture_path(self.root, symbol)
+        with self._lock:
+            try:
+                with open(path, "r") as f:
+                    stored = js.load(f)["news"]
+            except (OSError, ValueError, KeyError):
+                stored = []
+            merged = {str(n.get("id") or n.get("url")): n for n in stored + list(news)}
+            os.makedirs(self.root, exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, "w") as f:
+                js.dump({"recorded_at": time.time(), "news": list(merged.values())}, f)
+            os.replace(tmp, path)
+        return news
+
+
+class FixtureNewsClient:
+    """Serves recorded company_news answers from `root` (an empty list for unknown symbols).
+
+    Article times are moved forward by the time since recording, then
+    filtered to the requested days like Finnhub does.
+    """
+
+    def __init__(self, root=NEWS_FIXTURE_DIR, latency_ms=FAKE_NEWS_LATENCY_MS):
+        self.root = root
+        self.latency_ms = latency_ms
+        self.calls = 0
+        self.misses = 0
+
+    def company_news(self, symbol, _from, to):
+        self.calls += 1
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000.0)
+        try:
+            with open(_fixture_path(self.root, symbol), "r") as f:
+                fixture = js.load(f)
+        except (OSError, ValueError):
+            self.misses += 1
+            logger.debug("No news fixture for %s in %s", symbol, self.root)
+            return []
+        shift = int(time.time() - fixture.get("recorded_at", time.time()))
+        start, end = _day_bounds(_from, to)
+        news = [dict(n, datetime=n["datetime"] + shift) for n in fixture.get("news", [])]
+        news = [n for n in news if start <= n["datetime"] < end]
+        news.sort(key=lambda n: n["datetime"], reverse=True)
+        return news
+
+
+_SOURCES = ("Reuters", "Yahoo", "MarketWatch", "Benzinga", "SeekingAlpha")
+_EVENTS = (
+    "reports quarterly earnings above expectations",
+    "announces a new product line",
+    "faces a regulatory review of its main market",
+    "raises full-year guidance after strong demand",
+    "shares slip as analysts cut price targets",
+    "signs a multi-year supply agreement",
+    "expands buyback program",
+    "names a new chief financial officer",
+)
+
+
+class SyntheticNewsClient:
+    """Seeded Finnhub-shaped news for any symbol.
+
+    Every day has `per_day` articles at fixed hours, so a symbol's articles
+    and ids never change between calls and new ones appear as time passes.
+    A `duplicate_rate` share of them are syndicated near-copies of the
+    previous article with a different source, id and URL.
+    """
+
+    def __init__(self, seed=FAKE_NEWS_SEED, per_day=FAKE_NEWS_PER_DAY, duplicate_rate=0.3,
+                 latency_ms=FAKE_NEWS_LATENCY_MS):
+        self.seed = seed
+        self.per_day = per_day
+        self.duplicate_rate = duplicate_rate
+        self.latency_ms = latency_ms
+        self.calls = 0
+
+    def _day(self, symbol, day):
+        rng = random.Random(zlib.crc32(f"{self.seed}:{symbol}:{day.isoformat()}".encode()))
+        midnight = dt.datetime.combine(day, dt.time()).timestamp()
+        hours = sorted(rng.sample(range(24), min(self.per_day, 24)))
+        articles, previous = [], None
+        for i, hour in enumerate(hours):
+            article_id = zlib.crc32(f"{self.seed}:{symbol}:{day.isoformat()}:{i}".encode())
+            source = rng.choice(_SOURCES)
+            if previous is not None and rng.random() < self.duplicate_rate:
+                headline = f"{previous['headline']} - {source}"
+                summary = previous["summary"]
+            else:
+                event = rng.choice(_EVENTS)
+                headline = f"{symbol} {event}"
+                summary = (f"{symbol} {event}, according to people familiar with the matter. "
+                           f"The company said the move reflects conditions seen on {day:%B %d}.")
+            previous = {
+                "category": "company",
+                "datetime": int(midnight + hour * 3600 + rng.randrange(3600)),
+                "headline": headline,
+                "id": article_id,
+                "image": "",
+                "related": symbol,
+                "source": source,
+                "summary": summary,
+                "url": f"https://news.example.test/{symbol.lower()}/{article_id}",
+            }
+            articles.append(previous)
+        return articles
+
+    def company_news(self, symbol, _from, to):
+        self.calls += 1
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000.0)
+        start, end = _day_bounds(_from, to)
+        now = time.time()
+        day = dt.date.fromtimestamp(start)
+        last = dt.date.fromtimestamp(end - 1)
+        news = []
+        while day <= last:
+            news += [n for n in self._day(symbol, day) if start <= n["datetime"] < end
+                     and n["datetime"] <= now]
+            day += dt.timedelta(days=1)
+        news.sort(key=lambda n: n["datetime"], reverse=True)
+        return news
+
+
+def make_llm_client(mode=None):
+    """Chat client for `mode` (see LLM_BACKENDS; default LLM_BACKEND)."""
+    mode = (mode or LLM_BACKEND).lower()
+    if mode not in LLM_BACKENDS:
+        raise ValueError(f"Invalid LLM backend '{mode}'. Options: {LLM_BACKENDS}")
+    if mode == "fake":
+        logger.info("Using the fake LLM backend")
+        return FakeChatClient()
+    from openai import OpenAI
+
+    return OpenAI()
+
+
+def make_news_client(mode=None, fixture_dir=None):
+    """Finnhub-style news client for `mode` (see NEWS_BACKENDS; default NEWS_BACKEND).
+
+    'finnhub' and 'record' need FINHUB_API_KEY.
+    """
+    mode = (mode or NEWS_BACKEND).lower()
+    if mode not in NEWS_BACKENDS:
+        raise ValueError(f"Invalid news backend '{mode}'. Options: {NEWS_BACKENDS}")
+    fixture_dir = fixture_dir or NEWS_FIXTURE_DIR
+    if mode == "fixture":
+        logger.info("Serving news fixtures from %s", fixture_dir)
+        return FixtureNewsClient(fixture_dir)
+    if mode == "synthetic":
+        logger.info("Using synthetic news (seed %d)", FAKE_NEWS_SEED)
+        return SyntheticNewsClient()
+    api_key = os.getenv("FINHUB_API_KEY")
+    if not api_key:
+        raise ValueError("FINHUB_API_KEY not set in environment variables.")
+    import finnhub
+
+    client = finnhub.Client(api_key=api_key)
+    if mode == "record":
+        logger.info("Recording news fixtures to %s", fixture_dir)
+        return RecordingNewsClient(client, fixture_dir)
+    return client
@@ -0,0 +1,255 @@
+"""
+Checkpoint, sharding and shard-merge helpers of batch_process.
+
+RunManifest is the JSON-lines checkpoint each batch run appends its finished
+tickers to (BATCH_RESUME=1 continues from it). BATCH_SHARD="k/N" splits the
+tickers into stable hash partitions written to results/<date>/shards, and
+merge_shards combines the shard outputs into the normal results layout.
+This module does not import cookStock, so merging shards
+(batch/runBatch_mergeShards.py) needs no analysis code.
+"""
+import os
+import csv
+import zlib
+import shutil
+import logging
+import threading
+import json as js
+import datetime as dt
+
+logger = logging.getLogger(__name__)
+if not logger.handlers:
+    handler = logging.StreamHandler()
+    formatter = logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s")
+    handler.setFormatter(formatter)
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    log_level = os.getenv("LOG_LEVEL")
+    if log_level:
+        try:
+            logger.setLevel(getattr(logging, log_level.upper()))
+        except Exception:
+            logger.warning("Invalid LOG_LEVEL '%s'; using INFO", log_level)
+
+# Checkpointing: every finished ticker is appended to a manifest in the results
+# folder; BATCH_RESUME=1 continues an interrupted run instead of starting over
+RUN_MANIFEST_NAME = "run_manifest.jsonl"
+BATCH_RESUME = os.getenv("BATCH_RESUME", "false").lower() in ("1", "true", "yes")
+# Multi-node runs: BATCH_SHARD="k/N" processes the k-th of N stable hash
+# partitions of the tickers into results/<date>/shards/shard-k-of-N
+BATCH_SHARD = os.getenv("BATCH_SHARD")
+
+
+class RunManifest:
+    """Append-only JSON-lines checkpoint of a batch run.
+
+    The first line describes the run; each further line is one finished
+    ticker: its position in the ticker list, market, CSV row, JSON record and
+    combined-strategy flag. A line cut short by a crash is ignored on load.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def start(self, tickers, sectors, shard=None):
+        """Begin a fresh run, discarding any previous checkpoint."""
+        header = {
+            "type": "run",
+            "sectors": sectors,
+            "tickers": list(tickers),
+            "shard": list(shard) if shard else None,
+            "started": dt.datetime.now().isoformat(timespec="seconds"),
+        }
+        with self._lock:
+            with open(self.path, "w") as f:
+                f.write(js.dumps(header) + "\n")
+
+    def record(self, entry):
+        """Append one finished ticker (dict with at least 'ticker')."""
+        line = js.dumps(dict(entry, type="ticker"), default=str)
+        with self._lock:
+            with open(self.path, "a") as f:
+                f.write(line + "\n")
+                f.flush()
+
+    def rewrite(self, header, records):
+        """Atomically replace the manifest by `header` plus `records` (a resume
+        starts from a clean file, without a half-written last line)."""
+        tmp = self.path + ".tmp"
+        with self._lock:
+            with open(tmp, "w") as f:
+                f.write(js.dumps(dict(header, type="run"), default=str) + "\n")
+                for r in sorted(records, key=lambda r: r.get("index", 0)):
+                    f.write(js.dumps(r, default=str) + "\n")
+            os.replace(tmp, self.path)
+
+    def load(self):
+        """Return (run header, {ticker: last record}) from an existing manifest."""
+        header, records = {}, {}
+        if not os.path.exists(self.path):
+            return header, records
+        with open(self.path, "r") as f:
+            for line in f:
+                try:
+                    entry = js.loads(line)
+                except ValueError:
+                    logger.warning("Ignoring truncated line in %s", self.path)
+                    continue
+                if entry.get("type") == "run":
+                    header = entry
+                elif entry.get("type") == "ticker":
+                    records[entry["ticker"]] = entry
+        return header, records
+
+
+def parse_shard(spec):
+    """Parse "k/N" (or a (k, N) pair, 1 <= k <= N) into (k, N); None if unset."""
+    if not spec:
+        return None
+    if isinstance(spec, str):
+        k, _, n = spec.partition("/")
+        spec = (k, n)
+    k, n = int(spec[0]), int(spec[1])
+    if not 1 <= k <= n:
+        raise ValueError(f"Invalid shard {k}/{n}; expected 1 <= k <= N")
+    return k, n
+
+
+def shard_dirname(k, n):
+    return f"shard-{k}-of-{n}"
+
+
+def shard_tickers(tickers, k, n):
+    """Tickers of shard k (1-based) of n; a stable crc32 hash partition."""
+    return [t for t in tickers if zlib.crc32(str(t).upper().encode()) % n == k - 1]
+
+
+def sort_csv_by_buy_signal(filepath):
+    """Sort CSV file by Final Signal (YES first), then VCP Buy, then Buy Signal, then Price to Support %."""
+    try:
+        # Read all rows
+        with open(filepath, "r", newline="") as f:
+            reader = csv.reader(f)
+            header = next(reader)
+            rows = list(reader)
+
+        # Skip if no data rows
+        if not rows:
+            return
+
+        # Sort by: Final Signal (YES first), VCP Buy (YES first), VCP Changed (YES first), Buy Signal (YES first), Price to Support % (smallest first)
+        # Column indices: Ticker=0, Final Signal=1, VCP Buy=2, Prev VCP Buy=3, VCP Changed=4, Buy Signal=5, ..., Price to Support %=16
+        def sort_key(row):
+            final_signal_yes = row[1] == "YES"
+            vcp_buy_yes = row[2] == "YES"
+            vcp_changed_yes = row[4] == "YES"
+            buy_yes = row[5] == "YES"
+            sell_yes = row[7] == "YES"
+            try:
+                # Price to Support % is now at index 16 (shifted by 2 columns)
+                price_to_support_pct = float(row[16]) if (final_signal_yes or vcp_buy_yes or buy_yes) else float("inf")
+            except (ValueError, IndexError):
+                price_to_support_pct = float("inf")
+            return (not final_signal_yes, not vcp_buy_yes, not vcp_changed_yes, not buy_yes, price_to_support_pct, sell_yes)
+
+        rows.sort(key=sort_key)
+
+        # Write back sorted data
+        with open(filepath, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(header)
+            writer.writerows(rows)
+
+        logger.info("Sorted CSV file: %s", filepath)
+    except Exception:
+        logger.exception("Failed to sort CSV file: %s", filepath)
+
+
+def _shard_csv_header(shard_dirs):
+    """CSV header of the shard outputs (every shard writes all market CSVs)."""
+    for shard_dir in shard_dirs:
+        for market in ("US", "UK", "HK"):
+            try:
+                with open(os.path.join(shard_dir, f"__result_{market}.csv"), newline="") as f:
+                    return next(csv.reader(f))
+            except (OSError, StopIteration):
+                continue
+    raise FileNotFoundError("No shard result CSV to take the header from")
+
+
+def merge_shards(results_path, sectors, shards=None):
+    """Combine shard outputs under <results_path>/shards into <results_path>.
+
+    Shard run manifests are merged in the original ticker order, so the result
+    is deterministic whatever the number of shards: the JSON result file, the
+    market CSVs (re-sorted with sort_csv_by_buy_signal) and the chart folders,
+    with "fig" paths pointing at the merged charts. `shards` (N) checks that
+    every shard-k-of-N folder is present. Returns the number of tickers merged.
+    """
+    shard_root = os.path.join(results_path, "shards")
+    shard_dirs = sorted(
+        os.path.join(shard_root, d)
+        for d in os.listdir(shard_root)
+        if os.path.isdir(os.path.join(shard_root, d))
+    )
+    if shards:
+        expected = {shard_dirname(k, shards) for k in range(1, shards + 1)}
+        found = {os.path.basename(d) for d in shard_dirs}
+        if expected - found:
+            logger.warning("Missing shard outputs: %s", sorted(expected - found))
+        shard_dirs = [d for d in shard_dirs if os.path.basename(d) in expected]
+
+    records = {}
+    for shard_dir in shard_dirs:
+        header, recs = RunManifest(os.path.join(shard_dir, RUN_MANIFEST_NAME)).load()
+        if header.get("sectors") not in (None, sectors):
+            logger.warning("%s holds sectors %s", shard_dir, header.get("sectors"))
+        for ticker, r in recs.items():
+            records[ticker] = dict(r, shard_dir=shard_dir)
+    ordered = sorted(records.values(), key=lambda r: (r.get("index", 0), r["ticker"]))
+
+    json_data = []
+    rows = {}
+    for r in ordered:
+        market = r.get("market", "US")
+        rows.setdefault(market, []).append(r["csv_row"])
+        if not r.get("json"):
+            continue
+        ticker_data = r["json"]
+        details = ticker_data.get(r["ticker"], {})
+        if details.get("fig"):
+            img_folder = os.path.join(results_path, f"charts_{market}")
+            os.makedirs(img_folder, exist_ok=True)
+            src = details["fig"]
+            if not os.path.exists(src):
+                src = os.path.join(
+                    r["shard_dir"], f"charts_{market}", os.path.basename(src)
+                )
+            dest = os.path.join(img_folder, os.path.basename(src))
+            try:
+                shutil.copyfile(src, dest)
+                details["fig"] = dest
+            except OSError:
+                logger.warning("Chart %s missing for %s", src, r["ticker"])
+        json_data.append(ticker_data)
+
+    with open(os.path.join(results_path, sectors + ".json"), "w") as f:
+        js.dump({"data": json_data}, f, indent=4)
+    header = _shard_csv_header(shard_dirs)
+    for market in ("US", "UK", "HK"):
+        csv_file = os.path.join(results_path, f"__result_{market}.csv")
+        if market not in rows and os.path.exists(csv_file):
+            continue
+        with open(csv_file, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(header)
+            writer.writerows(rows.get(market, []))
+        sort_csv_by_buy_signal(csv_file)
+    logger.info(
+        "Merged %d tickers from %d shard(s) into %s",
+        len(ordered),
+        len(shard_dirs),
+        results_path,
+    )
+    return len(ordered)
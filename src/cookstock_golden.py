@@ -0,0 +1,335 @@
+"""
+Golden-output equivalence check between two cookStock implementations.
+
+Runs batch_pipeline_full from a reference source tree (a git ref, exported to a
+temporary folder, or any directory containing cookStock.py) and from a
+candidate tree on the same offline dataset (synthetic or a replay archive),
+each in its own subprocess and results folder. Then diffs every CSV column and
+JSON field per ticker, with numeric tolerances, and lists changed signals
+("Final Signal", "VCP Buy", ...) separately from other differences.
+
+Both trees must support the offline data providers (DATA_PROVIDER env).
+
+Usage:
+    python src/cookstock_golden.py --reference HEAD --tickers 200
+    python src/cookstock_golden.py --reference main --candidate src \
+        --provider replay --archive ~/cookstock_archive --report golden.json
+"""
+import os
+import io
+import sys
+import csv
+import math
+import json as js
+import shutil
+import tarfile
+import logging
+import argparse
+import tempfile
+import subprocess
+
+logger = logging.getLogger(__name__)
+if not logger.handlers:
+    handler = logging.StreamHandler()
+    formatter = logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s")
+    handler.setFormatter(formatter)
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    log_level = os.getenv("LOG_LEVEL")
+    if log_level:
+        try:
+            logger.setLevel(getattr(logging, log_level.upper()))
+        except Exception:
+            logger.warning("Invalid LOG_LEVEL '%s'; using INFO", log_level)
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(SRC_DIR)
+
+# Columns/fields whose change alters a trading decision
+SIGNAL_FIELDS = (
+    "Final Signal",
+    "VCP Buy",
+    "Prev VCP Buy",
+    "VCP Changed",
+    "Early VCP",
+    "Buy Signal",
+    "Sell Signal",
+    "Swing Trade Entry",
+    "Double 7's Entry",
+    "Double 7's Exit",
+    "Good Pivot",
+    "Deep Correction",
+    "Demand Dry",
+    "is_good_pivot",
+    "is_deep_correction",
+    "is_demand_dry",
+    "swing_trade_entry",
+    "combined_strategy",
+)
+# Fields holding paths into the run's own results folder
+PATH_FIELDS = ("fig",)
+
+RESULT_NAME = "golden"
+
+# Executed as `python -c _RUNNER <src_dir> <results_dir> <tickers.json>`
+_RUNNER = """
+import sys, json
+sys.path.insert(0, sys.argv[1])
+import cookStock
+with open(sys.argv[3]) as f:
+    tickers = json.load(f)
+try:
+    y = cookStock.batch_process(tickers, %r, results_dir=sys.argv[2])
+except TypeError:
+    # trees without results_dir: redirect output after construction
+    y = cookStock.batch_process(tickers, %r)
+    y.resultsPath = sys.argv[2]
+    y.result_file = cookStock.setup_result_file(sys.argv[2], %r + ".json")
+    for m in list(y.csv_files):
+        y.csv_files[m] = cookStock.os.path.join(sys.argv[2], "__result_%%s.csv" %% m)
+        cookStock.setup_csv_file(y.csv_files[m])
+        y.image_folders[m] = cookStock.os.path.join(sys.argv[2], "charts_%%s" %% m)
+        cookStock.os.makedirs(y.image_folders[m], exist_ok=True)
+y.batch_pipeline_full()
+""" % (RESULT_NAME, RESULT_NAME, RESULT_NAME)
+
+
+def export_git_ref(ref, dest, repo_dir=REPO_DIR):
+    """Export the src/ folder of git `ref` into `dest`; return the src path."""
+    data = subprocess.run(
+        ["git", "-C", repo_dir, "archive", "--format=tar", ref, "src"],
+        check=True,
+        capture_output=True,
+    ).stdout
+    with tarfile.open(fileobj=io.BytesIO(data)) as tar:
+        tar.extractall(dest)
+    return os.path.join(dest, "src")
+
+
+def resolve_source(spec, workdir, label):
+    """Return a src directory for `spec` (a directory or a git ref)."""
+    if os.path.isfile(os.path.join(spec, "cookStock.py")):
+        return os.path.abspath(spec)
+    if os.path.isfile(os.path.join(spec, "src", "cookStock.py")):
+        return os.path.abspath(os.path.join(spec, "src"))
+    logger.info("Exporting git ref %s as %s", spec, label)
+    return export_git_ref(spec, os.path.join(workdir, label + "_tree"))
+
+
+def run_pipeline(src_dir, results_dir, tickers, env):
+    """Run batch_pipeline_full from `src_dir` in a subprocess."""
+    os.makedirs(results_dir, exist_ok=True)
+    tickers_file = os.path.join(os.path.dirname(results_dir), "tickers.json")
+    with open(tickers_file, "w") as f:
+        js.dump(list(tickers), f)
+    cmd = [sys.executable, "-c", _RUNNER, src_dir, results_dir, tickers_file]
+    proc = subprocess.run(cmd, env=env, capture_output=True, text=True)
+    if proc.returncode != 0:
+        logger.error("Pipeline from %s failed:\n%s", src_dir, proc.stderr[-4000:])
+        raise RuntimeError(f"pipeline run from {src_dir} exited with {proc.returncode}")
+    return results_dir
+
+
+def load_csv_rows(results_dir):
+    """Return {ticker: row dict} from every __result_*.csv in `results_dir`."""
+    rows = {}
+    for name in sorted(os.listdir(results_dir)):
+        if not (name.startswith("__result_") and name.endswith(".csv")):
+            continue
+        with open(os.path.join(results_dir, name), "r", newline="") as f:
+            for row in csv.DictReader(f):
+                rows[row["Ticker"]] = row
+    return rows
+
+
+def load_json_records(results_dir, name=RESULT_NAME):
+    """Return {ticker: fields} from the batch result JSON."""
+    with open(os.path.join(results_dir, name + ".json"), "r") as f:
+        data = js.load(f)
+    records = {}
+    for entry in data.get("data", []):
+        if isinstance(entry, dict):
+            records.update(entry)
+    return records
+
+
+def values_equal(ref, cand, rel_tol=1e-9, abs_tol=1e-9, field=None):
+    """Compare two output values, numerically when both parse as numbers."""
+    if field in PATH_FIELDS:
+        return os.path.basename(str(ref)) == os.path.basename(str(cand))
+    if ref == cand:
+        return True
+    try:
+        a, b = float(ref), float(cand)
+    except (TypeError, ValueError):
+        return False
+    if math.isnan(a) and math.isnan(b):
+        return True
+    return math.isclose(a, b, rel_tol=rel_tol, abs_tol=abs_tol)
+
+
+def _diff_records(source, ref, cand, rel_tol, abs_tol):
+    diffs = []
+    for ticker in sorted(set(ref) & set(cand)):
+        fields = list(ref[ticker]) + [k for k in cand[ticker] if k not in ref[ticker]]
+        for field in fields:
+            a = ref[ticker].get(field, "<missing>")
+            b = cand[ticker].get(field, "<missing>")
+            if not values_equal(a, b, rel_tol, abs_tol, field):
+                diffs.append(
+                    {
+                        "ticker": ticker,
+                        "source": source,
+                        "field": field,
+                        "reference": a,
+                        "candidate": b,
+                        "signal": field in SIGNAL_FIELDS,
+                    }
+                )
+    return diffs
+
+
+def compare_outputs(ref_dir, cand_dir, rel_tol=1e-9, abs_tol=1e-9):
+    """Diff two results folders; return a report dict."""
+    report = {"diffs": [], "missing": {}}
+    for source, loader in (("csv", load_csv_rows), ("json", load_json_records)):
+        ref, cand = loader(ref_dir), loader(cand_dir)
+        report["missing"][source] = {
+            "reference_only": sorted(set(ref) - set(cand)),
+            "candidate_only": sorted(set(cand) - set(ref)),
+        }
+        report["diffs"].extend(_diff_records(source, ref, cand, rel_tol, abs_tol))
+        report.setdefault("tickers", len(set(ref) | set(cand)))
+    report["signal_changes"] = [d for d in report["diffs"] if d["signal"]]
+    report["equivalent"] = not report["diffs"] and not any(
+        m["reference_only"] or m["candidate_only"] for m in report["missing"].values()
+    )
+    return report
+
+
+def run_golden(
+    reference="HEAD",
+    candidate=SRC_DIR,
+    tickers=None,
+    provider="synthetic",
+    archive=None,
+    seed=0,
+    as_of=None,
+    rel_tol=1e-9,
+    abs_tol=1e-9,
+    workdir=None,
+):
+    """Run both implementations on the same offline data and compare outputs."""
+    env = dict(os.environ)
+    env.update(
+        {
+            "DATA_PROVIDER": provider,
+            "SYNTHETIC_SEED": str(seed),
+            "REPLAY_LATENCY_MS": "0",
+            "MPLBACKEND": "Agg",
+            "LOG_LEVEL": env.get("LOG_LEVEL", "WARNING"),
+            "COOKSTOCK_PATH": env.get("COOKSTOCK_PATH", REPO_DIR),
+        }
+    )
+    if archive:
+        env["DATA_ARCHIVE_DIR"] = os.path.abspath(os.path.expanduser(archive))
+    if as_of:
+        env["AS_OF_DATE"] = str(as_of)
+
+    workdir = workdir or tempfile.mkdtemp(prefix="cookstock_golden_")
+    ref_src = resolve_source(reference, workdir, "reference")
+    cand_src = resolve_source(candidate, workdir, "candidate")
+    # date-named folders so the previous-day lookup behaves like a real run;
+    # neither side has an earlier folder, so "Prev VCP Buy" stays N/A on both
+    folder = str(as_of or "2000-01-01")
+    ref_out = run_pipeline(ref_src, os.path.join(workdir, "reference", folder), tickers, env)
+    cand_out = run_pipeline(cand_src, os.path.join(workdir, "candidate", folder), tickers, env)
+    report = compare_outputs(ref_out, cand_out, rel_tol=rel_tol, abs_tol=abs_tol)
+    report.update(
+        {
+            "reference": reference,
+            "candidate": candidate,
+            "provider": provider,
+            "seed": seed,
+            "workdir": workdir,
+        }
+    )
+    return report
+
+
+def print_report(report, limit=50):
+    print(
+        f"Compared {report['tickers']} tickers: {len(report['diffs'])} differing "
+        f"field(s), {len(report['signal_changes'])} changed signal(s)"
+    )
+    for source, missing in report["missing"].items():
+        for side, names in missing.items():
+            if names:
+                print(f"  {source}: {len(names)} ticker(s) {side}: {names[:10]}")
+    for d in report["signal_changes"][:limit]:
+        print(f"  SIGNAL {d['ticker']:10s} {d['source']:4s} {d['field']}: "
+              f"{d['reference']} -> {d['candidate']}")
+    others = [d for d in report["diffs"] if not d["signal"]]
+    for d in others[:limit]:
+        print(f"  {d['ticker']:10s} {d['source']:4s} {d['field']}: "
+              f"{d['reference']!r} -> {d['candidate']!r}")
+    if len(others) > limit:
+        print(f"  ... {len(others) - limit} more")
+    print("EQUIVALENT" if report["equivalent"] else "DIFFERENT")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--reference", default="HEAD", help="Git ref or source directory. Default: HEAD")
+    parser.add_argument("--candidate", default=SRC_DIR, help="Git ref or source directory. Default: working tree src/")
+    parser.add_argument("--tickers", type=int, default=100, help="Number of synthetic tickers. Default: 100")
+    parser.add_argument("--ticker-list", help="Comma-separated tickers (default: synthetic or all archived)")
+    parser.add_argument("--provider", choices=("synthetic", "replay"), default="synthetic")
+    parser.add_argument("--archive", help="Replay archive directory")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--as-of", help="Analysis date YYYY-MM-DD")
+    parser.add_argument("--rel-tol", type=float, default=1e-9)
+    parser.add_argument("--abs-tol", type=float, default=1e-9)
+    parser.add_argument("--signals-only", action="store_true", help="Only fail on changed signals")
+    parser.add_argument("--report", help="Write the full report as JSON")
+    parser.add_argument("--keep", action="store_true", help="Keep the work folder")
+    args = parser.parse_args(argv)
+
+    if args.ticker_list:
+        tickers = [t.strip() for t in args.ticker_list.split(",") if t.strip()]
+    elif args.provider == "replay":
+        from cookstock_provider import DataArchive
+
+        if not args.archive:
+            parser.error("--provider replay requires --archive")
+        tickers = DataArchive(os.path.expanduser(args.archive)).tickers()[: args.tickers]
+    else:
+        from cookstock_synthetic import synthetic_tickers
+
+        tickers = synthetic_tickers(args.tickers)
+
+    report = run_golden(
+        reference=args.reference,
+        candidate=args.candidate,
+        tickers=tickers,
+        provider=args.provider,
+        archive=args.archive,
+        seed=args.seed,
+        as_of=args.as_of,
+        rel_tol=args.rel_tol,
+        abs_tol=args.abs_tol,
+    )
+    print_report(report)
+    if args.report:
+        with open(args.report, "w") as f:
+            js.dump(report, f, indent=2, default=str)
+    if args.keep:
+        print(f"Outputs kept in {report['workdir']}")
+    else:
+        shutil.rmtree(report["workdir"], ignore_errors=True)
+    failed = report["signal_changes"] if args.signals_only else not report["equivalent"]
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
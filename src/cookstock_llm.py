@@ -0,0 +1,345 @@
+"""
+Persistent cache for LLM answers.
+
+Entries are keyed by a SHA-256 of (model, prompt template, content): the
+template is the unformatted prompt text, so editing a prompt invalidates its
+old answers, and the content is the canonical JSON of the fields the prompt
+is built from. Every entry remembers what its original call cost, so a hit
+is counted as money saved. The store is a single SQLite file bounded to
+`max_entries`; the least recently used entries are evicted first.
+
+Usage:
+    from cookstock_llm import get_review_cache
+
+    cache = get_review_cache()
+    key = cache.key("gpt-4o-mini", NEWS_REVIEW_PROMPT, {"headline": ...})
+    hit = cache.get(key)            # (answer, cost) or None
+    cache.put(key, answer, cost)
+
+estimate_tokens(text) approximates the prompt token count without a
+tokenizer, for budgeting batched prompts.
+
+LLM_TELEMETRY records every LLM call attempt of the run (stage, model,
+tokens, latency, cost, cache hit, rate-limit retries), enforces the run
+budgets and writes a report:
+
+    LLM_TELEMETRY.check_budget()    # raises LLMBudgetExceeded once stopped
+    LLM_TELEMETRY.record("news_review", model, 812, 40, 0.9, cost, {"AAPL": 1.0})
+    LLM_TELEMETRY.write_report(os.path.join(resultsPath, "llm_report.json"))
+"""
+import os
+import re
+import json as js
+import time
+import atexit
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import defaultdict
+
+from cookstock_metrics import summarize_samples
+
+logger = logging.getLogger(__name__)
+if not logger.handlers:
+    handler = logging.StreamHandler()
+    formatter = logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s")
+    handler.setFormatter(formatter)
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    log_level = os.getenv("LOG_LEVEL")
+    if log_level:
+        try:
+            logger.setLevel(getattr(logging, log_level.upper()))
+        except Exception:
+            logger.warning("Invalid LOG_LEVEL '%s'; using INFO", log_level)
+
+_ROOT = os.environ.get("COOKSTOCK_PATH") or os.path.dirname(
+    os.path.dirname(os.path.abspath(__file__))
+)
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE", "true").lower() in ("1", "true", "yes")
+LLM_CACHE_PATH = os.getenv(
+    "LLM_CACHE_PATH", os.path.join(_ROOT, "results", "cache", "llm_cache.sqlite3")
+)
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "50000"))
+# hits update their LRU time in memory; the times are written with the next
+# put, on close, or once this many hits are pending
+_TOUCH_FLUSH_EVERY = 256
+
+# Run budgets (0 = unlimited). Past a budget LLM_BUDGET_ACTION 'degrade' caps
+# the new articles reviewed per ticker at LLM_DEGRADED_MAX_ARTICLES; 'stop'
+# refuses further LLM calls (cached answers are still served)
+LLM_BUDGET_USD = float(os.getenv("LLM_BUDGET_USD", "0"))
+LLM_BUDGET_TOKENS = int(os.getenv("LLM_BUDGET_TOKENS", "0"))
+LLM_BUDGET_ACTION = os.getenv("LLM_BUDGET_ACTION", "degrade").lower()
+LLM_DEGRADED_MAX_ARTICLES = int(os.getenv("LLM_DEGRADED_MAX_ARTICLES", "2"))
+
+_TOKEN_PIECES = re.compile(r"\w+|[^\w\s]")
+
+
+def estimate_tokens(text):
+    """Rough BPE token count of `text`: a token per started 6 characters of a
+    word plus one per punctuation mark. Errs on the high side for JSON."""
+    return sum(-(-len(p) // 6) for p in _TOKEN_PIECES.findall(str(text)))
+
+
+class ReviewCache:
+    """Size-bounded, thread-safe SQLite cache of LLM answers with hit/miss/savings counters.
+
+    Hits only read: their last-used times are buffered and written in one
+    transaction (WAL journal, synchronous=NORMAL), so a fully cached rerun
+    does not sync the disk once per article.
+    """
+
+    def __init__(self, path=LLM_CACHE_PATH, max_entries=LLM_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max(1, max_entries)
+        self.hits = 0
+        self.misses = 0
+        self.saved_cost = 0.0
+        self._lock = threading.Lock()
+        self._touched = {}
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS answers ("
+            " key TEXT PRIMARY KEY, answer TEXT NOT NULL, cost REAL NOT NULL,"
+            " created REAL NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS answers_lru ON answers (last_used)")
+        self._db.commit()
+        self._count = self._db.execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+
+    @staticmethod
+    def key(model, template, content):
+        """Content address of one prompt: hash of model, template and canonical content."""
+        payload = js.dumps(
+            [model, template, content], sort_keys=True, default=str, ensure_ascii=False
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """Return (answer, original cost) and count a hit, or None and count a miss."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT answer, cost FROM answers WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._touched[key] = time.time()
+            if len(self._touched) >= _TOUCH_FLUSH_EVERY:
+                self._flush_touched()
+                self._db.commit()
+            self.hits += 1
+            self.saved_cost += row[1]
+            return row[0], row[1]
+
+    def _flush_touched(self):
+        """Write the buffered last-used times (caller holds the lock and commits)."""
+        if self._touched:
+            self._db.executemany(
+                "UPDATE answers SET last_used = ? WHERE key = ?",
+                [(t, k) for k, t in self._touched.items()],
+            )
+            self._touched.clear()
+
+    def put(self, key, answer, cost=0.0):
+        """Store an answer and what it cost; evicts the least recently used overflow."""
+        if answer is None:
+            return
+        now = time.time()
+        with self._lock:
+            # eviction below must see the hits' recency
+            self._flush_touched()
+            cur = self._db.execute(
+                "INSERT OR IGNORE INTO answers (key, answer, cost, created, last_used)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (key, answer, float(cost), now, now),
+            )
+            self._count += cur.rowcount
+            excess = self._count - self.max_entries
+            if excess > 0:
+                self._db.execute(
+                    "DELETE FROM answers WHERE key IN"
+                    " (SELECT key FROM answers ORDER BY last_used ASC LIMIT ?)",
+                    (excess,),
+                )
+                self._count -= excess
+                logger.debug("Evicted %d cached LLM answers", excess)
+            self._db.commit()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": self._count,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "saved_cost": self.saved_cost,
+            }
+
+    def close(self):
+        with self._lock:
+            if self._db is None:
+                return
+            self._flush_touched()
+            self._db.commit()
+            self._db.close()
+            self._db = None
+
+
+_review_cache = None
+_review_cache_lock = threading.Lock()
+
+
+def get_review_cache():
+    """Shared ReviewCache at LLM_CACHE_PATH, or None when LLM_CACHE is off or unusable."""
+    global _review_cache
+    if not LLM_CACHE_ENABLED:
+        return None
+    with _review_cache_lock:
+        if _review_cache is None:
+            try:
+                _review_cache = ReviewCache()
+                atexit.register(_review_cache.close)
+            except (OSError, sqlite3.Error):
+                logger.warning("LLM cache unavailable at %s", LLM_CACHE_PATH, exc_info=True)
+                return None
+        return _review_cache
+
+
+class LLMBudgetExceeded(RuntimeError):
+    """Raised instead of an LLM call once a 'stop' budget is exhausted."""
+
+
+class LLMTelemetry:
+    """Thread-safe per-call LLM telemetry with run budgets.
+
+    Every attempt is recorded for its stage ('news_review', 'recommendation',
+    ...) and spread over the tickers it served (`tickers` maps ticker to its
+    share of a batched call). Stage `calls` counts attempts; failed ones also
+    count as errors, rate-limited ones as retries.
+    """
+
+    def __init__(self, budget_usd=LLM_BUDGET_USD, budget_tokens=LLM_BUDGET_TOKENS,
+                 action=LLM_BUDGET_ACTION):
+        self.budget_usd = budget_usd
+        self.budget_tokens = budget_tokens
+        self.action = action
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._started = time.time()
+            self._stages = defaultdict(lambda: defaultdict(float))
+            self._latencies = defaultdict(list)
+            self._tickers = defaultdict(lambda: defaultdict(float))
+            self._models = defaultdict(int)
+            self.cost = 0.0
+            self.tokens = 0
+            self.exceeded = False
+
+    def record(self, stage, model, prompt_tokens=0, completion_tokens=0, latency=0.0, cost=0.0,
+               tickers=None, cache_hit=False, saved_cost=0.0, error=None, rate_limited=False):
+        """Record one call attempt (or cache hit) of `stage`."""
+        tickers = tickers or {None: 1.0}
+        with self._lock:
+            st = self._stages[stage]
+            st["cache_hits" if cache_hit else "calls"] += 1
+            st["errors"] += error is not None
+            st["retries"] += rate_limited
+            st["prompt_tokens"] += prompt_tokens
+            st["completion_tokens"] += completion_tokens
+            st["cost"] += cost
+            st["saved_cost"] += saved_cost
+            if not cache_hit:
+                self._latencies[stage].append(latency)
+                self._models[model] += 1
+            for ticker, share in tickers.items():
+                tk = self._tickers[ticker or "(none)"]
+                tk["latency_s"] += latency * share
+                tk["cost"] += cost * share
+                tk["calls"] += share if not cache_hit else 0
+            self.cost += cost
+            self.tokens += prompt_tokens + completion_tokens
+            crossed = not self.exceeded and self._over_budget()
+            if crossed:
+                self.exceeded = True
+        if crossed:
+            logger.warning(
+                "LLM budget exceeded (cost $%.4f, %d tokens); %s",
+                self.cost, self.tokens,
+                "refusing further LLM calls" if self.action == "stop"
+                else f"reviewing at most {LLM_DEGRADED_MAX_ARTICLES} new articles per ticker",
+            )
+
+    def _over_budget(self):
+        return (self.budget_usd > 0 and self.cost >= self.budget_usd) or (
+            self.budget_tokens > 0 and self.tokens >= self.budget_tokens
+        )
+
+    @property
+    def degraded(self):
+        """True once a budget is exceeded (in either action)."""
+        return self.exceeded
+
+    @property
+    def stopped(self):
+        """True once a 'stop' budget is exceeded."""
+        return self.exceeded and self.action == "stop"
+
+    def check_budget(self):
+        """Raise LLMBudgetExceeded if a 'stop' budget is exhausted."""
+        if self.stopped:
+            raise LLMBudgetExceeded(
+                f"LLM budget exceeded (cost ${self.cost:.4f}, {self.tokens} tokens)"
+            )
+
+    def _top_tickers(self, key, n):
+        ranked = sorted(self._tickers.items(), key=lambda kv: kv[1][key], reverse=True)[:n]
+        return [{"ticker": t, **{k: round(v, 6) for k, v in stats.items()}} for t, stats in ranked]
+
+    def summary(self, top=10):
+        with self._lock:
+            stages = {}
+            for stage, st in sorted(self._stages.items()):
+                stages[stage] = {
+                    **{k: (round(v, 6) if k.endswith("cost") else int(v)) for k, v in st.items()},
+                    "latency": summarize_samples(self._latencies[stage]),
+                }
+            return {
+                "generated": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "elapsed_s": time.time() - self._started,
+                "models": dict(self._models),
+                "total_cost": self.cost,
+                "total_tokens": self.tokens,
+                "budget": {
+                    "usd": self.budget_usd,
+                    "tokens": self.budget_tokens,
+                    "action": self.action,
+                    "exceeded": self.exceeded,
+                },
+                "stages": stages,
+                "slowest_tickers": self._top_tickers("latency_s", top),
+                "most_expensive_tickers": self._top_tickers("cost", top),
+            }
+
+    def write_report(self, filepath, top=10):
+        """Write the summary JSON to `filepath` and return it."""
+        data = self.summary(top)
+        try:
+            os.makedirs(os.path.dirname(filepath) or ".", exist_ok=True)
+            with open(filepath, "w") as f:
+                js.dump(data, f, indent=2)
+            logger.info("Wrote LLM report to %s", filepath)
+        except Exception:
+            logger.exception("Could not write LLM report %s", filepath)
+        return data
+
+
+LLM_TELEMETRY = LLMTelemetry()
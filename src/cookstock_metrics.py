@@ -0,0 +1,147 @@
+"""
+Lightweight run metrics: counters, timers and latency histograms.
+
+Recording is a lock-protected append/add, cheap enough to leave on for
+production runs. Timings are kept per stage (fetch, cache_load, indicators,
+vcp, chart, csv, json, ...) and, when a ticker is given, per ticker, so a run
+summary can report p50/p95/p99 per stage and the slowest tickers.
+
+Usage:
+    from cookstock_metrics import METRICS
+
+    with METRICS.timer("vcp", ticker):
+        x.find_volatility_contraction_pattern(date_from)
+    METRICS.incr("cache_hit")
+    METRICS.write_summary(os.path.join(resultsPath, "metrics.json"))
+"""
+import os
+import json as js
+import time
+import threading
+import logging
+import contextlib
+from collections import defaultdict
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+if not logger.handlers:
+    handler = logging.StreamHandler()
+    formatter = logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s")
+    handler.setFormatter(formatter)
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    log_level = os.getenv("LOG_LEVEL")
+    if log_level:
+        try:
+            logger.setLevel(getattr(logging, log_level.upper()))
+        except Exception:
+            logger.warning("Invalid LOG_LEVEL '%s'; using INFO", log_level)
+
+METRICS_ENABLED = os.getenv("METRICS", "true").lower() in ("1", "true", "yes")
+SUMMARY_PERCENTILES = (50, 90, 95, 99)
+
+
+def summarize_samples(samples, percentiles=SUMMARY_PERCENTILES):
+    """Return count/total/mean/max and percentiles (ms) for durations in seconds."""
+    arr = np.asarray(samples, dtype=float)
+    if arr.size == 0:
+        return {"count": 0, "total_s": 0.0}
+    stats = {
+        "count": int(arr.size),
+        "total_s": float(arr.sum()),
+        "mean_ms": float(arr.mean() * 1000),
+        "max_ms": float(arr.max() * 1000),
+    }
+    for q, v in zip(percentiles, np.percentile(arr, percentiles)):
+        stats[f"p{q}_ms"] = float(v * 1000)
+    return stats
+
+
+class MetricsCollector:
+    """Thread-safe counters and per-stage / per-ticker duration histograms."""
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._started = time.time()
+            self._counters = defaultdict(int)
+            self._samples = defaultdict(list)
+            self._ticker_stages = defaultdict(lambda: defaultdict(float))
+
+    def incr(self, name, n=1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[name] += n
+
+    def observe(self, stage, seconds, ticker=None):
+        """Record one duration (seconds) for `stage`, optionally for `ticker`."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._samples[stage].append(seconds)
+            if ticker:
+                self._ticker_stages[ticker][stage] += seconds
+
+    @contextlib.contextmanager
+    def timer(self, stage, ticker=None):
+        """Time the enclosed block as `stage`; also recorded when it raises."""
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - t0, ticker)
+
+    def ticker_stages(self, ticker):
+        with self._lock:
+            return dict(self._ticker_stages.get(ticker, {}))
+
+    def slowest_tickers(self, n=10, stage="ticker"):
+        """Tickers with the largest `stage` time (falls back to the stage sum)."""
+        with self._lock:
+            totals = {
+                t: stages.get(stage, sum(stages.values()))
+                for t, stages in self._ticker_stages.items()
+            }
+            ranked = sorted(totals.items(), key=lambda kv: kv[1], reverse=True)[:n]
+            return [
+                {
+                    "ticker": t,
+                    "total_s": total,
+                    "stages": dict(self._ticker_stages[t]),
+                }
+                for t, total in ranked
+            ]
+
+    def summary(self, slowest=10):
+        with self._lock:
+            counters = dict(self._counters)
+            samples = {k: list(v) for k, v in self._samples.items()}
+            elapsed = time.time() - self._started
+        return {
+            "generated": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "elapsed_s": elapsed,
+            "counters": counters,
+            "stages": {k: summarize_samples(v) for k, v in sorted(samples.items())},
+            "slowest_tickers": self.slowest_tickers(slowest),
+        }
+
+    def write_summary(self, filepath, slowest=10):
+        """Write the summary JSON to `filepath` and return it."""
+        data = self.summary(slowest)
+        try:
+            os.makedirs(os.path.dirname(filepath) or ".", exist_ok=True)
+            with open(filepath, "w") as f:
+                js.dump(data, f, indent=2)
+            logger.info("Wrote run metrics to %s", filepath)
+        except Exception:
+            logger.exception("Could not write metrics summary %s", filepath)
+        return data
+
+
+METRICS = MetricsCollector(enabled=METRICS_ENABLED)
@@ -0,0 +1,189 @@
+"""
+Near-duplicate detection for news articles.
+
+The same story is often syndicated by several sources with small edits to the
+headline or summary. NewsClusterer groups such copies so only one article per
+cluster (the first one seen, its representative) has to be reviewed by the
+LLM. Texts are reduced to word 3-gram shingles and MinHash signatures; an LSH
+index over signature bands finds candidate representatives, which are kept
+when their estimated Jaccard similarity reaches `threshold`.
+
+    clusters = NewsClusterer()
+    cid, is_new = clusters.assign(article_text(item))
+    if is_new:
+        clusters.values[cid] = review(item)
+    item["review"] = clusters.values[cid]
+
+NewsWatermarks keeps, per ticker, the newest article time seen and the
+reviewed articles of the retrieval window, so a rerun only fetches newer
+news and only reviews articles it has not seen.
+"""
+import os
+import re
+import zlib
+import json as js
+import logging
+import threading
+import numpy as np
+
+logger = logging.getLogger(__name__)
+if not logger.handlers:
+    handler = logging.StreamHandler()
+    formatter = logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s")
+    handler.setFormatter(formatter)
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    log_level = os.getenv("LOG_LEVEL")
+    if log_level:
+        try:
+            logger.setLevel(getattr(logging, log_level.upper()))
+        except Exception:
+            logger.warning("Invalid LOG_LEVEL '%s'; using INFO", log_level)
+
+# 'ticker' clusters the articles of each ticker, 'global' shares clusters (and
+# their reviews) across all tickers of a batch, 'off' reviews every article
+NEWS_DEDUP = os.getenv("NEWS_DEDUP", "ticker").lower()
+NEWS_DEDUP_THRESHOLD = float(os.getenv("NEWS_DEDUP_THRESHOLD", "0.7"))
+NEWS_WATERMARKS = os.getenv("NEWS_WATERMARKS", "true").lower() in ("1", "true", "yes")
+_ROOT = os.environ.get("COOKSTOCK_PATH") or os.path.dirname(
+    os.path.dirname(os.path.abspath(__file__))
+)
+NEWS_WATERMARK_DIR = os.getenv(
+    "NEWS_WATERMARK_DIR", os.path.join(_ROOT, "results", "cache", "news")
+)
+
+_PRIME = 4294967311  # smallest prime above 2**32
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def article_text(news_item):
+    """Text compared for a Finnhub news item: headline and summary."""
+    return f"{news_item.get('headline') or ''} {news_item.get('summary') or ''}"
+
+
+def shingles(text, size=3):
+    """Set of hashed word `size`-grams of `text` (the whole text if it is shorter)."""
+    words = _WORD.findall(text.lower())
+    if not words:
+        return set()
+    if len(words) <= size:
+        grams = [" ".join(words)]
+    else:
+        grams = (" ".join(words[i:i + size]) for i in range(len(words) - size + 1))
+    return {zlib.crc32(g.encode("utf-8")) for g in grams}
+
+
+class NewsClusterer:
+    """Incremental MinHash/LSH clustering of near-duplicate texts.
+
+    `assign` returns (cluster id, is_new); the first text of a cluster is its
+    representative and later texts are only compared with representatives.
+    `values` is free for callers to hold one result per cluster (e.g. the
+    representative's review). Thread-safe.
+    """
+
+    def __init__(self, threshold=NEWS_DEDUP_THRESHOLD, num_perm=64, bands=16, seed=1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, 2**31, size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, 2**31, size=num_perm, dtype=np.uint64)
+        self._signatures = []
+        self._buckets = {}
+        self.values = {}
+        self.sizes = []
+        self._lock = threading.Lock()
+
+    def signature(self, text):
+        """MinHash signature of `text`, or None when it has no words."""
+        hashed = shingles(text)
+        if not hashed:
+            return None
+        x = np.fromiter(hashed, dtype=np.uint64, count=len(hashed))
+        perm = (np.outer(x, self._a) + self._b) % np.uint64(_PRIME)
+        return perm.min(axis=0)
+
+    def _band_keys(self, sig):
+        return [(i, sig[i * self.rows:(i + 1) * self.rows].tobytes()) for i in range(self.bands)]
+
+    def assign(self, text):
+        """Return (cluster id, is_new) for `text`."""
+        sig = self.signature(text)
+        with self._lock:
+            if sig is not None:
+                keys = self._band_keys(sig)
+                candidates = {cid for key in keys for cid in self._buckets.get(key, ())}
+                best, best_sim = None, self.threshold
+                for cid in candidates:
+                    sim = float(np.mean(self._signatures[cid] == sig))
+                    if sim >= best_sim:
+                        best, best_sim = cid, sim
+                if best is not None:
+                    self.sizes[best] += 1
+                    return best, False
+            cid = len(self._signatures)
+            self._signatures.append(sig)
+            self.sizes.append(1)
+            if sig is not None:
+                for key in keys:
+                    self._buckets.setdefault(key, []).append(cid)
+            return cid, True
+
+    @property
+    def duplicates(self):
+        """Number of assigned texts that joined an existing cluster."""
+        return sum(self.sizes) - len(self.sizes)
+
+
+def news_clusterer(mode=None):
+    """A NewsClusterer unless news dedup is 'off'."""
+    mode = (mode or NEWS_DEDUP).lower()
+    return None if mode == "off" else NewsClusterer()
+
+
+def news_id(news_item):
+    """Stable id of a Finnhub news item (its id, or the URL when it has none)."""
+    return str(news_item.get("id") or news_item.get("url"))
+
+
+class NewsWatermarks:
+    """Per-ticker news state in `<root>/<TICKER>.json`.
+
+    A state is {"watermark": newest article timestamp or None, "items": {news
+    id: {"datetime": timestamp, "entry": reviewed news entry}}}. Each ticker
+    has its own file, so concurrent tickers never share a write.
+    """
+
+    def __init__(self, root=NEWS_WATERMARK_DIR):
+        self.root = root
+
+    def _path(self, ticker):
+        return os.path.join(self.root, f"{ticker.replace('/', '_')}.json")
+
+    def load(self, ticker):
+        try:
+            with open(self._path(ticker), "r") as f:
+                state = js.load(f)
+        except (OSError, ValueError):
+            return {"watermark": None, "items": {}}
+        state.setdefault("items", {})
+        return state
+
+    def save(self, ticker, state, since=None):
+        """Write `state`, first dropping items older than timestamp `since`."""
+        if since is not None:
+            state["items"] = {k: v for k, v in state["items"].items() if v["datetime"] >= since}
+        path = self._path(ticker)
+        os.makedirs(self.root, exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w") as f:
+            js.dump(state, f, separators=(",", ":"))
+        os.replace(tmp, path)
+
+
+def get_news_watermarks():
+    """NewsWatermarks at NEWS_WATERMARK_DIR, or None when NEWS_WATERMARKS is off."""
+    return NewsWatermarks() if NEWS_WATERMARKS else None
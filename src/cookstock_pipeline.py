@@ -0,0 +1,289 @@
+"""
+Watchdog and staged-pipeline plumbing of batch_process.batch_pipeline_full.
+
+TickerWatchdog runs one ticker's work at a time on a reusable worker thread
+under a per-ticker deadline (TICKER_DEADLINE, seconds, 0 disables) and logs
+progress, throughput and ETA every WATCHDOG_INTERVAL seconds. A ticker that
+misses its deadline is abandoned (threads cannot be killed) and the caller
+gets TickerTimeoutError.
+
+_PipelineStage is a thread pool moving _PipelineItems between bounded
+queues; batch_process chains fetch, compute and render stages with it
+(PIPELINE_MODE=staged, the default) and writes the results in ticker order.
+"""
+import os
+import time
+import queue
+import logging
+import threading
+import datetime as dt
+
+logger = logging.getLogger(__name__)
+if not logger.handlers:
+    handler = logging.StreamHandler()
+    formatter = logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s")
+    handler.setFormatter(formatter)
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    log_level = os.getenv("LOG_LEVEL")
+    if log_level:
+        try:
+            logger.setLevel(getattr(logging, log_level.upper()))
+        except Exception:
+            logger.warning("Invalid LOG_LEVEL '%s'; using INFO", log_level)
+
+# Per-ticker fetch+analysis deadline in seconds (0 disables) and progress log interval
+TICKER_DEADLINE_S = float(os.getenv("TICKER_DEADLINE", "300"))
+WATCHDOG_INTERVAL_S = float(os.getenv("WATCHDOG_INTERVAL", "30"))
+# batch_pipeline_full layout: 'staged' overlaps fetches, computation and chart
+# rendering in separate threads joined by bounded queues, with a single writer;
+# 'sequential' handles one ticker at a time (always used when PROFILE is on).
+# Computation is GIL-bound pure Python/pandas work, so it gets a single thread
+PIPELINE_MODE = os.getenv("PIPELINE_MODE", "staged").lower()
+PIPELINE_FETCH_THREADS = int(os.getenv("PIPELINE_FETCH_THREADS", "4"))
+PIPELINE_RENDER_WORKERS = int(os.getenv("PIPELINE_RENDER_WORKERS", "2"))
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "16"))
+
+
+class TickerTimeoutError(TimeoutError):
+    """A ticker did not finish within the watchdog deadline and was abandoned."""
+
+
+class _TickerJob:
+    def __init__(self, func, args):
+        self.func = func
+        self.args = args
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+    def run(self):
+        try:
+            self.result = self.func(*self.args)
+        except BaseException as e:
+            self.error = e
+        finally:
+            self.done.set()
+
+
+class _TickerWorker(threading.Thread):
+    """Reusable daemon thread executing ticker jobs one at a time."""
+
+    def __init__(self):
+        super().__init__(name="ticker-worker", daemon=True)
+        self.jobs = queue.Queue()
+        self.abandoned = False
+
+    def run(self):
+        while not self.abandoned:
+            job = self.jobs.get()
+            job.run()
+
+
+# One supervisor thread per batch run (see batch_process.batch_pipeline_full).
+class TickerWatchdog:
+    """Run ticker work under a per-ticker deadline and report progress.
+
+    Work submitted with run() executes on a reusable worker thread. If it has
+    not finished after `deadline` seconds the ticker is abandoned (Python
+    threads cannot be killed): the caller gets TickerTimeoutError and the next
+    ticker starts on a fresh worker, so a hung request cannot stall the batch.
+    A single monitor thread logs in-flight tickers plus throughput and ETA
+    every `interval` seconds.
+    """
+
+    def __init__(self, total, deadline=None, interval=None):
+        self.total = total
+        self.deadline = TICKER_DEADLINE_S if deadline is None else deadline
+        self.interval = WATCHDOG_INTERVAL_S if interval is None else interval
+        self.completed = 0
+        self.timed_out = []
+        self._lock = threading.Lock()
+        self._in_flight = {}
+        self._worker = None
+        self._stop = threading.Event()
+        self._monitor = None
+        self._started = None
+
+    def start(self):
+        self._started = time.time()
+        self._monitor = threading.Thread(
+            target=self._watch, name="ticker-watchdog", daemon=True
+        )
+        self._monitor.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._worker is not None:
+            self._worker.abandoned = True
+            self._worker.jobs.put(_TickerJob(lambda: None, ()))
+            self._worker = None
+
+    def begin(self, ticker):
+        with self._lock:
+            self._in_flight[ticker] = time.time()
+
+    def finish(self, ticker):
+        with self._lock:
+            if self._in_flight.pop(ticker, None) is not None:
+                self.completed += 1
+
+    def run(self, ticker, func, *args, deadline=None):
+        """Run func(*args) for `ticker` within the deadline; return its result.
+
+        `deadline` (seconds) overrides the default for this call only.
+        """
+        deadline = self.deadline if deadline is None else deadline
+        if self._worker is None:
+            self._worker = _TickerWorker()
+            self._worker.start()
+        job = _TickerJob(func, args)
+        self._worker.jobs.put(job)
+        if not job.done.wait(deadline if deadline > 0 else None):
+            # leave the stuck thread behind; it exits once its call returns
+            self._worker.abandoned = True
+            self._worker = None
+            self.timed_out.append(ticker)
+            logger.error(
+                "Ticker %s exceeded the %.0fs deadline; abandoned", ticker, deadline
+            )
+            raise TickerTimeoutError(f"{ticker} exceeded {deadline:.0f}s")
+        if job.error is not None:
+            raise job.error
+        return job.result
+
+    def progress(self):
+        with self._lock:
+            done = self.completed
+            in_flight = dict(self._in_flight)
+        elapsed = time.time() - self._started if self._started else 0.0
+        rate = done / elapsed if elapsed > 0 else 0.0
+        eta = (self.total - done) / rate if rate > 0 else float("inf")
+        return done, in_flight, rate, eta
+
+    def _watch(self):
+        while not self._stop.wait(self.interval):
+            done, in_flight, rate, eta = self.progress()
+            now = time.time()
+            for ticker, t0 in in_flight.items():
+                logger.info("Ticker %s still processing (elapsed %.0fs)", ticker, now - t0)
+            logger.info(
+                "Progress %d/%d tickers (%.1f/min, %d timed out), ETA %s",
+                done,
+                self.total,
+                rate * 60,
+                len(self.timed_out),
+                str(dt.timedelta(seconds=int(eta))) if eta != float("inf") else "n/a",
+            )
+
+
+class _PipelineItem:
+    """One ticker travelling through the staged pipeline."""
+
+    def __init__(self, ticker, idx):
+        self.ticker = ticker
+        self.idx = idx
+        self.status = "ok"
+        self.started = None
+        # time spent inside stage calls; waiting in the queues is not counted
+        self.run_time = 0.0
+        self.stage_started = None
+        self.x = None
+        self.analysis = None
+        self.row = None
+        self.ticker_data = None
+        self.error = None
+        self.worker = None
+        self.abandoned = False
+        self.done = threading.Event()
+
+    def elapsed(self):
+        """Seconds spent in finished stage calls plus the running one."""
+        running = self.stage_started
+        return self.run_time + (time.time() - running if running is not None else 0.0)
+
+
+class _StageWorker(threading.Thread):
+    def __init__(self, stage, n):
+        super().__init__(name=f"pipeline-{stage.name}-{n}", daemon=True)
+        self.stage = stage
+        self.retired = False
+
+    def run(self):
+        self.stage.work(self)
+
+
+class _PipelineStage:
+    """Thread pool moving pipeline items from `inbox` to `outbox`.
+
+    `func(item)` does the stage's work and returns False when the item needs
+    no further stage; errors are stored on the item. The queues are bounded,
+    so a full outbox blocks the workers and backpressure reaches the feeder.
+    A worker stuck on an abandoned item is retired and replaced (threads
+    cannot be killed), see replace().
+    """
+
+    def __init__(self, name, func, inbox, outbox, workers):
+        self.name = name
+        self.func = func
+        self.inbox = inbox
+        self.outbox = outbox
+        self.size = max(1, workers)
+        self._lock = threading.Lock()
+        self._workers = []
+        self._spawned = 0
+
+    def start(self):
+        for _ in range(self.size):
+            self._spawn()
+        return self
+
+    def _spawn(self):
+        with self._lock:
+            self._spawned += 1
+            worker = _StageWorker(self, self._spawned)
+            self._workers.append(worker)
+        worker.start()
+
+    def replace(self, worker):
+        """Retire `worker` (it exits once its current call returns) and start another."""
+        with self._lock:
+            if worker.retired or worker not in self._workers:
+                return
+            worker.retired = True
+            self._workers.remove(worker)
+        logger.warning("Replacing stuck %s worker %s", self.name, worker.name)
+        self._spawn()
+
+    def stop(self):
+        with self._lock:
+            workers, self._workers = self._workers, []
+        for _ in workers:
+            self.inbox.put(None)
+
+    def work(self, worker):
+        while not worker.retired:
+            item = self.inbox.get()
+            if item is None:
+                break
+            if item.abandoned:
+                continue
+            item.worker = worker
+            t0 = item.stage_started = time.time()
+            try:
+                forward = self.func(item)
+            except Exception as e:
+                item.error = e
+                forward = False
+            finally:
+                item.worker = None
+                # clear first: a reader in between undercounts, never doubles
+                item.stage_started = None
+                item.run_time += time.time() - t0
+            if item.abandoned:
+                continue
+            if forward and self.outbox is not None:
+                self.outbox.put(item)
+            else:
+                item.done.set()
@@ -0,0 +1,174 @@
+"""
+Opt-in per-ticker profiling for batch runs.
+
+Each ticker is run under its own cProfile.Profile. Modes (PROFILE env var):
+
+- off:       no profiling (default, zero overhead)
+- aggregate: merge every ticker's stats into one run-level profile
+- slow:      aggregate, and also dump tickers slower than PROFILE_THRESHOLD_S
+- all:       aggregate, and dump every ticker
+
+Output goes to <results>/profile/: `run.prof` (aggregate), `<TICKER>.prof`
+(dumped tickers) and `hotspots.txt` (top functions by cumulative time, and
+the tickers whose profile was discarded because they timed out or failed). The
+.prof files are standard pstats dumps, readable by `python -m pstats`,
+snakeviz, flameprof or gprof2dot to draw flame/call graphs.
+"""
+import os
+import io
+import sys
+import time
+import pstats
+import cProfile
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+if not logger.handlers:
+    handler = logging.StreamHandler()
+    formatter = logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s")
+    handler.setFormatter(formatter)
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    log_level = os.getenv("LOG_LEVEL")
+    if log_level:
+        try:
+            logger.setLevel(getattr(logging, log_level.upper()))
+        except Exception:
+            logger.warning("Invalid LOG_LEVEL '%s'; using INFO", log_level)
+
+PROFILE_MODES = ("off", "aggregate", "slow", "all")
+PROFILE_MODE = os.getenv("PROFILE", "off").lower()
+PROFILE_THRESHOLD_S = float(os.getenv("PROFILE_THRESHOLD_S", "30"))
+PROFILE_TOP = int(os.getenv("PROFILE_TOP", "40"))
+
+
+class TickerProfiler:
+    """Profile tickers one at a time and aggregate their stats."""
+
+    def __init__(self, mode=PROFILE_MODE, threshold_s=PROFILE_THRESHOLD_S, top=PROFILE_TOP):
+        if mode not in PROFILE_MODES:
+            logger.warning("Invalid PROFILE '%s'; profiling disabled", mode)
+            mode = "off"
+        self.mode = mode
+        self.threshold_s = threshold_s
+        self.top = top
+        self._lock = threading.Lock()
+        self._stats = None
+        self._dumped = []
+        self._discarded = []
+        self._active = {}
+        self._out_dir = None
+
+    @property
+    def enabled(self):
+        return self.mode != "off"
+
+    def begin_run(self, out_dir):
+        """Reset aggregated stats; profiles are written under `out_dir`."""
+        self._out_dir = out_dir
+        self._stats = None
+        self._dumped = []
+        self._discarded = []
+        self._active = {}
+        if self.enabled:
+            os.makedirs(out_dir, exist_ok=True)
+            logger.info("Profiling tickers (mode=%s) into %s", self.mode, out_dir)
+
+    def start(self, ticker=None):
+        """Start profiling the current ticker; returns a handle for stop()."""
+        if not self.enabled:
+            return None
+        prof = cProfile.Profile()
+        try:
+            prof.enable()
+        except ValueError:
+            # another profiler is already active in this thread
+            logger.debug("Profiler already active; skipping ticker profile")
+            return None
+        handle = (prof, time.perf_counter())
+        if ticker is not None:
+            with self._lock:
+                self._active[ticker] = handle
+        return handle
+
+    def pause(self, handle):
+        """Suspend a ticker's profile, e.g. before handing work to another thread."""
+        if handle is not None:
+            handle[0].disable()
+
+    def resume(self, handle):
+        """Continue a paused ticker profile in the calling thread."""
+        if handle is None:
+            return
+        try:
+            handle[0].enable()
+        except ValueError:
+            logger.debug("Profiler already active; not resuming ticker profile")
+
+    def discard(self, ticker, reason="timed out"):
+        """Drop the pending profile of `ticker` that timed out or failed.
+
+        The profile is disabled (the ticker thread's own pause, once its call
+        returns, covers Pythons where cProfile is per-thread), never merged
+        into the run profile, and listed in hotspots.txt with `reason`. A
+        ticker whose profile was already stopped is left alone.
+        """
+        with self._lock:
+            handle = self._active.pop(ticker, None)
+            if not self.enabled or handle is None:
+                return
+            self._discarded.append((ticker, reason))
+        if sys.version_info >= (3, 12):
+            # cProfile is process-wide from 3.12 on; a still-enabled orphan
+            # would block every later ticker's profile
+            handle[0].disable()
+        logger.info("Ticker %s %s; its profile is discarded", ticker, reason)
+
+    def stop(self, ticker, handle):
+        """Stop profiling `ticker`, aggregate its stats and dump if required."""
+        if handle is None:
+            return
+        prof, t0 = handle
+        prof.disable()
+        with self._lock:
+            self._active.pop(ticker, None)
+        elapsed = time.perf_counter() - t0
+        with self._lock:
+            if self._stats is None:
+                self._stats = pstats.Stats(prof)
+            else:
+                self._stats.add(prof)
+        if self.mode == "all" or (self.mode == "slow" and elapsed >= self.threshold_s):
+            path = os.path.join(self._out_dir, f"{ticker}.prof")
+            prof.dump_stats(path)
+            self._dumped.append((ticker, elapsed))
+            logger.info("Ticker %s took %.1fs; profile saved to %s", ticker, elapsed, path)
+
+    def write_report(self):
+        """Write run.prof and hotspots.txt; return the hotspots text."""
+        if not self.enabled or (self._stats is None and not self._discarded):
+            return None
+        run_path = os.path.join(self._out_dir, "run.prof")
+        buf = io.StringIO()
+        if self._stats is not None:
+            self._stats.dump_stats(run_path)
+            stats = pstats.Stats(run_path, stream=buf)
+            stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(self.top)
+            stats.sort_stats(pstats.SortKey.TIME).print_stats(self.top)
+        if self._discarded:
+            buf.write("\nTimed out or failed tickers (profile discarded, not in run.prof):\n")
+            for ticker, reason in self._discarded:
+                buf.write(f"  {ticker}: {reason}\n")
+        if self._dumped:
+            buf.write("\nSlow tickers (profile dumped):\n")
+            for ticker, elapsed in sorted(self._dumped, key=lambda x: -x[1]):
+                buf.write(f"  {ticker}: {elapsed:.2f}s\n")
+        text = buf.getvalue()
+        with open(os.path.join(self._out_dir, "hotspots.txt"), "w") as f:
+            f.write(text)
+        logger.info("Wrote aggregated profile %s", run_path)
+        return text
+
+
+PROFILER = TickerProfiler()
@@ -0,0 +1,369 @@
+"""
+Market data providers used by cookFinancials.
+
+Three modes share the same interface (`ticker(symbol)` returning an object that
+looks like `yfinance.Ticker`, plus a bulk `download`):
+
+- live:   today's behaviour, every call goes to yfinance
+- record: calls go to yfinance and every history/info/calendar/statement
+          response is captured to a local archive directory
+- replay: responses are served from a recorded archive, optionally with a
+          simulated per-call latency, so a batch can run fully offline
+- synthetic: generated data for any symbol (see cookstock_synthetic)
+
+Archive layout:
+    <archive_dir>/manifest.json          {"recorded_on": "YYYY-MM-DD"}
+    <archive_dir>/<TICKER>/<field>.pkl   pickled response (DataFrame/dict/...)
+
+A ticker's history is fetched several times with different windows, so
+every recorded history frame is merged into the stored one (union of the
+dates, newest answer wins) and replay slices any recorded window from it.
+"""
+import os
+import json as js
+import pickle
+import time
+import threading
+import logging
+import datetime as dt
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+if not logger.handlers:
+    handler = logging.StreamHandler()
+    formatter = logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s")
+    handler.setFormatter(formatter)
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    log_level = os.getenv("LOG_LEVEL")
+    if log_level:
+        try:
+            logger.setLevel(getattr(logging, log_level.upper()))
+        except Exception:
+            logger.warning("Invalid LOG_LEVEL '%s'; using INFO", log_level)
+
+PROVIDER_MODES = ("live", "record", "replay", "synthetic")
+
+# yf.Ticker properties that cookFinancials reads; `history` is handled separately
+TICKER_FIELDS = (
+    "info",
+    "calendar",
+    "balance_sheet",
+    "quarterly_balance_sheet",
+    "income_stmt",
+    "quarterly_income_stmt",
+    "cashflow",
+    "quarterly_cashflow",
+)
+
+
+class ReplayMissError(LookupError):
+    """Raised in replay mode when the archive has no response for a request."""
+
+
+class RecordedFetchError(RuntimeError):
+    """Replays a fetch that raised while the archive was being recorded."""
+
+
+def _slice_history(df, start=None, end=None):
+    """Restrict a history frame to [start, end) like yfinance does."""
+    if df is None or df.empty or (start is None and end is None):
+        return df
+    dates = pd.Index(df.index.date)
+    mask = np.ones(len(df), dtype=bool)
+    if start is not None:
+        mask &= dates >= pd.Timestamp(start).date()
+    if end is not None:
+        mask &= dates < pd.Timestamp(end).date()
+    return df[mask]
+
+
+def _download_from_tickers(provider, tickers, start=None, end=None):
+    """Build a yf.download(group_by='ticker') shaped frame from per-ticker history."""
+    if isinstance(tickers, str):
+        tickers = [tickers]
+    frames = {}
+    for t in tickers:
+        try:
+            frames[t] = provider.ticker(t).history(start=start, end=end)
+        except Exception:
+            logger.debug("download: no history for %s", t, exc_info=True)
+            frames[t] = pd.DataFrame(
+                columns=["Open", "High", "Low", "Close", "Volume"]
+            )
+    if len(frames) == 1:
+        return next(iter(frames.values()))
+    return pd.concat(frames, axis=1)
+
+
+def _merge_history(old, new):
+    """Union of two history frames by date; rows of `new` win on overlap."""
+    if not isinstance(old, pd.DataFrame) or old.empty:
+        return new
+    if new is None or new.empty:
+        return old
+    if old.index.tz != new.index.tz:
+        # download() frames are tz-naive, Ticker.history() frames tz-aware
+        if new.index.tz is None:
+            new = new.tz_localize(old.index.tz)
+        elif old.index.tz is None:
+            new = new.tz_localize(None)
+        else:
+            new = new.tz_convert(old.index.tz)
+    merged = pd.concat([old, new])
+    return merged[~merged.index.duplicated(keep="last")].sort_index()
+
+
+class DataArchive:
+    """On-disk store of recorded provider responses."""
+
+    def __init__(self, root):
+        self.root = root
+        self._lock = threading.Lock()
+        self._manifest_path = os.path.join(root, "manifest.json")
+
+    def _path(self, symbol, field):
+        return os.path.join(self.root, str(symbol).upper(), f"{field}.pkl")
+
+    def save(self, symbol, field, value):
+        path = self._path(symbol, field)
+        with self._lock:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = path + ".tmp"
+            with open(tmp, "wb") as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, path)
+
+    def merge_history(self, symbol, frame):
+        """Merge a recorded history frame into the stored history of `symbol`."""
+        path = self._path(symbol, "history")
+        with self._lock:
+            old = None
+            if os.path.exists(path):
+                with open(path, "rb") as f:
+                    old = pickle.load(f)
+            merged = _merge_history(old, frame)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = path + ".tmp"
+            with open(tmp, "wb") as f:
+                pickle.dump(merged, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, path)
+
+    def load(self, symbol, field):
+        path = self._path(symbol, field)
+        if not os.path.exists(path):
+            raise ReplayMissError(f"No recorded {field} for {symbol} in {self.root}")
+        with open(path, "rb") as f:
+            return pickle.load(f)
+
+    def read_manifest(self):
+        try:
+            with open(self._manifest_path, "r") as f:
+                return js.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def write_manifest(self, recorded_on):
+        with self._lock:
+            os.makedirs(self.root, exist_ok=True)
+            with open(self._manifest_path, "w") as f:
+                js.dump({"recorded_on": str(recorded_on)}, f, indent=2)
+
+    def tickers(self):
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(
+            d for d in os.listdir(self.root) if os.path.isdir(os.path.join(self.root, d))
+        )
+
+
+class LiveProvider:
+    """Plain yfinance access (default)."""
+
+    mode = "live"
+    uses_price_cache = True
+    is_offline = False
+
+    def ticker(self, symbol):
+        import yfinance as yf
+
+        return yf.Ticker(symbol)
+
+    def download(self, tickers, start=None, end=None):
+        import yfinance as yf
+
+        return yf.download(
+            tickers, start=start, end=end, group_by="ticker", progress=False
+        )
+
+    def as_of_date(self):
+        return None
+
+
+class _RecordingTicker:
+    def __init__(self, provider, symbol, real):
+        self._provider = provider
+        self._symbol = symbol
+        self._real = real
+        self._captured = {}
+
+    def _capture(self, field, fetch):
+        try:
+            value = fetch()
+        except Exception as e:
+            self._provider.archive.save(
+                self._symbol, field, RecordedFetchError(f"{type(e).__name__}: {e}")
+            )
+            raise
+        self._provider.archive.save(self._symbol, field, value)
+        return value
+
+    def history(self, *args, **kwargs):
+        archive = self._provider.archive
+        try:
+            value = self._real.history(*args, **kwargs)
+        except Exception as e:
+            # keep frames recorded by earlier calls; replay the error otherwise
+            if not os.path.exists(archive._path(self._symbol, "history")):
+                archive.save(
+                    self._symbol, "history", RecordedFetchError(f"{type(e).__name__}: {e}")
+                )
+            raise
+        archive.merge_history(self._symbol, value)
+        return value
+
+    def __getattr__(self, name):
+        if name in TICKER_FIELDS:
+            # yfinance memoizes these properties, so archive each one only once
+            if name not in self._captured:
+                self._captured[name] = self._capture(
+                    name, lambda: getattr(self._real, name)
+                )
+            return self._captured[name]
+        return getattr(self._real, name)
+
+
+class RecordProvider(LiveProvider):
+    """Live yfinance access that captures every response to an archive."""
+
+    mode = "record"
+    uses_price_cache = False
+
+    def __init__(self, archive_dir):
+        self.archive = DataArchive(archive_dir)
+        self.archive.write_manifest(dt.date.today())
+
+    def ticker(self, symbol):
+        return _RecordingTicker(self, symbol, super().ticker(symbol))
+
+    def download(self, tickers, start=None, end=None):
+        data = super().download(tickers, start=start, end=end)
+        symbols = [tickers] if isinstance(tickers, str) else list(tickers)
+        for t in symbols:
+            try:
+                frame = data[t] if len(symbols) > 1 else data
+                if isinstance(frame.columns, pd.MultiIndex):
+                    frame = frame.droplevel(0, axis=1)
+                self.archive.merge_history(t, frame.dropna(how="all"))
+            except Exception:
+                logger.debug("record: could not archive download for %s", t, exc_info=True)
+        return data
+
+    def as_of_date(self):
+        return None
+
+
+class _ReplayTicker:
+    def __init__(self, provider, symbol):
+        self._provider = provider
+        self._symbol = symbol
+        self._served = {}
+
+    def _serve(self, field):
+        self._provider.simulate_latency()
+        value = self._provider.archive.load(self._symbol, field)
+        if isinstance(value, RecordedFetchError):
+            raise value
+        return value
+
+    def history(self, start=None, end=None, **kwargs):
+        return _slice_history(self._serve("history"), start, end)
+
+    def __getattr__(self, name):
+        if name in TICKER_FIELDS:
+            # like yfinance, only the first property access pays the latency
+            if name not in self._served:
+                self._served[name] = self._serve(name)
+            return self._served[name]
+        raise AttributeError(name)
+
+
+class ReplayProvider:
+    """Serve recorded responses deterministically, with optional latency."""
+
+    mode = "replay"
+    uses_price_cache = False
+    is_offline = True
+
+    def __init__(self, archive_dir, latency_ms=0):
+        self.archive = DataArchive(archive_dir)
+        self.latency_ms = latency_ms
+        manifest = self.archive.read_manifest()
+        if not manifest:
+            logger.warning("Replay archive %s has no manifest", archive_dir)
+        self._recorded_on = manifest.get("recorded_on")
+        self.tickers = self.archive.tickers()
+
+    def simulate_latency(self):
+        if self.latency_ms > 0:
+            time.sleep(self.latency_ms / 1000.0)
+
+    def ticker(self, symbol):
+        return _ReplayTicker(self, symbol)
+
+    def download(self, tickers, start=None, end=None):
+        return _download_from_tickers(self, tickers, start=start, end=end)
+
+    def as_of_date(self):
+        if not self._recorded_on:
+            return None
+        return dt.datetime.strptime(self._recorded_on, "%Y-%m-%d").date()
+
+
+def make_provider(mode="live", archive_dir=None, latency_ms=0, seed=0, as_of=None):
+    """Create a provider for `mode` (see PROVIDER_MODES).
+
+    `archive_dir` is required for record/replay; `seed` and `as_of` only
+    apply to the synthetic provider.
+    """
+    mode = (mode or "live").lower()
+    if mode == "live":
+        return LiveProvider()
+    if mode not in PROVIDER_MODES:
+        raise ValueError(f"Invalid provider mode '{mode}'. Options: {PROVIDER_MODES}")
+    if mode == "synthetic":
+        from cookstock_synthetic import SyntheticProvider
+
+        return SyntheticProvider(seed=seed, as_of=as_of, latency_ms=latency_ms)
+    if not archive_dir:
+        raise ValueError(f"Provider mode '{mode}' requires an archive directory")
+    if mode == "record":
+        return RecordProvider(archive_dir)
+    return ReplayProvider(archive_dir, latency_ms=latency_ms)
+
+
+_provider = LiveProvider()
+
+
+def get_provider():
+    return _provider
+
+
+def set_provider(provider):
+    """Install `provider` for all subsequently created cookFinancials objects."""
+    global _provider
+    _provider = provider
+    logger.info("Using %s data provider", provider.mode)
+    return provider
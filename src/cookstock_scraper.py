@@ -0,0 +1,322 @@
+"""
+HTTP transport for the news / profile scraper.
+
+ScraperTransport keeps one keep-alive requests.Session per route (direct or
+one per proxy), so repeated requests reuse TCP/TLS connections instead of
+opening a new one each time. Proxies come from a ProxyPool loaded once from
+proxy.txt (`host:port:user:password` or `host:port` per line). Each proxy has
+a health score: failures (connection errors, 403/407/429 and 5xx answers)
+lower it and bench the proxy with exponential backoff, successes restore
+it, and selection is weighted by score among the proxies not benched.
+Latencies are recorded per proxy and in METRICS under "scrape".
+
+    transport = get_transport()
+    response = transport.get(url, headers=headers, use_proxy=True)
+    print(transport.pool.stats())
+
+Pages are parsed by make_soup(html, select): lxml builds the document in C
+and the `select` XPath (QUOTE_SECTIONS, ARTICLE_PARTS) picks the few elements
+the scraper reads, so the much slower and larger BeautifulSoup tree only
+covers those. extract_quote / extract_article then pull every needed field
+out of that small tree in one pass:
+
+    quote = extract_quote(make_soup(html, QUOTE_SECTIONS))
+"""
+import os
+import time
+import random
+import logging
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+import lxml.html
+from lxml import etree
+from bs4 import BeautifulSoup
+
+from cookstock_metrics import METRICS, summarize_samples
+
+logger = logging.getLogger(__name__)
+if not logger.handlers:
+    handler = logging.StreamHandler()
+    formatter = logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s")
+    handler.setFormatter(formatter)
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    log_level = os.getenv("LOG_LEVEL")
+    if log_level:
+        try:
+            logger.setLevel(getattr(logging, log_level.upper()))
+        except Exception:
+            logger.warning("Invalid LOG_LEVEL '%s'; using INFO", log_level)
+
+SCRAPER_TIMEOUT_S = float(os.getenv("SCRAPER_TIMEOUT_S", "10"))
+# proxies tried per request before giving up
+SCRAPER_RETRIES = int(os.getenv("SCRAPER_RETRIES", "3"))
+# keep-alive connections kept per host in each session
+SCRAPER_POOL_SIZE = int(os.getenv("SCRAPER_POOL_SIZE", "8"))
+# a failing proxy is benched for base * 2**(consecutive failures - 1) seconds
+PROXY_BACKOFF_BASE_S = float(os.getenv("PROXY_BACKOFF_BASE_S", "5"))
+PROXY_BACKOFF_MAX_S = float(os.getenv("PROXY_BACKOFF_MAX_S", "600"))
+# answers that indicate a blocked or broken proxy rather than a missing page
+_PROXY_FAILURE_STATUS = {403, 407, 429}
+_LATENCY_SAMPLES = 1000
+
+
+def parse_proxy(line):
+    """Proxy URL for a `host:port[:user:password]` line, or None for blank lines."""
+    parts = line.strip().split(":")
+    if len(parts) < 2 or not parts[0]:
+        return None
+    host, port = parts[0], parts[1]
+    if len(parts) >= 4:
+        return f"http://{parts[2]}:{':'.join(parts[3:])}@{host}:{port}"
+    return f"http://{host}:{port}"
+
+
+class ProxyState:
+    """Health and latency record of one proxy."""
+
+    def __init__(self, url):
+        self.url = url
+        self.label = url.split("://", 1)[-1].rsplit("@", 1)[-1]  # host:port, never credentials
+        self.score = 1.0
+        self.failures = 0
+        self.benched_until = 0.0
+        self.successes = 0
+        self.errors = 0
+        self.latencies = []
+
+    @property
+    def proxies(self):
+        """`proxies` argument for requests."""
+        return {"http": self.url, "https": self.url}
+
+
+class ProxyPool:
+    """Proxies with health scores and exponential backoff for failing ones. Thread-safe."""
+
+    def __init__(self, urls, backoff_base=PROXY_BACKOFF_BASE_S, backoff_max=PROXY_BACKOFF_MAX_S):
+        self.states = [ProxyState(u) for u in dict.fromkeys(urls)]
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_file(cls, path, **kwargs):
+        with open(path, "r") as f:
+            urls = [u for u in (parse_proxy(line) for line in f) if u]
+        logger.info("Loaded %d proxies from %s", len(urls), path)
+        return cls(urls, **kwargs)
+
+    def __len__(self):
+        return len(self.states)
+
+    def choose(self, exclude=()):
+        """Pick a proxy, weighted by score among those not benched.
+
+        When every candidate is benched the one that recovers first is used.
+        Returns None for an empty pool.
+        """
+        with self._lock:
+            candidates = [s for s in self.states if s not in exclude] or self.states
+            if not candidates:
+                return None
+            now = time.time()
+            ready = [s for s in candidates if s.benched_until <= now]
+            if not ready:
+                return min(candidates, key=lambda s: s.benched_until)
+            return random.choices(ready, weights=[max(s.score, 0.05) for s in ready])[0]
+
+    def report(self, state, ok, latency=None):
+        """Record one request through `state`: success or failure and its latency (s)."""
+        with self._lock:
+            if latency is not None:
+                state.latencies.append(latency)
+                if len(state.latencies) > _LATENCY_SAMPLES:
+                    del state.latencies[: -_LATENCY_SAMPLES]
+            if ok:
+                state.successes += 1
+                state.failures = 0
+                state.score = 0.8 * state.score + 0.2
+                return
+            state.errors += 1
+            state.failures += 1
+            state.score *= 0.5
+            backoff = min(self.backoff_max, self.backoff_base * 2 ** (state.failures - 1))
+            state.benched_until = time.time() + backoff * random.uniform(0.8, 1.2)
+        logger.debug("Proxy %s failed %d time(s) in a row; benched for ~%.0fs",
+                     state.label, state.failures, backoff)
+
+    def stats(self):
+        """Per-proxy health and latency summary keyed by host:port."""
+        now = time.time()
+        with self._lock:
+            return {
+                s.label: {
+                    "score": round(s.score, 3),
+                    "successes": s.successes,
+                    "errors": s.errors,
+                    "benched_s": max(0.0, round(s.benched_until - now, 1)),
+                    **summarize_samples(s.latencies),
+                }
+                for s in self.states
+            }
+
+
+class ScraperTransport:
+    """GETs over pooled keep-alive sessions, optionally through a ProxyPool."""
+
+    def __init__(self, pool=None, timeout=SCRAPER_TIMEOUT_S, retries=SCRAPER_RETRIES,
+                 pool_size=SCRAPER_POOL_SIZE):
+        self.pool = pool
+        self.timeout = timeout
+        self.retries = max(1, retries)
+        self.pool_size = pool_size
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def session(self, state=None):
+        """Keep-alive session of the direct route (None) or of one proxy."""
+        key = state.url if state is not None else None
+        with self._lock:
+            session = self._sessions.get(key)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                if state is not None:
+                    session.proxies.update(state.proxies)
+                self._sessions[key] = session
+            return session
+
+    def get(self, url, headers=None, params=None, use_proxy=False, verify=True, timeout=None):
+        """GET `url` and return the response (`timeout` overrides the transport's).
+
+        With `use_proxy` (and a non-empty pool) up to `retries` proxies are
+        tried until one answers with a non-failure status; the last answer is
+        returned even if it is a failure status. Raises the last
+        requests.RequestException when no attempt got an answer.
+        """
+        timeout = timeout or self.timeout
+        if not use_proxy or not self.pool:
+            t0 = time.perf_counter()
+            response = self.session().get(url, headers=headers, params=params,
+                                          timeout=timeout, verify=verify)
+            METRICS.observe("scrape", time.perf_counter() - t0)
+            return response
+        tried, response, error = [], None, None
+        for _ in range(min(self.retries, len(self.pool))):
+            state = self.pool.choose(exclude=tried)
+            tried.append(state)
+            t0 = time.perf_counter()
+            try:
+                response = self.session(state).get(url, headers=headers, params=params,
+                                                   timeout=timeout, verify=verify)
+            except requests.RequestException as e:
+                self.pool.report(state, False)
+                error = e
+                continue
+            latency = time.perf_counter() - t0
+            METRICS.observe("scrape", latency)
+            failed = response.status_code in _PROXY_FAILURE_STATUS or response.status_code >= 500
+            self.pool.report(state, not failed, latency)
+            if not failed:
+                return response
+        if response is not None:
+            return response
+        raise error
+
+    def close(self):
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+
+
+_transports = {}
+_transports_lock = threading.Lock()
+
+
+def get_transport(proxy_file=None):
+    """Shared ScraperTransport, with the ProxyPool of `proxy_file` loaded once per path."""
+    with _transports_lock:
+        transport = _transports.get(proxy_file)
+        if transport is None:
+            pool = None
+            if proxy_file is not None:
+                try:
+                    pool = ProxyPool.from_file(proxy_file)
+                except OSError:
+                    logger.warning("Cannot read proxy list %s; scraping directly", proxy_file)
+            transport = _transports[proxy_file] = ScraperTransport(pool)
+        return transport
+
+
+def _has_class(name):
+    return f'contains(concat(" ", normalize-space(@class), " "), " {name} ")'
+
+
+# the only parts of Yahoo quote / article pages the scraper reads
+QUOTE_SECTIONS = '//section[@data-testid="company-overview-card" or @data-testid="recent-news"]'
+ARTICLE_PARTS = f'//div[{_has_class("byline-attr-time-style")} or {_has_class("article-wrap")}]'
+
+
+def make_soup(html, select=None):
+    """BeautifulSoup of `html`, restricted to the elements matching XPath `select` if given.
+
+    Returns None when `html` cannot be parsed as a document.
+    """
+    if select is None:
+        return BeautifulSoup(html, "lxml")
+    try:
+        root = lxml.html.fromstring(html)
+    except (etree.ParserError, ValueError):
+        return None
+    parts = root.xpath(select)
+    return BeautifulSoup("".join(lxml.html.tostring(p, encoding="unicode") for p in parts), "lxml")
+
+
+def extract_quote(soup):
+    """Business summary and recent news links of a Yahoo quote page.
+
+    Returns {"business_summary": text or None, "news": [{"url", "title",
+    "publishing"}]}; `soup` may be None or selected with QUOTE_SECTIONS.
+    """
+    quote = {"business_summary": None, "news": []}
+    if soup is None:
+        return quote
+    card = soup.find("section", attrs={"data-testid": "company-overview-card"})
+    description = card.find("div", attrs={"class": "description"}) if card else None
+    paragraph = description.find("p") if description else None
+    if paragraph:
+        quote["business_summary"] = paragraph.get_text()
+    section = soup.find("section", attrs={"data-testid": "recent-news"})
+    for item in section.find_all("div", attrs={"class": "stream-item"}) if section else ():
+        link = item.find("a", href=True, title=True)
+        publishing = item.find("div", attrs={"class": "publishing"})
+        if link and publishing:
+            quote["news"].append({
+                "url": link["href"],
+                "title": link["title"],
+                "publishing": publishing.text.strip(),
+            })
+    return quote
+
+
+def extract_article(soup):
+    """Byline time text and body text of a Yahoo article page (None where missing).
+
+    `soup` may be None or selected with ARTICLE_PARTS.
+    """
+    article = {"date_text": None, "text": None}
+    if soup is None:
+        return article
+    byline = soup.find("div", attrs={"class": "byline-attr-time-style"})
+    if byline:
+        article["date_text"] = byline.text.strip() or None
+    body = soup.find("div", attrs={"class": "article-wrap"})
+    if body:
+        article["text"] = " ".join(p.get_text(strip=True) for p in body.find_all("p"))
+    return article
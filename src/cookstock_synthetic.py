@@ -0,0 +1,241 @@
+"""
+Seeded synthetic market data for scale testing.
+
+Generates yfinance-shaped daily OHLCV histories with trend regimes, volatility
+contraction episodes (shrinking pullbacks with volume drying up, then a
+breakout), overnight gaps and missing bars. The same (seed, symbol, as_of,
+years) always yields the same series, whatever date window is requested.
+
+Use it either through the provider layer (DATA_PROVIDER=synthetic, or
+set_provider(SyntheticProvider(...))) or directly via `price_records`, which
+returns the {"prices": [...]} structure cookFinancials keeps in priceData.
+"""
+import zlib
+import time
+import functools
+import datetime as dt
+
+import numpy as np
+import pandas as pd
+
+from cookstock_provider import _slice_history, _download_from_tickers
+
+# Fixed anchor so synthetic runs are reproducible from day to day
+DEFAULT_AS_OF = dt.date(2025, 12, 31)
+EXCHANGE_TZ = "America/New_York"
+
+
+def synthetic_tickers(n, prefix="SYN"):
+    """Return `n` stable fake ticker symbols, e.g. SYN00000 .. SYN09999."""
+    width = max(5, len(str(n - 1)))
+    return [f"{prefix}{i:0{width}d}" for i in range(n)]
+
+
+def _symbol_seed(seed, symbol):
+    return zlib.crc32(f"{seed}:{str(symbol).upper()}".encode())
+
+
+def _vcp_episode(rng, length):
+    """Log-price path for one contraction base: pullbacks shrinking in depth.
+
+    Returns (log_path, volume_multiplier) arrays of `length` days. The path
+    starts and ends at 0 (the prior high), the last few days break out.
+    """
+    n_contractions = int(rng.integers(2, 5))
+    depth = rng.uniform(0.12, 0.30)
+    breakout = max(3, length // 12)
+    seg = (length - breakout) // n_contractions
+    path = np.zeros(length)
+    pos = 0
+    for i in range(n_contractions):
+        down = max(2, int(seg * rng.uniform(0.35, 0.55)))
+        up = max(2, seg - down)
+        path[pos : pos + down] = np.linspace(0, np.log(1 - depth), down + 1)[1:]
+        path[pos + down : pos + down + up] = np.linspace(
+            np.log(1 - depth), 0, up + 1
+        )[1:]
+        pos += down + up
+        depth *= rng.uniform(0.45, 0.65)
+    path[pos:] = np.linspace(0, rng.uniform(0.03, 0.08), length - pos + 1)[1:]
+    # volume dries up through the base and expands on the breakout
+    volume = np.linspace(1.0, 0.35, length)
+    volume[pos:] = rng.uniform(1.8, 3.0)
+    return path, volume
+
+
+@functools.lru_cache(maxsize=16)
+def _trading_days(as_of, years):
+    # bdate_range is slow for long spans; every ticker shares the same calendar
+    return pd.bdate_range(
+        end=pd.Timestamp(as_of) - pd.Timedelta(days=1),
+        periods=int(252 * years),
+        tz=EXCHANGE_TZ,
+    )
+
+
+@functools.lru_cache(maxsize=256)
+def generate_history(symbol, seed=0, as_of=DEFAULT_AS_OF, years=10):
+    """Return a yfinance-style history DataFrame for `symbol`.
+
+    Index: tz-aware business days up to (but excluding) `as_of`.
+    Columns: Open, High, Low, Close, Volume.
+    The frame is cached; callers must not modify it in place.
+    """
+    rng = np.random.default_rng(_symbol_seed(seed, symbol))
+    index = _trading_days(as_of, years)
+    n = len(index)
+
+    # trend regimes with their own drift and volatility
+    returns = np.empty(n)
+    vol = np.empty(n)
+    base_vol = rng.lognormal(np.log(0.02), 0.35)
+    pos = 0
+    while pos < n:
+        length = int(rng.integers(40, 250))
+        returns[pos : pos + length] = rng.normal(0.0004, 0.0015)
+        vol[pos : pos + length] = base_vol * rng.uniform(0.6, 1.6)
+        pos += length
+    log_ret = returns + rng.standard_normal(n) * vol
+
+    # volatility contraction episodes: replace the noise by a shrinking zig-zag
+    vol_mult = np.ones(n)
+    for _ in range(int(rng.integers(1, 2 + years))):
+        length = int(rng.integers(35, 90))
+        start = int(rng.integers(0, max(1, n - length)))
+        path, volume = _vcp_episode(rng, length)
+        steps = np.diff(np.concatenate(([0.0], path)))
+        noise = rng.standard_normal(length) * vol[start : start + length] * 0.25
+        log_ret[start : start + length] = steps + noise
+        vol_mult[start : start + length] = volume
+    # make sure the most recent stretch sometimes ends inside a base
+    if rng.random() < 0.3:
+        length = min(n, int(rng.integers(40, 80)))
+        path, volume = _vcp_episode(rng, length + 10)
+        path, volume = path[:length], volume[:length]
+        log_ret[n - length :] = np.diff(np.concatenate(([0.0], path)))
+        vol_mult[n - length :] = volume
+
+    close = rng.uniform(5, 400) * np.exp(np.cumsum(log_ret))
+
+    # overnight gaps: open away from the previous close
+    prev_close = np.concatenate(([close[0]], close[:-1]))
+    gaps = np.where(rng.random(n) < 0.01, rng.normal(0, 0.04, n), 0.0)
+    open_ = prev_close * np.exp(gaps + rng.normal(0, 0.003, n))
+    span = np.abs(rng.normal(0, vol / 2, (2, n)))
+    high = np.maximum(open_, close) * (1 + span[0])
+    low = np.minimum(open_, close) * (1 - span[1])
+
+    base_volume = rng.lognormal(np.log(2e6), 1.2)
+    volume = (
+        base_volume
+        * vol_mult
+        * rng.lognormal(0, 0.3, n)
+        * (1 + 20 * np.abs(log_ret))
+    ).astype(np.int64)
+
+    frame = pd.DataFrame(
+        {"Open": open_, "High": high, "Low": low, "Close": close, "Volume": volume},
+        index=index,
+    )
+    # missing bars (halts, bad prints)
+    keep = rng.random(n) >= 0.005
+    return frame[keep]
+
+
+def generate_info(symbol, seed=0, as_of=DEFAULT_AS_OF, years=10):
+    """Return a small yfinance-style `info` dict consistent with the history."""
+    hist = generate_history(symbol, seed=seed, as_of=as_of, years=years)
+    rng = np.random.default_rng(_symbol_seed(seed, symbol) + 1)
+    price = float(hist["Close"].iloc[-1]) if len(hist) else None
+    shares = float(rng.lognormal(np.log(2e8), 1.0))
+    return {
+        "symbol": str(symbol).upper(),
+        "currentPrice": price,
+        "regularMarketPrice": price,
+        "marketCap": price * shares if price else None,
+        "sharesOutstanding": shares,
+        "averageVolume": float(hist["Volume"].tail(90).mean()) if len(hist) else 0,
+    }
+
+
+def price_records(symbol, days=120, seed=0, as_of=DEFAULT_AS_OF, years=10):
+    """Return {"prices": [...]} for the last `days` calendar days, in the
+    format cookFinancials stores in priceData / the price cache."""
+    hist = generate_history(symbol, seed=seed, as_of=as_of, years=years)
+    hist = _slice_history(hist, as_of - dt.timedelta(days=days), as_of)
+    prices = [
+        {
+            "formatted_date": idx.strftime("%Y-%m-%d"),
+            "date": int(idx.timestamp()),
+            "open": float(row.Open),
+            "high": float(row.High),
+            "low": float(row.Low),
+            "close": float(row.Close),
+            "volume": int(row.Volume),
+            "adjclose": float(row.Close),
+        }
+        for idx, row in zip(hist.index, hist.itertuples(index=False))
+    ]
+    return {"prices": prices}
+
+
+class _SyntheticTicker:
+    def __init__(self, provider, symbol):
+        self._provider = provider
+        self._symbol = str(symbol).upper()
+
+    def history(self, start=None, end=None, **kwargs):
+        p = self._provider
+        p.simulate_latency()
+        hist = generate_history(self._symbol, seed=p.seed, as_of=p.as_of, years=p.years)
+        return _slice_history(hist, start, end).copy()
+
+    @property
+    def info(self):
+        p = self._provider
+        p.simulate_latency()
+        return generate_info(self._symbol, seed=p.seed, as_of=p.as_of, years=p.years)
+
+    @property
+    def calendar(self):
+        return {}
+
+    def __getattr__(self, name):
+        # financial statements are not synthesized
+        if name in (
+            "balance_sheet",
+            "quarterly_balance_sheet",
+            "income_stmt",
+            "quarterly_income_stmt",
+            "cashflow",
+            "quarterly_cashflow",
+        ):
+            return pd.DataFrame()
+        raise AttributeError(name)
+
+
+class SyntheticProvider:
+    """Provider serving generated data for any symbol, fully offline."""
+
+    mode = "synthetic"
+    uses_price_cache = False
+    is_offline = True
+
+    def __init__(self, seed=0, as_of=None, years=10, latency_ms=0):
+        self.seed = seed
+        self.as_of = as_of or DEFAULT_AS_OF
+        self.years = years
+        self.latency_ms = latency_ms
+
+    def simulate_latency(self):
+        if self.latency_ms > 0:
+            time.sleep(self.latency_ms / 1000.0)
+
+    def ticker(self, symbol):
+        return _SyntheticTicker(self, symbol)
+
+    def download(self, tickers, start=None, end=None):
+        return _download_from_tickers(self, tickers, start=start, end=end)
+
+    def as_of_date(self):
+        return self.as_of
@@ -0,0 +1,169 @@
+"""
+Versioned ticker universe snapshots.
+
+Every batch run records the tickers it was asked to process as
+`<results>/universe/<name>/<YYYY-MM-DD>.json`: the sorted symbols plus the
+tickers added and removed since the previous snapshot of the same name (the
+latest earlier date; a same-day re-run replaces that day's snapshot).
+Expensive per-ticker work that only matters for newcomers, such as price
+cache warming, full-history backfill or fundamentals hydration, reads the
+diff instead of walking the whole universe:
+
+    from cookstock_universe import UniverseSnapshots
+    store = UniverseSnapshots(os.path.join(basePath, "results", "universe"))
+    added, removed = store.diff("Technology_HealthCare")
+
+See batch/runBatch_warmUniverse.py for a cache warmer built on it.
+"""
+import os
+import re
+import json as js
+import datetime as dt
+import logging
+
+logger = logging.getLogger(__name__)
+if not logger.handlers:
+    handler = logging.StreamHandler()
+    formatter = logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s")
+    handler.setFormatter(formatter)
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    log_level = os.getenv("LOG_LEVEL")
+    if log_level:
+        try:
+            logger.setLevel(getattr(logging, log_level.upper()))
+        except Exception:
+            logger.warning("Invalid LOG_LEVEL '%s'; using INFO", log_level)
+
+UNIVERSE_SNAPSHOTS = os.getenv("UNIVERSE_SNAPSHOTS", "true").lower() in ("1", "true", "yes")
+
+# dates embedded in result file names: 2025-01-31, 01_31_2025, 20250131, ...
+_DATE_PART = re.compile(r"[_\-]?(?:\d{4}[_\-]\d{1,2}[_\-]\d{1,2}|\d{1,2}[_\-]\d{1,2}[_\-]\d{4}|\d{8})(?=$|[_\-])")
+
+
+def universe_name(sectors):
+    """Stable snapshot name for a run's `sectors` label.
+
+    Drops a file extension and any embedded date, so a label such as
+    'Technology_superStocks_10_19_2025.json' maps to 'Technology_superStocks'
+    every day and diffs against the previous day's snapshot.
+    """
+    name = os.path.splitext(os.path.basename(str(sectors)))[0]
+    return _DATE_PART.sub("", name).strip("_-") or name
+
+
+def diff_tickers(old, new):
+    """Return (added, removed): sorted symbols only in `new` / only in `old`."""
+    old, new = set(old), set(new)
+    return sorted(new - old), sorted(old - new)
+
+
+def _as_date(date):
+    if date is None or isinstance(date, str):
+        return date
+    return date.strftime("%Y-%m-%d")
+
+
+class UniverseSnapshots:
+    """Dated universe snapshots of named ticker lists under `root`."""
+
+    def __init__(self, root):
+        self.root = root
+
+    def _path(self, name, date):
+        return os.path.join(self.root, name, f"{date}.json")
+
+    def dates(self, name):
+        """Snapshot dates (YYYY-MM-DD) of `name`, oldest first."""
+        try:
+            files = os.listdir(os.path.join(self.root, name))
+        except OSError:
+            return []
+        dates = []
+        for f in files:
+            stem, ext = os.path.splitext(f)
+            try:
+                dt.datetime.strptime(stem, "%Y-%m-%d")
+            except ValueError:
+                continue
+            if ext == ".json":
+                dates.append(stem)
+        return sorted(dates)
+
+    def load(self, name, date=None):
+        """Snapshot of `name` on `date` (latest if None); None if there is none."""
+        date = _as_date(date)
+        if date is None:
+            dates = self.dates(name)
+            if not dates:
+                return None
+            date = dates[-1]
+        try:
+            with open(self._path(name, date), "r") as f:
+                return js.load(f)
+        except (OSError, ValueError):
+            logger.debug("No readable universe snapshot %s/%s", name, date, exc_info=True)
+            return None
+
+    def previous(self, name, date):
+        """Latest snapshot of `name` strictly before `date`, or None."""
+        date = _as_date(date)
+        earlier = [d for d in self.dates(name) if d < date]
+        return self.load(name, earlier[-1]) if earlier else None
+
+    def record(self, name, tickers, date, meta=None):
+        """Write the snapshot of `name` for `date` and return it.
+
+        The snapshot stores the sorted unique symbols, the date of the previous
+        snapshot and the added/removed symbols against it (everything counts as
+        added for the first snapshot).
+        """
+        date = _as_date(date)
+        symbols = sorted(set(tickers))
+        prev = self.previous(name, date)
+        added, removed = diff_tickers(prev["tickers"] if prev else [], symbols)
+        snapshot = {
+            "name": name,
+            "date": date,
+            "count": len(symbols),
+            "previous": prev["date"] if prev else None,
+            "added": added,
+            "removed": removed,
+            "tickers": symbols,
+        }
+        if meta:
+            snapshot["meta"] = meta
+        path = self._path(name, date)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            js.dump(snapshot, f, separators=(",", ":"))
+        os.replace(tmp, path)
+        logger.info(
+            "Universe %s on %s: %d tickers, %d added, %d removed since %s",
+            name,
+            date,
+            len(symbols),
+            len(added),
+            len(removed),
+            snapshot["previous"] or "(first snapshot)",
+        )
+        return snapshot
+
+    def diff(self, name, since=None, date=None):
+        """Return (added, removed) between two snapshots of `name`.
+
+        `date` defaults to the latest snapshot. Without `since` the diff stored
+        in that snapshot is returned; otherwise it is compared with the latest
+        snapshot on or before `since`, covering every change in between (for a
+        consumer that last ran on `since`).
+        """
+        current = self.load(name, date)
+        if current is None:
+            return [], []
+        if since is None:
+            return current["added"], current["removed"]
+        since = _as_date(since)
+        base = [d for d in self.dates(name) if d <= since]
+        old = self.load(name, base[-1]) if base else None
+        return diff_tickers(old["tickers"] if old else [], current["tickers"])
@@ -1,10 +1,26 @@
 import pandas as pd
 from enum import Enum
 import io
+import os
+import json
+import time
+import logging
 import requests
 
+logger = logging.getLogger(__name__)
+
 _EXCHANGE_LIST = ['nyse', 'nasdaq', 'amex']
 
+# The Nasdaq screener download holds every listed stock, so the universe is
+# fetched once, cached on disk for UNIVERSE_TTL_HOURS and filtered in memory
+_SCREENER_URL = 'https://api.nasdaq.com/api/screener/stocks'
+_ROOT = os.environ.get('COOKSTOCK_PATH') or os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+UNIVERSE_CACHE_DIR = os.getenv('UNIVERSE_CACHE_DIR', os.path.join(_ROOT, 'results', 'cache', 'universe'))
+UNIVERSE_TTL_HOURS = float(os.getenv('UNIVERSE_TTL_HOURS', '24'))
+_UNIVERSE_COLUMNS = ['symbol', 'name', 'sector', 'industry', 'country', 'marketCap', 'exchange']
+# in-process copies of the parsed universe: with_exchange -> (loaded_at, DataFrame)
+_universe_memo = {}
+
 _SECTORS_LIST = {'Consumer Non-Durables', 'Capital Goods', 'Health Care', 'Energy', 'Technology', 'Basic Industries',
                  'Finance', 'Consumer Services', 'Public Utilities', 'Miscellaneous', 'Consumer Durables',
                  'Transportation'}
@@ -545,74 +561,131 @@ def get_custom_tickers(market='US'):
         market (str): Market to get tickers for. Options: 'US', 'UK', 'HK', 'BOTH' (US+UK), 'ALL' (US+UK+HK)
     
     Returns:
-        list: List of ticker symbols
+        list: List of ticker symbols, without duplicates
     """
     market = market.upper()
     if market == 'US':
-        return CUSTOM_TICKERS_US.copy()
+        tickers = CUSTOM_TICKERS_US
     elif market == 'UK':
-        return CUSTOM_TICKERS_UK.copy()
+        tickers = CUSTOM_TICKERS_UK
     elif market == 'HK':
-        return CUSTOM_TICKERS_HK.copy() + CUSTOM_TICKERS_HK_OTHERS.copy()
+        tickers = CUSTOM_TICKERS_HK + CUSTOM_TICKERS_HK_OTHERS
     elif market == 'BOTH':
-        return CUSTOM_TICKERS_US.copy() + CUSTOM_TICKERS_UK.copy()
+        tickers = CUSTOM_TICKERS_US + CUSTOM_TICKERS_UK
     elif market == 'ALL':
-        return CUSTOM_TICKERS_US.copy() + CUSTOM_TICKERS_UK.copy() + CUSTOM_TICKERS_HK.copy() + CUSTOM_TICKERS_HK_OTHERS.copy()
+        tickers = CUSTOM_TICKERS_US + CUSTOM_TICKERS_UK + CUSTOM_TICKERS_HK + CUSTOM_TICKERS_HK_OTHERS
     else:
         raise ValueError(f"Invalid market '{market}'. Options: 'US', 'UK', 'HK', 'BOTH', 'ALL'")
+    # the lists repeat some symbols across categories; keep the first occurrence
+    return unique_tickers(tickers)
+
+
+def unique_tickers(*ticker_lists):
+    """Concatenate ticker lists, dropping repeats and keeping first-seen order."""
+    return list(dict.fromkeys(t for tickers in ticker_lists for t in tickers))
 
 
 def get_tickers(NYSE=True, NASDAQ=True, AMEX=True):
-    tickers_list = []
-    if NYSE:
-        tickers_list.extend(__exchange2list('nyse'))
-    if NASDAQ:
-        tickers_list.extend(__exchange2list('nasdaq'))
-    if AMEX:
-        tickers_list.extend(__exchange2list('amex'))
-    return tickers_list
+    exchanges = [e for e, on in zip(_EXCHANGE_LIST, (NYSE, NASDAQ, AMEX)) if on]
+    return filter_universe(exchanges=exchanges)['symbol'].tolist()
 
 
-def get_tickers_filtered(mktcap_min=None, mktcap_max=None, sectors=None):
-    tickers_list = []
-    for exchange in _EXCHANGE_LIST:
-        tickers_list.extend(
-            __exchange2list_filtered(exchange, mktcap_min=mktcap_min, mktcap_max=mktcap_max, sectors=sectors))
-    return tickers_list
+# market caps are in millions
+def get_tickers_filtered(mktcap_min=None, mktcap_max=None, sectors=None, exchanges=None):
+    df = filter_universe(sectors=sectors, mktcap_min=mktcap_min, mktcap_max=mktcap_max, exchanges=exchanges)
+    return df['symbol'].tolist()
 
 
-def get_biggest_n_tickers(top_n, sectors=None):
-    df = pd.DataFrame()
-    for exchange in _EXCHANGE_LIST:
-        temp = __exchange2df(exchange)
-        df = pd.concat([df, temp])
+def load_universe(refresh=False, with_exchange=False):
+    """
+    Get the Nasdaq screener universe as a typed DataFrame.
+
+    One request downloads every listed stock; the raw rows are cached in
+    UNIVERSE_CACHE_DIR for UNIVERSE_TTL_HOURS and the parsed frame is kept in
+    memory, so repeated calls in a run cost no further requests.
+
+    Args:
+        refresh (bool): Ignore the caches and download again
+        with_exchange (bool): Fill the 'exchange' column. The screener rows carry
+            no exchange, so this costs one extra (cached) request per exchange
 
-    df = df.dropna(subset={'marketCap'})
-    df = df[~df['Symbol'].str.contains("\.|\^")]
+    Returns:
+        DataFrame: columns symbol, name, sector, industry, country (str),
+        marketCap (float, millions; 0 when unknown) and exchange (str, '' unless
+        with_exchange). Symbols with '.' or '^' are dropped.
+    """
+    memo = _universe_memo.get(with_exchange)
+    if memo and not refresh and time.time() - memo[0] < UNIVERSE_TTL_HOURS * 3600:
+        return memo[1].copy()
+    df = _universe_frame(_load_screener(refresh=refresh))
+    if with_exchange:
+        for exchange in _EXCHANGE_LIST:
+            members = {str(r.get('symbol', '')).strip() for r in _load_screener(exchange, refresh=refresh)}
+            df.loc[(df['exchange'] == '') & df['symbol'].isin(members), 'exchange'] = exchange
+    _universe_memo[with_exchange] = (time.time(), df)
+    return df.copy()
+
+
+def filter_universe(df=None, sectors=None, mktcap_min=None, mktcap_max=None, exchanges=None):
+    """
+    Filter the universe in memory.
 
+    Args:
+        df (DataFrame): Universe from load_universe(); loaded if None
+        sectors (str|list): Keep these sectors (see SectorConstants)
+        mktcap_min, mktcap_max (float): Exclusive market cap bounds in millions
+        exchanges (str|list): Keep these exchanges ('nyse', 'nasdaq', 'amex')
+
+    Returns:
+        DataFrame: matching rows in screener order
+    """
+    if exchanges is not None:
+        if isinstance(exchanges, str):
+            exchanges = [exchanges]
+        exchanges = [e.lower() for e in exchanges]
+        if not set(_EXCHANGE_LIST).issuperset(exchanges):
+            raise ValueError('Some exchanges included are invalid')
+        if set(exchanges) == set(_EXCHANGE_LIST):
+            exchanges = None
+    if df is None:
+        df = load_universe(with_exchange=exchanges is not None)
     if sectors is not None:
         if isinstance(sectors, str):
             sectors = [sectors]
         if not _SECTORS_LIST.issuperset(set(sectors)):
             raise ValueError('Some sectors included are invalid')
-        sector_filter = df['Sector'].apply(lambda x: x in sectors)
-        df = df[sector_filter]
+        df = df[df['sector'].isin(sectors)]
+    if mktcap_min is not None:
+        df = df[df['marketCap'] > mktcap_min]
+    if mktcap_max is not None:
+        df = df[df['marketCap'] < mktcap_max]
+    if exchanges is not None:
+        df = df[df['exchange'].isin(exchanges)]
+    return df
+
 
-    def cust_filter(mkt_cap):
-        if 'M' in mkt_cap:
-            return float(mkt_cap[1:-1])
-        elif 'B' in mkt_cap:
-            return float(mkt_cap[1:-1]) * 1000
-        else:
-            return float(mkt_cap[1:]) / 1e6
+def get_tickers_for_sectors(sectors, mktcap_min=None, mktcap_max=None, exchanges=None):
+    """
+    Get the tickers of several sectors as one deduplicated list.
+
+    Tickers are grouped in the order of `sectors` (screener order within a
+    sector), the same as concatenating get_tickers_filtered() per sector and
+    dropping repeats, but with a single in-memory filter.
+    """
+    if isinstance(sectors, str):
+        sectors = [sectors]
+    rank = {sector: i for i, sector in enumerate(dict.fromkeys(sectors))}
+    df = filter_universe(sectors=list(rank), mktcap_min=mktcap_min, mktcap_max=mktcap_max, exchanges=exchanges)
+    df = df.iloc[df['sector'].map(rank).argsort(kind='stable')]
+    return unique_tickers(df['symbol'])
 
-    df['marketCap'] = df['marketCap'].apply(cust_filter)
 
-    df = df.sort_values('marketCap', ascending=False)
+def get_biggest_n_tickers(top_n, sectors=None):
+    df = filter_universe(sectors=sectors)
     if top_n > len(df):
         raise ValueError('Not enough companies, please specify a smaller top_n')
-
-    return df.iloc[:top_n]['Symbol'].tolist()
+    df = df.sort_values('marketCap', ascending=False, kind='stable')
+    return df.iloc[:top_n]['symbol'].tolist()
 
 
 def get_tickers_by_region(region):
@@ -626,14 +699,85 @@ def get_tickers_by_region(region):
         raise ValueError('Please enter a valid region (use a Region.REGION as the argument, e.g. Region.AFRICA)')
 
 
+def _fetch_screener(exchange=None):
+    """Download the screener table (all exchanges, or one) as a list of row dicts."""
+    query = params + ((('exchange', exchange),) if exchange else ())
+    r = requests.get(_SCREENER_URL, headers=headers, params=query, timeout=30)
+    r.raise_for_status()
+    return r.json()['data']['rows']
+
+
+def _load_screener(exchange=None, refresh=False):
+    """Screener rows from the disk cache, downloading when missing or expired.
+
+    A failed download falls back to an expired cache if there is one.
+    """
+    name = f'nasdaq_screener_{exchange}.json' if exchange else 'nasdaq_screener.json'
+    path = os.path.join(UNIVERSE_CACHE_DIR, name)
+    cached = None
+    try:
+        with open(path, 'r') as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        pass
+    if cached and not refresh and time.time() - cached.get('fetched', 0) < UNIVERSE_TTL_HOURS * 3600:
+        return cached['rows']
+    try:
+        rows = _fetch_screener(exchange)
+    except Exception:
+        if not cached:
+            raise
+        logger.warning('Screener download failed; using cached universe from %s',
+                       time.strftime('%Y-%m-%d %H:%M', time.localtime(cached.get('fetched', 0))), exc_info=True)
+        return cached['rows']
+    try:
+        os.makedirs(UNIVERSE_CACHE_DIR, exist_ok=True)
+        tmp = path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump({'fetched': time.time(), 'exchange': exchange, 'rows': rows}, f)
+        os.replace(tmp, path)
+    except OSError:
+        logger.debug('Could not cache screener rows to %s', path, exc_info=True)
+    return rows
+
+
+# multipliers from a market cap suffix to millions (no suffix = dollars)
+_MKTCAP_UNITS = {'': 1e-6, 'K': 1e-3, 'M': 1.0, 'B': 1e3, 'T': 1e6}
+
+
+def _parse_market_cap(values):
+    """Parse market caps like '$1.2B', '350.5M' or '1,234,567.00' into millions.
+
+    Vectorized over the whole column; empty or unparseable values become 0.0.
+    """
+    parts = (pd.Series(values, dtype=object).fillna('').astype(str)
+             .str.replace(r'[$,\s]', '', regex=True).str.upper()
+             .str.extract(r'^([0-9]*\.?[0-9]+)([KMBT]?)$'))
+    number = pd.to_numeric(parts[0], errors='coerce')
+    unit = parts[1].fillna('').map(_MKTCAP_UNITS)
+    return (number * unit).fillna(0.0).astype(float)
+
+
+def _universe_frame(rows):
+    """Parse raw screener rows into the typed universe DataFrame."""
+    df = pd.DataFrame(rows)
+    for col in _UNIVERSE_COLUMNS:
+        if col not in df:
+            df[col] = ''
+    for col in ('symbol', 'name', 'sector', 'industry', 'country'):
+        df[col] = df[col].fillna('').astype(str).str.strip()
+    df['marketCap'] = _parse_market_cap(df['marketCap'])
+    df['exchange'] = ''
+    # removes weird tickers
+    df = df[(df['symbol'] != '') & ~df['symbol'].str.contains(r"\.|\^")]
+    return df.drop_duplicates('symbol')[_UNIVERSE_COLUMNS].reset_index(drop=True)
+
+
 def __exchange2df(exchange):
     # response = requests.get('https://old.nasdaq.com/screening/companies-by-name.aspx', headers=headers, params=params(exchange))
     # data = io.StringIO(response.text)
     # df = pd.read_csv(data, sep=",")
-    r = requests.get('https://api.nasdaq.com/api/screener/stocks', headers=headers, params=params)
-    data = r.json()['data']
-    df = pd.DataFrame(data['rows'], columns=data['headers'])
-    return df
+    return pd.DataFrame(_load_screener(exchange))
 
 
 def __exchange2list(exchange):
@@ -643,39 +787,6 @@ def __exchange2list(exchange):
     return df_filtered['symbol'].tolist()
 
 
-# market caps are in millions
-def __exchange2list_filtered(exchange, mktcap_min=None, mktcap_max=None, sectors=None):
-    df = __exchange2df(exchange)
-    # df = df.dropna(subset={'MarketCap'})
-    df = df.dropna(subset={'marketCap'})
-    df = df[~df['symbol'].str.contains("\.|\^")]
-
-    if sectors is not None:
-        if isinstance(sectors, str):
-            sectors = [sectors]
-        if not _SECTORS_LIST.issuperset(set(sectors)):
-            raise ValueError('Some sectors included are invalid')
-        sector_filter = df['sector'].apply(lambda x: x in sectors)
-        df = df[sector_filter]
-
-    def cust_filter(mkt_cap):
-        if 'M' in mkt_cap:
-            return float(mkt_cap[1:-1])
-        elif 'B' in mkt_cap:
-            return float(mkt_cap[1:-1]) * 1000
-        elif mkt_cap == '':
-            return 0.0
-        else:
-            return float(mkt_cap[1:]) / 1e6
-
-    df['marketCap'] = df['marketCap'].apply(cust_filter)
-    if mktcap_min is not None:
-        df = df[df['marketCap'] > mktcap_min]
-    if mktcap_max is not None:
-        df = df[df['marketCap'] < mktcap_max]
-    return df['symbol'].tolist()
-
-
 # save the tickers to a CSV
 def save_tickers(NYSE=True, NASDAQ=True, AMEX=True, filename='tickers.csv'):
     tickers2save = get_tickers(NYSE, NASDAQ, AMEX)
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""Benchmark the cookStock hot paths on fixed offline data.
+
+Measures per-call latency (p50/p90/p99) and throughput (tickers/s) of the
+indicator helpers, the VCP detector, the buy/sell signal calculators, the
+CSV/JSON writers and a full batch_pipeline_full run. Data comes from the
+seeded synthetic provider (default) or a recorded replay archive, so numbers
+are comparable between runs.
+
+Run:
+    python test/runBenchmark_cookStock.py --tickers 50 --save-baseline
+    python test/runBenchmark_cookStock.py --tickers 50 --compare
+    python test/runBenchmark_cookStock.py --archive ~/cookstock_archive --compare
+
+Exits with code 0, or 1 when --compare finds a p50 regression above
+--tolerance and --fail-on-regression is set.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import datetime as dt
+import logging
+import platform
+import tempfile
+import contextlib
+
+
+def find_path():
+    """Find the 'cookstock' project root (COOKSTOCK_PATH or upward search)."""
+    env_path = os.environ.get('COOKSTOCK_PATH')
+    if env_path and os.path.isdir(os.path.expanduser(env_path)):
+        return os.path.abspath(os.path.expanduser(env_path))
+    p = os.path.abspath(os.path.dirname(__file__))
+    while True:
+        if os.path.basename(p).lower() == 'cookstock':
+            return p
+        parent = os.path.dirname(p)
+        if parent == p:
+            break
+        p = parent
+    # fall back to the parent of test/
+    return os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+basePath = find_path()
+os.environ.setdefault('COOKSTOCK_PATH', basePath)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+os.environ.setdefault('MPLBACKEND', 'Agg')
+
+import cookStock
+from cookStock import (
+    cookFinancials,
+    batch_process,
+    calculate_common_buy_signal,
+    calculate_sell_signal,
+    setup_csv_file,
+    append_to_csv,
+    setup_result_file,
+    append_to_json,
+    _today,
+)
+from cookstock_provider import make_provider, set_provider
+from cookstock_metrics import summarize_samples
+from cookstock_synthetic import synthetic_tickers
+
+DEFAULT_BASELINE = os.path.join(basePath, 'results', 'benchmarks', 'baseline.json')
+
+
+def percentile_stats(samples, n_tickers=None):
+    """Summarize a list of per-call durations (seconds)."""
+    stats = summarize_samples(samples)
+    stats['calls'] = stats.pop('count')
+    if n_tickers:
+        total = stats['total_s']
+        stats['tickers_per_s'] = n_tickers / total if total > 0 else float('inf')
+    return stats
+
+
+class Timer:
+    """Collect per-call durations by benchmark name."""
+
+    def __init__(self):
+        self.samples = {}
+
+    def run(self, name, func, *args, **kwargs):
+        t0 = time.perf_counter()
+        result = func(*args, **kwargs)
+        self.samples.setdefault(name, []).append(time.perf_counter() - t0)
+        return result
+
+
+def bench_hot_paths(tickers, workdir, repeat=1):
+    """Time each hot path once per ticker (times `repeat`)."""
+    timer = Timer()
+    date = _today()
+    date_from = date - dt.timedelta(days=100)
+    csv_path = os.path.join(workdir, 'bench.csv')
+    setup_csv_file(csv_path)
+    json_path = setup_result_file(workdir, 'bench.json')
+
+    for ticker in tickers:
+        x = timer.run('fetch (cookFinancials)', cookFinancials, ticker)
+        for _ in range(repeat):
+            timer.run('get_ma_50', x.get_ma_50, date)
+            timer.run('get_ma_150', x.get_ma_150, date)
+            timer.run('get_ma_200', x.get_ma_200, date)
+            timer.run('get_ema', x.get_ema, date, 8)
+            timer.run('get_rsi', x.get_rsi, date)
+            timer.run('get_macd', x.get_macd, date)
+            timer.run('get_atr', x.get_atr, date)
+            timer.run('find_volatility_contraction_pattern',
+                      x.find_volatility_contraction_pattern, date_from)
+            x.get_footPrint()
+            isGoodPivot, current, support, pressure = x.is_pivot_good()
+            current = current or x.current_stickerPrice or 0
+            support = support or current
+            pressure = pressure or current
+            isDeep = x.is_correction_deep()
+            isDry = timer.run('is_demand_dry', x.is_demand_dry)[0]
+            timer.run('calculate_common_buy_signal', calculate_common_buy_signal,
+                      x, current, support, pressure)
+            timer.run('calculate_sell_signal', calculate_sell_signal,
+                      x, current, support, pressure, isGoodPivot, isDeep, isDry)
+        timer.run('append_to_csv', append_to_csv, csv_path, ticker, current, support,
+                  pressure, isGoodPivot, isDeep, isDry, False, ticker_obj=x)
+        timer.run('append_to_json', append_to_json, json_path,
+                  {ticker: {'current price': str(current)}})
+    return {name: percentile_stats(s, len(tickers)) for name, s in timer.samples.items()}
+
+
+def bench_pipeline(tickers, workdir):
+    """Run batch_pipeline_full end to end into `workdir`."""
+    t0 = time.perf_counter()
+    y = batch_process(tickers, 'bench', results_dir=os.path.join(workdir, 'pipeline'))
+    y.batch_pipeline_full()
+    elapsed = time.perf_counter() - t0
+    return {
+        'calls': 1,
+        'tickers': len(tickers),
+        'total_s': elapsed,
+        'per_ticker_ms': elapsed / len(tickers) * 1000,
+        'tickers_per_s': len(tickers) / elapsed if elapsed > 0 else float('inf'),
+    }
+
+
+def print_report(results, baseline=None):
+    print(f"\n{'benchmark':40s} {'calls':>6s} {'p50 ms':>10s} {'p90 ms':>10s} "
+          f"{'p99 ms':>10s} {'tickers/s':>10s} {'vs base':>9s}")
+    for name, st in results.items():
+        p50 = st.get('p50_ms', st.get('per_ticker_ms'))
+        ratio = ''
+        if baseline and name in baseline:
+            b = baseline[name].get('p50_ms', baseline[name].get('per_ticker_ms'))
+            if b:
+                ratio = f"{p50 / b:8.2f}x"
+        print(f"{name:40s} {st['calls']:6d} {p50:10.3f} {st.get('p90_ms', p50):10.3f} "
+              f"{st.get('p99_ms', p50):10.3f} {st.get('tickers_per_s', 0):10.1f} {ratio:>9s}")
+
+
+def regressions(results, baseline, tolerance):
+    """Return names whose p50 grew by more than `tolerance` (fraction)."""
+    out = []
+    for name, st in results.items():
+        if name not in baseline:
+            continue
+        cur = st.get('p50_ms', st.get('per_ticker_ms'))
+        base = baseline[name].get('p50_ms', baseline[name].get('per_ticker_ms'))
+        if base and cur > base * (1 + tolerance):
+            out.append(name)
+    return out
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark cookStock hot paths on offline data')
+    parser.add_argument('--tickers', type=int, default=50, help='Number of synthetic tickers. Default: 50')
+    parser.add_argument('--seed', type=int, default=0, help='Synthetic data seed. Default: 0')
+    parser.add_argument('--archive', help='Replay archive directory instead of synthetic data')
+    parser.add_argument('--repeat', type=int, default=1, help='Indicator calls per ticker. Default: 1')
+    parser.add_argument('--pipeline-tickers', type=int, default=None,
+                        help='Tickers for the full pipeline run (default: same as --tickers, 0 to skip)')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='Baseline JSON path')
+    parser.add_argument('--save-baseline', action='store_true', help='Write results as the new baseline')
+    parser.add_argument('--compare', action='store_true', help='Compare against the saved baseline')
+    parser.add_argument('--tolerance', type=float, default=0.10, help='Allowed p50 slowdown. Default: 0.10')
+    parser.add_argument('--fail-on-regression', action='store_true')
+    parser.add_argument('--log-level', default='WARNING')
+    args = parser.parse_args(argv)
+
+    cookStock.logger.setLevel(getattr(logging, args.log_level.upper()))
+    if args.archive:
+        provider = set_provider(make_provider('replay', args.archive))
+        tickers = provider.tickers[:args.tickers]
+    else:
+        set_provider(make_provider('synthetic', seed=args.seed))
+        tickers = synthetic_tickers(args.tickers)
+    n_pipeline = len(tickers) if args.pipeline_tickers is None else args.pipeline_tickers
+
+    print(f'Benchmarking {len(tickers)} tickers as of {_today()} '
+          f"({'replay ' + args.archive if args.archive else 'synthetic seed %d' % args.seed})")
+    with tempfile.TemporaryDirectory() as workdir, \
+            open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        results = bench_hot_paths(tickers, workdir, repeat=args.repeat)
+        if n_pipeline:
+            results['batch_pipeline_full'] = bench_pipeline(tickers[:n_pipeline], workdir)
+
+    baseline = None
+    if args.compare:
+        try:
+            with open(args.baseline, 'r') as f:
+                baseline = json.load(f)['results']
+        except (OSError, ValueError, KeyError):
+            print(f'No usable baseline at {args.baseline}')
+    print_report(results, baseline)
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, 'w') as f:
+            json.dump({
+                'meta': {
+                    'created': dt.datetime.now().isoformat(timespec='seconds'),
+                    'tickers': len(tickers),
+                    'seed': args.seed,
+                    'archive': args.archive,
+                    'python': platform.python_version(),
+                    'machine': platform.machine(),
+                },
+                'results': results,
+            }, f, indent=2)
+        print(f'\nBaseline saved to {args.baseline}')
+
+    if baseline:
+        slower = regressions(results, baseline, args.tolerance)
+        if slower:
+            print(f'\nREGRESSION (> {args.tolerance:.0%} p50): {", ".join(slower)}')
+            return 1 if args.fail_on_regression else 0
+        print('\nPASS: no p50 regression against baseline')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""Run the news-review stage offline against the stand-in backends.
+
+Reviews a batch of tickers with CookStockAskGPTBatch using the fake LLM
+client (with latency and some 429 answers) and synthetic Finnhub news, then
+checks that every article got a review, that reviews were batched within the
+LLM concurrency limit, and that a second run makes no LLM calls (reviews
+come from the watermarks and the review cache). Also checks that recorded
+news fixtures replay the same articles.
+
+Run: python test/runTest_askgpt_offline.py [--tickers 40]
+Exits with code 0 on PASS, 1 on FAIL.
+"""
+import os
+import sys
+import time
+import json
+import argparse
+import tempfile
+
+WORK = tempfile.mkdtemp(prefix="cookstock_askgpt_")
+# caches and watermarks of this run only (read when the modules are imported)
+os.environ["LLM_CACHE_PATH"] = os.path.join(WORK, "llm_cache.sqlite3")
+os.environ["NEWS_WATERMARK_DIR"] = os.path.join(WORK, "news")
+# the stand-in news backend needs no pacing between calls
+os.environ.setdefault("FINNHUB_MIN_INTERVAL_S", "0.01")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from cookstock_askgpt import LLM_CONCURRENCY, CookStockAskGPTBatch
+from cookstock_backends import (
+    FakeChatClient, FixtureNewsClient, RecordingNewsClient, SyntheticNewsClient,
+)
+
+
+def run_batch(tickers, client, news_client, name):
+    input_json = os.path.join(WORK, "input.json")
+    with open(input_json, "w") as f:
+        json.dump({"data": [{t: {"current price": 10.0}} for t in tickers]}, f)
+    output_json = os.path.join(WORK, f"{name}.json")
+    batch = CookStockAskGPTBatch(input_json, output_json, base_path=WORK, client=client,
+                                 finnhub_client=news_client)
+    start = time.time()
+    batch.analyze_batch()
+    elapsed = time.time() - start
+    with open(output_json) as f:
+        data = json.load(f)["data"]
+    return {t: d for entry in data for t, d in entry.items()}, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tickers", type=int, default=40)
+    args = parser.parse_args()
+    tickers = [f"SYN{i:03d}" for i in range(args.tickers)]
+    news_client = SyntheticNewsClient(seed=3, latency_ms=20)
+    ok = True
+
+    client = FakeChatClient(latency_ms=50, ms_per_token=0.5, rate_limit=0.1, retry_after=0.05)
+    results, elapsed = run_batch(tickers, client, news_client, "first")
+    articles = [n for d in results.values() for n in d.get("news", [])]
+    duplicates = sum(1 for n in articles if n.get("duplicate_of"))
+    print(f"first run: {len(results)} tickers, {len(articles)} articles ({duplicates} duplicates) "
+          f"in {elapsed:.1f}s; {client.calls} LLM calls ({client.rate_limited} rate limited), "
+          f"at most {client.max_in_flight} in flight")
+    if len(results) != len(tickers) or not articles:
+        print("FAIL: not every ticker was written with its news")
+        ok = False
+    if any(not n.get("review") for n in articles):
+        print("FAIL: some articles have no review")
+        ok = False
+    if client.calls - client.rate_limited >= len(articles) - duplicates:
+        print("FAIL: reviews were not batched")
+        ok = False
+    if client.max_in_flight > LLM_CONCURRENCY:
+        print("FAIL: more LLM calls in flight than LLM_CONCURRENCY")
+        ok = False
+
+    rerun_client = FakeChatClient(latency_ms=50)
+    rerun, elapsed = run_batch(tickers, rerun_client, news_client, "second")
+    reviews = {n["url"]: n["review"] for n in articles}
+    rerun_reviews = {n["url"]: n["review"] for d in rerun.values() for n in d.get("news", [])}
+    print(f"second run: {len(rerun_reviews)} articles in {elapsed:.1f}s; "
+          f"{rerun_client.calls} LLM calls")
+    if rerun_client.calls or rerun_reviews != reviews:
+        print("FAIL: the second run did not reuse the earlier reviews")
+        ok = False
+
+    fixture_dir = os.path.join(WORK, "fixtures")
+    recorder = RecordingNewsClient(news_client, fixture_dir)
+    live = recorder.company_news("SYN000", _from=time.strftime("%Y-%m-%d"), to=time.strftime("%Y-%m-%d"))
+    replayed = FixtureNewsClient(fixture_dir, latency_ms=0).company_news(
+        "SYN000", _from=time.strftime("%Y-%m-%d"), to=time.strftime("%Y-%m-%d"))
+    if [n["id"] for n in live] != [n["id"] for n in replayed]:
+        print("FAIL: news fixtures did not replay the recorded articles")
+        ok = False
+
+    print('PASS' if ok else 'FAIL')
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""Test the scraper transport against local stand-in proxy servers.
+
+Starts a healthy proxy, one that answers 503 and a dead port, then checks
+that requests reuse keep-alive connections, that failing proxies are benched
+and avoided, and that per-proxy latency stats are recorded. Also checks that
+the selected-section parsing of quote and article pages extracts the same
+fields as a full parse.
+
+Run: python test/runTest_scraper.py
+Exits with code 0 on PASS, 1 on FAIL.
+"""
+import os
+import sys
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from cookstock_scraper import (
+    ARTICLE_PARTS, QUOTE_SECTIONS, ProxyPool, ScraperTransport, extract_article,
+    extract_quote, make_soup, parse_proxy,
+)
+
+FILLER = ''.join(f'<div class="row"><span>cell {i}</span><a href="/l/{i}">link</a></div>' for i in range(500))
+QUOTE_PAGE = (
+    f'<html><body>{FILLER}<section data-testid="company-overview-card"><div class="description x">'
+    f'<p>Designs phones.</p></div></section>{FILLER}<section data-testid="recent-news">'
+    + ''.join(f'<div class="stream-item x"><a href="/news/{i}" title="Title {i}">t</a>'
+              f'<div class="publishing x">Reuters - {i} hours ago</div></div>' for i in range(5))
+    + f'</section>{FILLER}</body></html>'
+)
+ARTICLE_PAGE = (
+    f'<html><body>{FILLER}<div class="byline-attr-time-style x">Tue, Nov 12, 2024, 9:40 AM 2 min read</div>'
+    f'{FILLER}<div class="article-wrap no-bb"><p>One.</p><p>Two.</p></div>{FILLER}</body></html>'
+)
+
+
+def start_proxy(status):
+    """Stand-in HTTP proxy answering every request itself with `status`; counts connections."""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def setup(self):
+            super().setup()
+            self.server.connections += 1
+
+        def do_GET(self):
+            self.server.requests += 1
+            body = f'<html><p>{self.path}</p></html>'.encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'text/html')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.connections = server.requests = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def main():
+    good, bad = start_proxy(200), start_proxy(503)
+    lines = [f'127.0.0.1:{good.server_port}:user:secret', f'127.0.0.1:{bad.server_port}',
+             f'127.0.0.1:{free_port()}']
+    pool = ProxyPool([parse_proxy(line) for line in lines], backoff_base=60)
+    transport = ScraperTransport(pool, timeout=2, retries=3)
+
+    failures = []
+    for i in range(30):
+        response = transport.get(f'http://news.example.test/article/{i}', use_proxy=True)
+        if response.status_code != 200 or f'/article/{i}' not in response.text:
+            failures.append(i)
+    stats = pool.stats()
+    for label, s in stats.items():
+        print(label, s)
+    print(f'good proxy: {good.requests} requests over {good.connections} connection(s); '
+          f'503 proxy: {bad.requests} requests')
+
+    ok = True
+    if failures:
+        print(f'FAIL: requests {failures} did not get the page')
+        ok = False
+    if good.connections != 1:
+        print('FAIL: the healthy proxy connection was not kept alive')
+        ok = False
+    if bad.requests > 1:
+        print('FAIL: the 503 proxy was not benched after failing')
+        ok = False
+    if 'secret' in ''.join(stats):
+        print('FAIL: proxy credentials leaked into stats labels')
+        ok = False
+    good_stats = stats[f'127.0.0.1:{good.server_port}']
+    if good_stats['successes'] != 30 or 'p95_ms' not in good_stats:
+        print('FAIL: latency stats not recorded for the healthy proxy')
+        ok = False
+    for name, html, select, extract in (('quote', QUOTE_PAGE, QUOTE_SECTIONS, extract_quote),
+                                        ('article', ARTICLE_PAGE, ARTICLE_PARTS, extract_article)):
+        full, selected = extract(make_soup(html)), extract(make_soup(html, select))
+        print(f'{name} page: {selected}')
+        if full != selected or None in selected.values():
+            print(f'FAIL: selected {name} parsing differs from the full parse')
+            ok = False
+    transport.close()
+    good.shutdown()
+    bad.shutdown()
+    print('PASS' if ok else 'FAIL')
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())